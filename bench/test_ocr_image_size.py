@@ -0,0 +1,131 @@
+"""
+How small a screenshot can be shrunk before OCR stops reading it.
+
+The synthetic benchmark draws stats tables at phone screenshot resolutions and measures,
+at every size, the upload preprocess_image produces, the time it takes and how tall the
+digits end up, against the 12px the Read API wants. It needs no backend and always runs.
+
+The OCR benchmark reads every screenshot in OCR_BENCH_DIR at several sizes with the
+backend backend_from_env() selects, and compares them with the lines read at full
+resolution. OCR_BENCH_CROP optionally crops them first. Skipped unless OCR_BENCH_DIR is
+set, since it needs real screenshots and an OCR backend.
+"""
+import asyncio
+import os
+import random
+import time
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("aiohttp")
+
+from PIL import Image, ImageDraw, ImageFont
+
+from bot_commands.ocr import backend_from_env
+from bot_commands.preprocess import DEFAULT_MAX_SIDE, parse_crop, preprocess_image
+
+SIZES = [None, 2400, 2000, DEFAULT_MAX_SIDE, 1200, 1000, 800]
+# Share of the full resolution lines DEFAULT_MAX_SIDE must still read
+MIN_ACCURACY = 0.98
+# Smallest text height, in pixels, the Read API reads reliably
+MIN_TEXT_HEIGHT = 12
+# Landscape phone screenshots: iPhone 12-14, a common Android, iPhone Pro Max
+RESOLUTIONS = [(2532, 1170), (2400, 1080), (2778, 1284)]
+
+
+def stats_screenshot(width, height, seed=0):
+    """A stats table on a noisy game background, scaled like the in-game screen."""
+    rng = random.Random(seed)
+    background = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 40).convert("RGB")
+    image = Image.blend(background, noise, 0.3)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=height // 32)
+    top, row = height // 8, height // 17
+    draw.rectangle((width // 20, top, width - width // 20, height - height // 12), fill=(18, 24, 40))
+    for r in range(13):
+        x, y = width // 14, top + row // 3 + r * row
+        cells = [f"Player {r}"] + [str(rng.randint(0, 500)) for _ in range(7)] + [f"0.{rng.randint(100, 999)}"]
+        for c, cell in enumerate(cells):
+            draw.text((x, y), cell, fill=(235, 235, 235), font=font)
+            x += width // 4 if c == 0 else width // 13
+    _, digit_top, _, digit_bottom = font.getbbox("0")
+    return image, digit_bottom - digit_top
+
+
+def test_default_size_keeps_digits_readable_and_shrinks_the_upload():
+    results = {}
+    for width, height in RESOLUTIONS:
+        image, digit_height = stats_screenshot(width, height)
+        for fmt in ("PNG", "JPEG"):
+            buffer = BytesIO()
+            image.save(buffer, format=fmt, **({"quality": 85} if fmt == "JPEG" else {}))
+            raw = buffer.getvalue()
+            for size in SIZES:
+                result = results.setdefault((fmt, size), {"bytes": 0, "seconds": 0.0, "digit": 0.0})
+                started = time.perf_counter()
+                payload = raw if size is None else preprocess_image(raw, None, size)
+                result["seconds"] += time.perf_counter() - started
+                result["bytes"] += len(payload)
+                result["digit"] += digit_height * min(1, (size or width) / max(width, height))
+
+    count = len(RESOLUTIONS)
+    for (fmt, size), result in results.items():
+        label = "original" if size is None else f"{size}px"
+        print(
+            f"{fmt:>4} {label:>9}: {result['bytes'] / count / 1024:7.0f} KiB, "
+            f"{result['seconds'] / count * 1000:4.0f} ms, digits {result['digit'] / count:4.1f}px"
+        )
+    for fmt in ("PNG", "JPEG"):
+        default = results[(fmt, DEFAULT_MAX_SIDE)]
+        assert default["digit"] / count >= MIN_TEXT_HEIGHT
+        assert default["bytes"] < results[(fmt, None)]["bytes"]
+        # Never a bigger upload than the screenshot itself
+        assert all(results[(fmt, size)]["bytes"] <= results[(fmt, None)]["bytes"] for size in SIZES)
+
+
+async def read_at_every_size(paths, crop):
+    backend = backend_from_env()
+    results = {size: {"bytes": 0, "seconds": 0.0, "matched": 0} for size in SIZES}
+    total_lines = 0
+    try:
+        for path in paths:
+            with open(path, "rb") as f:
+                raw = f.read()
+            reference = None
+            for size in SIZES:
+                payload = raw if size is None else preprocess_image(raw, crop, size)
+                started = time.perf_counter()
+                lines = await backend.read_lines(payload)
+                results[size]["seconds"] += time.perf_counter() - started
+                results[size]["bytes"] += len(payload)
+                if reference is None:
+                    reference = lines
+                    total_lines += len(lines)
+                results[size]["matched"] += len(set(lines) & set(reference))
+    finally:
+        await backend.close()
+    return results, total_lines
+
+
+def test_default_size_keeps_the_lines_and_shrinks_the_payload():
+    directory = os.getenv("OCR_BENCH_DIR")
+    if not directory:
+        pytest.skip("OCR_BENCH_DIR is not set")
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith((".png", ".jpg", ".jpeg"))
+    )
+    results, total_lines = asyncio.run(read_at_every_size(paths, parse_crop(os.getenv("OCR_BENCH_CROP"))))
+
+    print(f"{len(paths)} screenshots, {total_lines} lines at full resolution")
+    for size, result in results.items():
+        label = "original" if size is None else f"{size}px"
+        print(
+            f"{label:>9}: {result['bytes'] / len(paths) / 1024:7.0f} KiB, "
+            f"{result['seconds'] / len(paths):5.2f}s per image, {result['matched'] / total_lines:6.1%} of lines"
+        )
+    assert results[DEFAULT_MAX_SIDE]["matched"] >= MIN_ACCURACY * total_lines
+    assert results[DEFAULT_MAX_SIDE]["bytes"] < results[None]["bytes"]
@@ -0,0 +1,55 @@
+"""The Pillow table renderer against the ax.table drawing it replaced."""
+import time
+from io import BytesIO
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from bot_commands.tables import pr_colour, render_table
+
+ROUNDS = 1
+
+
+def roster(rows=60):
+    return pd.DataFrame(
+        [
+            [f"Player {i}", f"Power ({i % 9})", f"Contact ({i % 7})", f"Speed ({i % 5})", "Nerf", i * 37, 3, 4]
+            for i in range(rows)
+        ],
+        columns=["Name", "SP1 Info", "SP2 Info", "SP3 Info", "Nerf", "PR", "Char", "Tool"],
+    )
+
+
+def matplotlib_table(frame):
+    fig, ax = plt.subplots(figsize=(24, len(frame) * 0.5 + 1))
+    ax.axis("tight")
+    ax.axis("off")
+    table = ax.table(cellText=frame.values, colLabels=frame.columns, cellLoc="center", loc="center")
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+    table.auto_set_column_width(col=list(range(len(frame.columns))))
+    buffer = BytesIO()
+    plt.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def seconds_per_table(render, frame):
+    render(frame)  # warm up fonts and imports
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        png = render(frame)
+    return (time.perf_counter() - started) / ROUNDS, png
+
+
+def test_pillow_renders_faster_than_matplotlib():
+    frame = roster()
+    old, _ = seconds_per_table(matplotlib_table, frame)
+    new, png = seconds_per_table(lambda f: render_table(f, column_colours={"PR": pr_colour}), frame)
+    print(f"matplotlib {old * 1000:.0f} ms, pillow {new * 1000:.0f} ms per table, {len(png) / 1024:.0f} KiB")
+    assert png.startswith(b"\x89PNG")
+    assert new < old
@@ -0,0 +1,40 @@
+"""Both stat engines on leaderboard-sized inputs."""
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from bot_commands.stat_engine import batting_stats, pitching_stats
+
+ROWS = 100000
+# Generous ceiling for a whole leaderboard; the per-player loops took tens of seconds
+BUDGET_SECONDS = 2.0
+
+
+def bat_rows(count, rng):
+    ab = rng.integers(0, 200, count)
+    return list(zip(
+        (f"Player {i}" for i in range(count)), ab, ab // 4, ab // 30, ab // 10,
+        ab // 2, ab // 40, ab // 30, ab // 5,
+    ))
+
+
+def pitch_rows(count, rng):
+    outs = rng.integers(0, 300, count)
+    return list(zip(
+        (f"Player {i}" for i in range(count)), outs, outs // 9, outs // 3, outs // 12,
+        rng.random(count), outs // 40, outs // 4, rng.integers(0, 30, count),
+    ))
+
+
+@pytest.mark.parametrize("engine, make_rows", [(batting_stats, bat_rows), (pitching_stats, pitch_rows)])
+def test_engine_handles_a_leaderboard_within_budget(engine, make_rows):
+    rows = make_rows(ROWS, np.random.default_rng(0))
+    started = time.perf_counter()
+    df = engine(rows)
+    elapsed = time.perf_counter() - started
+    print(f"{engine.__name__}: {ROWS} rows in {elapsed * 1000:.0f} ms ({ROWS / elapsed:,.0f} rows/s)")
+    assert len(df) == ROWS
+    assert elapsed < BUDGET_SECONDS
@@ -0,0 +1,32 @@
+"""parse_lines throughput on the recorded OCR corpus in tests/fixtures/stat_parser."""
+import json
+import time
+from pathlib import Path
+
+from bot_commands.stat_parser import BAT_LAYOUT, PITCH_LAYOUT, parse_lines
+
+CORPUS = Path(__file__).parent.parent / "tests" / "fixtures" / "stat_parser"
+LAYOUTS = {"bat": BAT_LAYOUT, "pitch": PITCH_LAYOUT}
+LINES = 200000
+# A submission is a few hundred lines, so this keeps parsing far below a millisecond each
+MIN_LINES_PER_SECOND = 100000
+
+
+def corpus():
+    for path in sorted(CORPUS.glob("*/*.json")):
+        if not path.name.endswith(".expected.json"):
+            lines = json.loads(path.read_text(encoding="utf-8"))
+            yield LAYOUTS[path.parent.name], [line if isinstance(line, str) else line[0] for line in lines]
+
+
+def test_parser_throughput():
+    screenshots = list(corpus())
+    line_count = sum(len(lines) for _, lines in screenshots)
+    rounds = max(1, LINES // line_count)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for layout, lines in screenshots:
+            parse_lines(lines, layout)
+    rate = line_count * rounds / (time.perf_counter() - started)
+    print(f"{rate:,.0f} lines per second")
+    assert rate > MIN_LINES_PER_SECOND
@@ -1,9 +1,12 @@
 import discord
 from discord.ext import commands
-import psycopg2
 import asyncio
-from urllib.parse import urlparse
 import os
+from bot_commands.cache import ImageCache, RosterCache
+from bot_commands.db import ConnectionPool
+from bot_commands import executors
+from bot_commands.migrations import run_migrations
+from bot_commands.ocr import OCRCache, backend_from_env
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -15,19 +18,31 @@ intents.members = True
 bot1 = commands.Bot(command_prefix="!", intents=intents, case_insensitive=True) #stevie bot
 bot2 = commands.Bot(command_prefix="!", intents=intents, case_insensitive=True) #bieber bot
 
-# Database connection
+# Database connection pool, shared by both bots. Each command borrows its own connection.
 DATABASE_URL = os.getenv("DATABASE_URL")
-result = urlparse(DATABASE_URL)
-connection = psycopg2.connect(
-    database=result.path[1:],
-    user=result.username,
-    password=result.password,
-    host=result.hostname,
-    port=result.port,
+pool = ConnectionPool.from_url(
+    DATABASE_URL,
+    size=int(os.getenv("DB_POOL_SIZE", "10")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
 )
 
-bot1.connection = connection
-bot2.connection = connection
+bot1.pool = pool
+bot2.pool = pool
+
+# Player and club rosters cached in front of the scout commands (both cogs live on bot1)
+bot1.roster_cache = RosterCache(
+    maxsize=int(os.getenv("ROSTER_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("ROSTER_CACHE_TTL", "600")),
+)
+
+# Rendered club table PNGs, capped by total size in bytes
+bot1.image_cache = ImageCache(max_bytes=int(os.getenv("IMAGE_CACHE_BYTES", str(64 * 1024 * 1024))))
+
+# One OCR backend (the Read API unless OCR_BACKEND says otherwise) for the bat and pitch cogs on bot2
+bot2.ocr_backend = backend_from_env()
+# Lines of every screenshot already read, so re-submitted screenshots skip OCR
+bot2.ocr_cache = OCRCache(pool, max_bytes=int(os.getenv("OCR_CACHE_BYTES", str(50 * 1024 * 1024))))
+
 
 @bot1.event
 async def on_ready():
@@ -55,11 +70,23 @@ async def load_extensions(bot):
 
 
 async def main():
+    # Fork the render workers while this process is still single-threaded
+    executors.start_render_workers()
+    # Bring the schema and indexes up to date before any cog touches the database
+    await pool.run(run_migrations, pool)
     await asyncio.gather(load_extensions(bot1), load_extensions(bot2))
-    await asyncio.gather(
-        bot1.start(os.getenv("DISCORD_BOT_TOKEN")),
-        bot2.start(os.getenv("DISCORD_BOT_TOKEN_2")),
+    lag_monitor = asyncio.create_task(
+        executors.monitor_loop_lag(threshold=float(os.getenv("LOOP_LAG_THRESHOLD", "0.25")))
     )
+    try:
+        await asyncio.gather(
+            bot1.start(os.getenv("DISCORD_BOT_TOKEN")),
+            bot2.start(os.getenv("DISCORD_BOT_TOKEN_2")),
+        )
+    finally:
+        lag_monitor.cancel()
+        await bot2.ocr_backend.close()
+        executors.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
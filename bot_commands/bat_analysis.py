@@ -1,19 +1,33 @@
 import discord
 from discord.ext import commands
 import asyncio
-import requests
 from io import BytesIO
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
 from datetime import datetime
+from bot_commands.cache import TTLCache
+from bot_commands.executors import run_render
+from bot_commands.ocr import ScreenshotReader
+from bot_commands.preprocess import DEFAULT_MAX_SIDE, parse_crop
+from bot_commands.stat_engine import batting_stats
+from bot_commands.stat_parser import BAT_LAYOUT, parse_lines
+from bot_commands.tables import render_table
 
 class RankedBatStats(commands.Cog):
-    def __init__(self, bot, connection):
+    def __init__(self, bot, pool, ocr_backend, ocr_cache):
         self.bot = bot
-        self.connection = connection
-        self.api_key = os.getenv('AZURE_API_KEY')
-        self.endpoint = os.getenv('AZURE_ENDPOINT') + '/vision/v3.2/read/analyze'
+        self.pool = pool
+        # fetch_trend results per Discord user, shared by rankedavg/obp/slg/ops
+        self.trend_cache = TTLCache(maxsize=256, ttl=600)
+        # Stats table region of the screenshots, the size they are shrunk to before OCR,
+        # and whether each pair of screenshots is stitched into a single OCR request
+        self.reader = ScreenshotReader(
+            ocr_backend,
+            ocr_cache,
+            crop=parse_crop(os.getenv("OCR_BAT_CROP")),
+            max_side=int(os.getenv("OCR_MAX_SIDE", str(DEFAULT_MAX_SIDE))),
+            stitch=os.getenv("OCR_STITCH") == "1",
+        )
 
     async def cog_check(self, ctx):
         allowed_user_ids = [
@@ -27,78 +41,51 @@ class RankedBatStats(commands.Cog):
         ]
         return ctx.author.id in allowed_user_ids
 
-    def parse_image(self, image_data):
-        try:
-            headers = {
-                'Ocp-Apim-Subscription-Key': self.api_key,
-                'Content-Type': 'application/octet-stream'
-            }
-            response = requests.post(self.endpoint, headers=headers, data=image_data)
-            if response.status_code == 202:
-                operation_location = response.headers["Operation-Location"]
-                import time
-                while True:
-                    result_response = requests.get(operation_location, headers=headers)
-                    if result_response.status_code != 200:
-                        return ""
-                    result = result_response.json()
-                    if result.get("status") == "succeeded":
-                        return [line["text"] for read_result in result["analyzeResult"]["readResults"] for line in read_result["lines"]]
-                    elif result.get("status") == "failed":
-                        return ""
-                    time.sleep(1)
-            else:
-                return ""
-        except Exception as e:
-            print(f"OCR Error: {e}")
-            return ""
-
-    def process_insert(self, raw_data, discord_id, timing, submission_time):
-        try:
-            data, newrow = [], []
-            for i in range(len(raw_data)):
-                if raw_data[i][0].isupper() or (raw_data[i][0:2] == "0." and raw_data[i][2].isalpha()):
-                    newrow = [raw_data[i]]
-                    continue
-                elif len(newrow) in [1, 2, 3, 4, 5, 6, 7]:
-                    newrow.append(raw_data[i])
-                if len(newrow) == 8:
-                    newrow.append("0" if newrow[-1] == "0" else raw_data[i + 1])
-                    data.append(newrow)
-                    newrow = []
-            with self.connection.cursor() as cursor:
-                for row in data:
-                    cursor.execute("""
-                        INSERT INTO rankedbatstats (
-                            DISCORDID, PLAYERNAME, AB, H, BB, SLG, K, HR, SB, SBPCT, TIMING, submission_time
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (DISCORDID, PLAYERNAME, TIMING, submission_time) DO NOTHING;
-                    """, (discord_id, *row, timing, submission_time))
-                self.connection.commit()
-        except Exception as e:
-            self.connection.rollback()
-            print(f"Insert Error: {e}")
-
-    def trim_old_submissions(self, discord_id):
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    DELETE FROM rankedbatstats
-WHERE DISCORDID = %s AND submission_time NOT IN (
-    SELECT submission_time FROM (
-        SELECT DISTINCT submission_time
-        FROM rankedbatstats
-        WHERE DISCORDID = %s
-        ORDER BY submission_time DESC
-        LIMIT 4
-    ) AS recent_times
-);
-
-                """, (discord_id,))
-            self.connection.commit()
-        except Exception as e:
-            self.connection.rollback()
-            print(f"Trim Error: {e}")
+    async def parse_image(self, image_data):
+        """OCR one screenshot and return its lines, reusing the stored result for a repeat upload."""
+        return await self.reader.read(image_data)
+
+    def insert_submission(self, screenshots, discord_id, submission_time):
+        """
+        Parse the OCR lines of every (timing, lines) screenshot, insert all rows and trim
+        the user's history down to the last 4 submissions, all in one transaction.
+        Returns the number of rows and the list of OCR lines the parser dropped.
+        """
+        rows, dropped = [], []
+        for timing, raw_data in screenshots:
+            records, skipped = parse_lines(raw_data, BAT_LAYOUT)
+            rows.extend((discord_id, *record, timing, submission_time) for record in records)
+            dropped.extend(skipped)
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.executemany("""
+                INSERT INTO rankedbatstats (
+                    DISCORDID, PLAYERNAME, AB, H, BB, SLG, K, HR, SB, SBPCT, TIMING, submission_time
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (DISCORDID, PLAYERNAME, TIMING, submission_time) DO NOTHING;
+            """, rows)
+                self.trim_old_submissions(cursor, discord_id)
+            connection.commit()
+        return len(rows), dropped
+
+    # Keeps the user's 4 most recent submissions: deletes everything older than the 4th
+    # newest submission_time. With fewer than 4 the cutoff is NULL and nothing goes.
+    TRIM_QUERY = """
+        DELETE FROM rankedbatstats
+        WHERE DISCORDID = %(discord_id)s AND submission_time < (
+            SELECT submission_time FROM (
+                SELECT DISTINCT submission_time
+                FROM rankedbatstats
+                WHERE DISCORDID = %(discord_id)s
+            ) AS times
+            ORDER BY submission_time DESC
+            OFFSET 3 LIMIT 1
+        );
+    """
+
+    def trim_old_submissions(self, cursor, discord_id):
+        """Keep only the user's 4 most recent submissions."""
+        cursor.execute(self.TRIM_QUERY, {"discord_id": discord_id})
 
     @commands.command()
     async def batters(self, ctx):
@@ -112,13 +99,14 @@ WHERE DISCORDID = %s AND submission_time NOT IN (
 
         try:
             submission_time = datetime.now()
-            for i, attachment in enumerate(attachments):
-                image_data = await attachment.read()
-                extracted_data = await asyncio.to_thread(self.parse_image, image_data)
-                timing = "before" if i <= 1 else "after"
-                await asyncio.to_thread(self.process_insert, extracted_data, discord_id, timing, submission_time)
-            await asyncio.to_thread(self.trim_old_submissions, discord_id)
-            await ctx.send(f"✅ Data updated for {discord_id}!")
+            # Download and OCR all four screenshots at once, then store them together
+            images = await asyncio.gather(*(attachment.read() for attachment in attachments))
+            before, after = await asyncio.gather(self.reader.read_group(images[:2]), self.reader.read_group(images[2:]))
+            screenshots = [("before", lines) for lines in before] + [("after", lines) for lines in after]
+            _, dropped = await self.pool.run(self.insert_submission, screenshots, discord_id, submission_time)
+            self.trend_cache.pop(discord_id)
+            note = f" ({len(dropped)} unreadable OCR lines skipped)" if dropped else ""
+            await ctx.send(f"✅ Data updated for {discord_id}!{note}")
         except Exception as e:
             await ctx.send(f"⚠️ Error: {e}")
 
@@ -126,12 +114,12 @@ WHERE DISCORDID = %s AND submission_time NOT IN (
     async def rankedbat(self, ctx):
         discord_id = ctx.author.id
         try:
-            results = await asyncio.to_thread(self.fetch_comparison_data, discord_id)
+            results = await self.pool.run(self.fetch_comparison_data, discord_id)
             if not results:
                 await ctx.send("No matching records found.")
                 return
-            buffer = await asyncio.to_thread(self.create_comparison_plot, results)
-            file = discord.File(fp=buffer, filename="stats_comparison.png")
+            image = await run_render(self.create_comparison_plot, results)
+            file = discord.File(fp=BytesIO(image), filename="stats_comparison.png")
             await ctx.send(file=file)
         except Exception as e:
             await ctx.send(f"⚠️ Error comparing stats: {e}")
@@ -139,8 +127,9 @@ WHERE DISCORDID = %s AND submission_time NOT IN (
 
     def fetch_comparison_data(self, discord_id):
         try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
+            with self.pool.connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("""
     SELECT a.PLAYERNAME,
         b.AB - a.AB, b.H - a.H, b.HR - a.HR, b.BB - a.BB,
         b.SLG * b.AB - a.SLG * a.AB, b.SB - a.SB,
@@ -160,121 +149,83 @@ WHERE DISCORDID = %s AND submission_time NOT IN (
       );
 """, (discord_id, discord_id, discord_id))
 
-                return cursor.fetchall()
+                    return cursor.fetchall()
         except Exception as e:
             print(f"Fetch Error: {e}")
             return []
 
-    def create_comparison_plot(self, results):
-        data = []
-        for row in results:
-            player_name, diff_AB, diff_H, diff_HR, diff_BB, diff_BASES, diff_SB, diff_SBA, diff_K = row
-
-            avg = round(diff_H / diff_AB, 3) if diff_AB else 0
-            walkrate = round((diff_BB / (diff_AB + diff_BB)) * 100, 1) if (diff_AB + diff_BB) else 0
-            obp = round((diff_H + diff_BB) / (diff_AB + diff_BB), 3) if (diff_AB + diff_BB) else 0
-            hrrate = round((diff_HR / diff_AB) * 100, 1) if diff_AB else 0
-            slg = round(diff_BASES / diff_AB, 3) if diff_AB else 0
-            ops = round(obp + slg, 3)
-            sbrate = round((diff_SB / diff_SBA) * 100, 1) if (diff_SBA > 0 and diff_SB > 0) else 0
-            krate = round((diff_K / diff_AB) * 100, 1) if diff_AB else 0
-
-            data.append([
-                player_name, diff_AB, avg, diff_BB, walkrate, diff_K, krate, obp,
-                diff_HR, hrrate, slg, ops, diff_SB, sbrate
-            ])
-
-        columns = [
-            "Player Name", "AB", "Avg", "BB", "BB%", "K", "K%", "OBP",
-            "HR", "HR%", "SLG", "OPS", "SB", "SB%"
-        ]
-
-        df = pd.DataFrame(data, columns=columns)
-        df = df.sort_values(by="OPS", ascending=False)
-
-        fig, ax = plt.subplots(figsize=(24, len(df) * 0.5 + 1))
-        ax.axis("tight")
-        ax.axis("off")
-
-        table = ax.table(
-            cellText=df.values,
-            colLabels=df.columns,
-            cellLoc="center",
-            loc="center",
-        )
+    @staticmethod
+    def create_comparison_plot(results):
+        return render_table(batting_stats(results))
 
-        table.auto_set_font_size(False)
-        table.set_fontsize(10)
-        table.auto_set_column_width(col=list(range(len(df.columns))))
-
-        cell_dict = table.get_celld()
-        for (row, col), cell in cell_dict.items():
-            if row == 0 or col == 0:
-                cell.set_text_props(weight="bold")
-
-        row_height = 1 / (len(df) + 1)
-        for (row, col), cell in cell_dict.items():
-            cell.set_height(row_height)
-
-        buffer = BytesIO()
-        plt.savefig(buffer, format="png", bbox_inches="tight", dpi=300)
-        buffer.seek(0)
-        plt.close(fig)
+    # Metrics of the ranked trend commands, in the column order fetch_trend selects them
+    TREND_METRICS = ["avg", "obp", "slg", "ops"]
 
-        return buffer
-
-    def fetch_metric_trend(self, discord_id, metric):
-        try:
-            with self.connection.cursor() as cursor:
+    def fetch_trend(self, discord_id):
+        """
+        Every trend metric for the user's last 4 submissions in one query.
+        Returns (timestamps, {metric: {player: [value or None per timestamp]}}).
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
                 cursor.execute("""
+                WITH recent AS (
                     SELECT DISTINCT submission_time
                     FROM rankedbatstats
                     WHERE DISCORDID = %s
                     ORDER BY submission_time DESC
-                    LIMIT 4;
-                """, (discord_id,))
-                timestamps = [row[0] for row in cursor.fetchall()][::-1]
-
-            player_data = {}
-            for ts in timestamps:
-                with self.connection.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT a.PLAYERNAME, b.H - a.H AS H, b.BB - a.BB AS BB,
-                               b.SLG * b.AB - a.SLG * a.AB AS BASES, b.AB - a.AB AS AB
-                        FROM rankedbatstats a
-                        JOIN rankedbatstats b
-                        ON a.PLAYERNAME = b.PLAYERNAME AND a.submission_time = b.submission_time
-                        WHERE a.DISCORDID = %s AND b.DISCORDID = %s
-                          AND a.TIMING = 'before' AND b.TIMING = 'after'
-                          AND a.submission_time = %s;
-                    """, (discord_id, discord_id, ts))
-                    rows = cursor.fetchall()
-
-                current_players = set(name for name, *_ in rows)
-                for name, h, bb, total_bases, ab in rows:
-                    value = 0
-                    if ab:
-                        if metric == "avg":
-                            value = round(h / ab, 3)
-                        elif metric == "obp":
-                            value = round((h + bb) / (ab + bb), 3) if (ab + bb) else 0
-                        elif metric == "slg":
-                            value = round(total_bases / ab, 3)
-                        elif metric == "ops":
-                            obp = round((h + bb) / (ab + bb), 3) if (ab + bb) else 0
-                            slg = round(total_bases / ab, 3)
-                            value = round(obp + slg, 3)
-                    player_data.setdefault(name, []).append(value)
-                for name in player_data:
-                    if name not in current_players:
-                        player_data[name].append(None)
-            return timestamps, player_data
-        except Exception as e:
-            print(f"Fetch metric trend error: {e}")
-            return [], {}
-
-
-    def plot_metric_trend(self, timestamps, player_data, metric):
+                    LIMIT 4
+                ), deltas AS (
+                    SELECT a.submission_time, a.PLAYERNAME AS name,
+                           b.H - a.H AS h, b.BB - a.BB AS bb,
+                           b.SLG * b.AB - a.SLG * a.AB AS bases, b.AB - a.AB AS ab
+                    FROM rankedbatstats a
+                    JOIN rankedbatstats b
+                    ON a.PLAYERNAME = b.PLAYERNAME AND a.submission_time = b.submission_time
+                    WHERE a.DISCORDID = %s AND b.DISCORDID = %s
+                      AND a.TIMING = 'before' AND b.TIMING = 'after'
+                      AND a.submission_time IN (SELECT submission_time FROM recent)
+                ), metrics AS (
+                    SELECT submission_time, name,
+                           CASE WHEN ab <> 0 THEN ROUND(h::numeric / ab, 3) ELSE 0 END AS avg,
+                           CASE WHEN ab <> 0 AND ab + bb <> 0
+                                THEN ROUND((h + bb)::numeric / (ab + bb), 3) ELSE 0 END AS obp,
+                           CASE WHEN ab <> 0 THEN ROUND(bases::numeric / ab, 3) ELSE 0 END AS slg
+                    FROM deltas
+                )
+                SELECT r.submission_time, m.name, m.avg, m.obp, m.slg, m.obp + m.slg AS ops
+                FROM recent r
+                LEFT JOIN metrics m ON m.submission_time = r.submission_time
+                ORDER BY r.submission_time, m.name;
+            """, (discord_id, discord_id, discord_id))
+                rows = cursor.fetchall()
+
+        timestamps = sorted({row[0] for row in rows})
+        position = {timestamp: i for i, timestamp in enumerate(timestamps)}
+        trend = {metric: {} for metric in self.TREND_METRICS}
+        for timestamp, name, *values in rows:
+            if name is None:
+                continue  # a submission with no matching before/after pairs
+            for metric, value in zip(self.TREND_METRICS, values):
+                series = trend[metric].setdefault(name, [None] * len(timestamps))
+                series[position[timestamp]] = float(value)
+        return timestamps, trend
+
+    async def metric_trend(self, discord_id, metric):
+        """(timestamps, {player: values}) for one metric, from the per-user cached trend."""
+        cached = self.trend_cache.get(discord_id)
+        if cached is None:
+            try:
+                cached = await self.pool.run(self.fetch_trend, discord_id)
+            except Exception as e:
+                print(f"Fetch metric trend error: {e}")
+                return [], {}
+            self.trend_cache.set(discord_id, cached)
+        timestamps, trend = cached
+        return timestamps, trend[metric]
+
+    @staticmethod
+    def plot_metric_trend(timestamps, player_data, metric):
         plt.figure(figsize=(12, 6))
         x_labels = [f"#{i+1}" for i in range(len(timestamps))]
         for name, values in player_data.items():
@@ -300,46 +251,45 @@ WHERE DISCORDID = %s AND submission_time NOT IN (
 
         buffer = BytesIO()
         plt.savefig(buffer, format='png', bbox_inches='tight', dpi=300)
-        buffer.seek(0)
         plt.close()
-        return buffer
+        return buffer.getvalue()
 
     @commands.command()
     async def rankedavg(self, ctx):
-        timestamps, player_data = await asyncio.to_thread(self.fetch_metric_trend, ctx.author.id, "avg")
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "avg")
         if not player_data:
             await ctx.send("No data to plot AVG.")
             return
-        buffer = await asyncio.to_thread(self.plot_metric_trend, timestamps, player_data, "avg")
-        await ctx.send(file=discord.File(fp=buffer, filename="rankedavg.png"))
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "avg")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedavg.png"))
 
     @commands.command()
     async def rankedobp(self, ctx):
-        timestamps, player_data = await asyncio.to_thread(self.fetch_metric_trend, ctx.author.id, "obp")
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "obp")
         if not player_data:
             await ctx.send("No data to plot OBP.")
             return
-        buffer = await asyncio.to_thread(self.plot_metric_trend, timestamps, player_data, "obp")
-        await ctx.send(file=discord.File(fp=buffer, filename="rankedobp.png"))
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "obp")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedobp.png"))
 
     @commands.command()
     async def rankedslg(self, ctx):
-        timestamps, player_data = await asyncio.to_thread(self.fetch_metric_trend, ctx.author.id, "slg")
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "slg")
         if not player_data:
             await ctx.send("No data to plot SLG.")
             return
-        buffer = await asyncio.to_thread(self.plot_metric_trend, timestamps, player_data, "slg")
-        await ctx.send(file=discord.File(fp=buffer, filename="rankedslg.png"))
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "slg")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedslg.png"))
 
     @commands.command()
     async def rankedops(self, ctx):
-        timestamps, player_data = await asyncio.to_thread(self.fetch_metric_trend, ctx.author.id, "ops")
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "ops")
         if not player_data:
             await ctx.send("No data to plot OPS.")
             return
-        buffer = await asyncio.to_thread(self.plot_metric_trend, timestamps, player_data, "ops")
-        await ctx.send(file=discord.File(fp=buffer, filename="rankedops.png"))
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "ops")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedops.png"))
 
 async def setup(bot):
-    connection = bot.connection
-    await bot.add_cog(RankedBatStats(bot, connection))
+    pool = bot.pool
+    await bot.add_cog(RankedBatStats(bot, pool, bot.ocr_backend, bot.ocr_cache))
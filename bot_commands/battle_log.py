@@ -1,21 +1,26 @@
 from discord.ext import commands
 import pandas as pd
-import matplotlib.pyplot as plt
-from io import BytesIO
+from io import BytesIO, StringIO
 import shlex
+import csv
+import time
 import discord
 import pandas as pd
 import psycopg2
 from urllib.parse import urlparse
 import os
 import asyncio
+from bot_commands.executors import run_blocking, run_render
+from bot_commands.paginator import TablePaginator
+from bot_commands.sheets import iter_sheet_batches
+from bot_commands.tables import page_count, render_table_page
 
 
 
 class BattleLog(commands.Cog):
-    def __init__(self, bot, connection):
+    def __init__(self, bot, pool):
         self.bot = bot
-        self.connection = connection
+        self.pool = pool
 
     async def cog_check(self, ctx):
         """
@@ -43,6 +48,64 @@ class BattleLog(commands.Cog):
             await ctx.send(f"Error: Could not send the file. {e}")
 
 
+    # Queries of the analyse commands; tests/test_query_plans.py checks they use an index
+    ANALYSE_QUERY = """
+        SELECT
+            battle_date,
+            player_club AS home_club,
+            SUM(wins) AS total_wins,
+            SUM(losses) AS total_losses,
+            SUM(draws) AS total_draws,
+            CASE
+                WHEN SUM(wins) + SUM(losses) + SUM(draws) > 0
+                THEN ROUND(SUM(wins)::decimal * 100 / (SUM(wins) + SUM(losses) + SUM(draws)), 2)
+                ELSE 0
+            END AS win_rate
+        FROM club_matchup_rollup
+        WHERE opponent_club = %s
+        GROUP BY battle_date, player_club
+        ORDER BY battle_date;
+    """
+
+    ANALYSE_DATE_QUERY = """
+        SELECT
+            opponent_name,
+            ROUND(
+                SUM(wins)::decimal * 100 /
+                NULLIF(SUM(wins) + SUM(losses) + SUM(draws), 0), 2
+            ) AS overall_win_rate,
+            ROUND(
+                SUM(wins) FILTER (WHERE opponent_sp_number = 1)::decimal * 100 /
+                NULLIF(SUM(battles) FILTER (WHERE opponent_sp_number = 1), 0), 2
+            ) AS sp1_win_rate,
+            ROUND(
+                SUM(wins) FILTER (WHERE opponent_sp_number = 2)::decimal * 100 /
+                NULLIF(SUM(battles) FILTER (WHERE opponent_sp_number = 2), 0), 2
+            ) AS sp2_win_rate,
+            ROUND(
+                SUM(wins) FILTER (WHERE opponent_sp_number = 3)::decimal * 100 /
+                NULLIF(SUM(battles) FILTER (WHERE opponent_sp_number = 3), 0), 2
+            ) AS sp3_win_rate,
+            ROUND(
+                SUM(wins) FILTER (WHERE opponent_sp_number = 4)::decimal * 100 /
+                NULLIF(SUM(battles) FILTER (WHERE opponent_sp_number = 4), 0), 2
+            ) AS sp4_win_rate,
+            ROUND(
+                SUM(wins) FILTER (WHERE opponent_sp_number = 5)::decimal * 100 /
+                NULLIF(SUM(battles) FILTER (WHERE opponent_sp_number = 5), 0), 2
+            ) AS sp5_win_rate,
+            ROUND(
+                SUM(player_sp_total)::decimal / NULLIF(SUM(battles), 0), 2
+            ) AS average_home_sp
+        FROM club_matchup_rollup
+        WHERE
+            battle_date = %s AND
+            player_club = %s AND
+            opponent_club = %s
+        GROUP BY opponent_name
+        ORDER BY overall_win_rate ASC;
+    """
+
     @commands.command()
     async def analyse(self, ctx, club_name: str):
         """
@@ -51,206 +114,230 @@ class BattleLog(commands.Cog):
         club_name = club_name.lower()
         rows_per_page = 30  # Number of rows per page
         try:
-            with self.connection.cursor() as cursor:
-                # Query to fetch date, home club, and total wins, losses, and draws against the specified opponent club
+            # Query to fetch date, home club, and total wins, losses, and draws against the specified opponent club
+            results = await self.pool.fetchall(
+                self.ANALYSE_QUERY,
+                (club_name,)
+            )
+
+            # If no records found
+            if not results:
+                await ctx.send(f"No records found against the opponent club **{club_name}**.")
+                return
+
+            # Process the data into a DataFrame
+            columns = ["Date", "Home Club", "Total Wins", "Total Losses", "Total Draws", "Win Percentage"]
+            df = pd.DataFrame(results, columns=columns)
+
+            # Paginate the table, rendering each page when it is first shown
+            paginator = TablePaginator(
+                lambda page: run_render(render_table_page, df, page, rows_per_page),
+                page_count(len(df), rows_per_page),
+                "club_table",
+                author_id=ctx.author.id,
+            )
+            await paginator.start(ctx)
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+
+    # Columns of a battle log sheet, in the order they are copied into club_records
+    LOG_COLUMNS = [
+        "Battle Date", "Player Name", "Opponent Name", "Result", "Opponent Club",
+        "Home Club", "Player SP Number", "Opponent SP Number", "Player Nerf",
+    ]
+
+    def prepare_log_rows(self, df):
+        """
+        Normalise a battle log sheet in one pass over the whole frame.
+        Returns the rows ready for the merge and a list of (sheet_row, reason) rejects.
+        """
+        # Format the names properly
+        for column in ("Home Club", "Opponent Club", "Player Name", "Opponent Name", "Player Nerf", "Result"):
+            df[column] = df[column].astype(str).str.lower().str.replace(" ", "")
+        for column in ("Player SP Number", "Opponent SP Number"):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        # Parse the Battle Date column as text: a date cell, "2025-01-07", or a number cell
+        # like 20250107 (which pandas would otherwise read as nanoseconds since 1970).
+        # Any other number, or text that is not a date, is rejected below instead of
+        # failing the COPY for the whole batch.
+        raw_dates = df["Battle Date"].astype(str).fillna("").str.strip().str.replace(r"\.0$", "", regex=True)
+        numeric = raw_dates.str.fullmatch(r"\d+")
+        dates = pd.to_datetime(raw_dates.where(~numeric), errors="coerce", format="mixed")
+        dates = dates.fillna(pd.to_datetime(raw_dates.where(numeric), errors="coerce", format="%Y%m%d"))
+        df["Battle Date"] = dates.dt.strftime("%Y-%m-%d")
+
+        # Spreadsheet row numbers (row 1 is the header)
+        sheet_rows = df.index + 2
+        missing = (
+            df[["Player Name", "Opponent Name", "Home Club", "Opponent Club"]].isin(["", "nan", "none"]).any(axis=1)
+            | raw_dates.isin(["", "nan", "None", "NaT"])
+        )
+        bad_date = dates.isna() & ~missing
+        bad_sp = df[["Player SP Number", "Opponent SP Number"]].isna().any(axis=1) & ~missing & ~bad_date
+        bad_result = ~df["Result"].isin(["w", "l", "d"]) & ~missing & ~bad_date & ~bad_sp
+        valid = ~missing & ~bad_date & ~bad_sp & ~bad_result
+        # A battle logged twice in the same sheet keeps its last row, as the row-by-row upsert did
+        key = ["Battle Date", "Player Name", "Opponent Name", "Player SP Number", "Opponent SP Number"]
+        superseded = valid & df[key].where(valid).duplicated(keep="last")
+
+        rejects = []
+        for mask, reason in (
+            (missing, "missing date, player, opponent or club"),
+            (bad_date, "bad date"),
+            (bad_sp, "SP numbers must be numbers"),
+            (bad_result, "result must be w, l or d"),
+            (superseded, "battle appears again further down the sheet"),
+        ):
+            rejects.extend((int(row), reason) for row in sheet_rows[mask.to_numpy()])
+        rejects.sort()
+
+        accepted = df.loc[valid & ~superseded, self.LOG_COLUMNS].copy()
+        for column in ("Player SP Number", "Opponent SP Number"):
+            accepted[column] = accepted[column].astype(int)
+        return list(accepted.itertuples(index=False, name=None)), rejects
+
+    def merge_log_rows(self, rows):
+        """
+        COPY the log into a temp table and merge it into club_records with a single
+        INSERT ... SELECT ... ON CONFLICT DO UPDATE. club_matchup_rollup is updated
+        with the difference in the same transaction.
+        """
+        buffer = StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
                 cursor.execute(
                     """
-                    SELECT 
-                        battle_date,
-                        player_club AS home_club,
-                        COUNT(CASE WHEN result = 'w' THEN 1 END) AS total_wins,
-                        COUNT(CASE WHEN result = 'l' THEN 1 END) AS total_losses,
-                        COUNT(CASE WHEN result = 'd' THEN 1 END) AS total_draws,
-                        CASE 
-                            WHEN COUNT(CASE WHEN result = 'w' THEN 1 END) + 
-                                COUNT(CASE WHEN result = 'l' THEN 1 END) + 
-                                COUNT(CASE WHEN result = 'd' THEN 1 END) > 0 
-                            THEN ROUND(
-                                COUNT(CASE WHEN result = 'w' THEN 1 END)::decimal * 100 / 
-                                (COUNT(CASE WHEN result = 'w' THEN 1 END) + 
-                                COUNT(CASE WHEN result = 'l' THEN 1 END) + 
-                                COUNT(CASE WHEN result = 'd' THEN 1 END)), 
-                                2
-                            )
-                            ELSE 0
-                        END AS win_rate
+                    CREATE TEMP TABLE club_records_staging ON COMMIT DROP AS
+                    SELECT battle_date, player_name, opponent_name, result, opponent_club,
+                        player_club, player_sp_number, opponent_sp_number, nerf
                     FROM club_records
-                    WHERE opponent_club = %s
-                    GROUP BY battle_date, player_club
-                    ORDER BY battle_date;
-
-
+                    WITH NO DATA
+                    """
+                )
+                cursor.copy_expert(
+                    """
+                    COPY club_records_staging (
+                        battle_date, player_name, opponent_name, result, opponent_club,
+                        player_club, player_sp_number, opponent_sp_number, nerf
+                    ) FROM STDIN WITH (FORMAT csv)
                     """,
-                    (club_name,)
+                    buffer,
                 )
-                # Fetch results
-                results = cursor.fetchall()
-
-                # If no records found
-                if not results:
-                    await ctx.send(f"No records found against the opponent club **{club_name}**.")
-                    return
-
-                # Process the data into a DataFrame
-                columns = ["Date", "Home Club", "Total Wins", "Total Losses", "Total Draws", "Win Percentage"]
-                df = pd.DataFrame(results, columns=columns)
-
-                # Paginate the table
-                total_pages = (len(df) + rows_per_page - 1) // rows_per_page
-                for page in range(total_pages):
-                    start = page * rows_per_page
-                    end = start + rows_per_page
-                    df_page = df.iloc[start:end]
-
-                    # Plot the table using matplotlib
-                    fig, ax = plt.subplots(figsize=(24, len(df_page) * 0.5 + 1))  # Dynamic height based on rows
-                    ax.axis("tight")
-                    ax.axis("off")
-                    table = ax.table(
-                        cellText=df_page.values,
-                        colLabels=df_page.columns,
-                        cellLoc="center",
-                        loc="center",
-                    )
-
-                    # Adjust table style
-                    table.auto_set_font_size(False)
-                    table.set_fontsize(10)
-                    table.auto_set_column_width(col=list(range(len(df_page.columns))))
-
-                    # Bold the headers and the first column
-                    cell_dict = table.get_celld()
-                    for (row, col), cell in cell_dict.items():
-                        if row == 0 or col == 0:
-                            cell.set_text_props(weight="bold")
-
-                        # Adjust the row height dynamically
-                        row_height = 1 / len(df_page)
-                        cell.set_height(row_height)
 
-                    # Save the table as an image in memory
-                    buffer = BytesIO()
-                    plt.savefig(buffer, format="png", bbox_inches="tight")
-                    buffer.seek(0)
-                    plt.close(fig)
-
-                    # Send the image to Discord
-                    file = discord.File(fp=buffer, filename=f"club_table_page_{page + 1}.png")
-                    await ctx.send(f"**Page {page + 1} of {total_pages}:**", file=file)
-
-                    buffer.close()
-        except Exception as e:
-            await ctx.send(f"An error occurred: {e}")
+                # Serialise log ingests so the rollup deltas below cannot interleave
+                cursor.execute("LOCK TABLE club_matchup_rollup IN SHARE ROW EXCLUSIVE MODE")
 
+                # Take the battles that are about to be overwritten out of the rollup
+                cursor.execute(
+                    """
+                    UPDATE club_matchup_rollup m
+                    SET wins = m.wins - old.wins,
+                        losses = m.losses - old.losses,
+                        draws = m.draws - old.draws,
+                        battles = m.battles - old.battles,
+                        player_sp_total = m.player_sp_total - old.player_sp_total
+                    FROM (
+                        SELECT
+                            r.battle_date,
+                            LOWER(r.player_club) AS player_club,
+                            LOWER(r.opponent_club) AS opponent_club,
+                            r.opponent_name,
+                            r.opponent_sp_number,
+                            COUNT(*) FILTER (WHERE r.result = 'w') AS wins,
+                            COUNT(*) FILTER (WHERE r.result = 'l') AS losses,
+                            COUNT(*) FILTER (WHERE r.result = 'd') AS draws,
+                            COUNT(*) AS battles,
+                            COALESCE(SUM(r.player_sp_number), 0) AS player_sp_total
+                        FROM club_records r
+                        JOIN club_records_staging s
+                        USING (battle_date, player_name, opponent_name, player_sp_number, opponent_sp_number)
+                        GROUP BY r.battle_date, LOWER(r.player_club), LOWER(r.opponent_club), r.opponent_name, r.opponent_sp_number
+                    ) AS old
+                    WHERE m.battle_date = old.battle_date
+                    AND m.player_club = old.player_club
+                    AND m.opponent_club = old.opponent_club
+                    AND m.opponent_name = old.opponent_name
+                    AND m.opponent_sp_number = old.opponent_sp_number
+                    """
+                )
+                cursor.execute(
+                    """
+                    INSERT INTO club_records (
+                        battle_date, player_name, opponent_name, result, opponent_club,
+                        player_club, player_sp_number, opponent_sp_number, nerf
+                    )
+                    SELECT battle_date, player_name, opponent_name, result, opponent_club,
+                        player_club, player_sp_number, opponent_sp_number, nerf
+                    FROM club_records_staging
+                    ON CONFLICT (battle_date, player_name, opponent_name, player_sp_number, opponent_sp_number)
+                    DO UPDATE SET
+                        result = EXCLUDED.result,
+                        opponent_club = EXCLUDED.opponent_club,
+                        player_club = EXCLUDED.player_club,
+                        nerf = EXCLUDED.nerf
+                    """
+                )
 
-    async def replace_log_to_database(self, file_stream):
-        # Read the Excel file
-        df = pd.read_excel(file_stream, engine="openpyxl")
-
-        # Format the names properly
-        df["Home Club"] = df["Home Club"].astype(str)
-        df["Home Club"] = df["Home Club"].str.lower().str.replace(" ", "")
-        df["Opponent Club"] = df["Opponent Club"].astype(str)
-        df["Opponent Club"] = df["Opponent Club"].str.lower().str.replace(" ", "")
-        df["Player Name"] = df["Player Name"].astype(str)
-        df["Player Name"] = df["Player Name"].str.lower().str.replace(" ", "")
-        df["Opponent Name"] = df["Opponent Name"].astype(str)
-        df["Opponent Name"] = df["Opponent Name"].str.lower().str.replace(" ", "")
-        df["Player Nerf"] = df["Player Nerf"].astype(str)
-        df["Player Nerf"] = df["Player Nerf"].str.lower().str.replace(" ", "")
-        df["Result"] = df["Result"].astype(str)
-        df["Result"] = df["Result"].str.lower().str.replace(" ", "")
-        df["Player SP Number"] = df["Player SP Number"].astype(int)
-        df["Opponent SP Number"] = df["Opponent SP Number"].astype(int)
-        # Convert the Battle Date column to datetime format
-        df["Battle Date"] = df["Battle Date"].astype(str)
+                # Add the new versions of those battles back in
+                cursor.execute(
+                    """
+                    INSERT INTO club_matchup_rollup (
+                        battle_date, player_club, opponent_club, opponent_name, opponent_sp_number,
+                        wins, losses, draws, battles, player_sp_total
+                    )
+                    SELECT
+                        battle_date,
+                        LOWER(player_club),
+                        LOWER(opponent_club),
+                        opponent_name,
+                        opponent_sp_number,
+                        COUNT(*) FILTER (WHERE result = 'w'),
+                        COUNT(*) FILTER (WHERE result = 'l'),
+                        COUNT(*) FILTER (WHERE result = 'd'),
+                        COUNT(*),
+                        COALESCE(SUM(player_sp_number), 0)
+                    FROM club_records_staging
+                    GROUP BY battle_date, LOWER(player_club), LOWER(opponent_club), opponent_name, opponent_sp_number
+                    ON CONFLICT (battle_date, player_club, opponent_club, opponent_name, opponent_sp_number)
+                    DO UPDATE SET
+                        wins = club_matchup_rollup.wins + EXCLUDED.wins,
+                        losses = club_matchup_rollup.losses + EXCLUDED.losses,
+                        draws = club_matchup_rollup.draws + EXCLUDED.draws,
+                        battles = club_matchup_rollup.battles + EXCLUDED.battles,
+                        player_sp_total = club_matchup_rollup.player_sp_total + EXCLUDED.player_sp_total
+                    """
+                )
+                cursor.execute("DELETE FROM club_matchup_rollup WHERE battles = 0")
+            connection.commit()
 
 
-        try:
-            cursor = self.connection.cursor()
-
-            for _, row in df.iterrows():
-                try:
-                    # Check if the record already exists
-                    cursor.execute(
-                        """
-                        SELECT 1 FROM club_records
-                        WHERE battle_date = %s
-                        AND player_name = %s
-                        AND opponent_name = %s
-                        AND player_sp_number = %s
-                        AND opponent_sp_number = %s
-                        """,
-                        (
-                            row["Battle Date"],
-                            row["Player Name"],
-                            row["Opponent Name"],
-                            row["Player SP Number"],
-                            row["Opponent SP Number"],
-                        ),
-                    )
-                    record_exists = cursor.fetchone()
-
-                    if record_exists:
-                        # Use an UPSERT query to either update or insert the record
-                        cursor.execute(
-                            """
-                            INSERT INTO club_records (
-                                battle_date, player_name, opponent_name, result, opponent_club,
-                                player_club, player_sp_number, opponent_sp_number, nerf
-                            )
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (battle_date, player_name, opponent_name, player_sp_number, opponent_sp_number)
-                            DO UPDATE SET
-                                result = EXCLUDED.result,
-                                opponent_club = EXCLUDED.opponent_club,
-                                player_club = EXCLUDED.player_club,
-                                nerf = EXCLUDED.nerf
-                            """,
-                            (
-                                row["Battle Date"],
-                                row["Player Name"],
-                                row["Opponent Name"],
-                                row["Result"],
-                                row["Opponent Club"],
-                                row["Home Club"],
-                                row["Player SP Number"],
-                                row["Opponent SP Number"],
-                                row["Player Nerf"],
-                            ),
-                        )
-                    else:
-                        # Insert the row into the database
-                        cursor.execute(
-                            """
-                            INSERT INTO club_records (
-                                battle_date, player_name, opponent_name, result, opponent_club,
-                                player_club, player_sp_number, opponent_sp_number, nerf
-                            )
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            """,
-                            (
-                                row["Battle Date"],
-                                row["Player Name"],
-                                row["Opponent Name"],
-                                row["Result"],
-                                row["Opponent Club"],
-                                row["Home Club"],
-                                row["Player SP Number"],
-                                row["Opponent SP Number"],
-                                row["Player Nerf"],
-                            ),
-                        )
-
-                except Exception as row_error:
-                    print(f"Error processing row: {row.to_dict()} - {row_error}")
-        
-            self.connection.commit()  # Commit after processing all rows
-        except Exception as db_error:
-            self.connection.rollback()  # Rollback on any database error
-            raise db_error  # Rethrow for higher-level handling
-        finally:
-            cursor.close()
+    async def replace_log_to_database(self, file_stream, progress=None):
+        """
+        Ingest a battle log sheet batch by batch, committing each batch on its own.
+        Returns the number of rows written, the rejected rows and how long the ingest took in seconds.
+        """
+        started = time.perf_counter()
+        logged, rejects = 0, []
+        batches = iter_sheet_batches(file_stream)
+        while True:
+            # Read the next batch of the sheet without blocking the event loop
+            df = await run_blocking(next, batches, None)
+            if df is None:
+                break
+            rows, batch_rejects = self.prepare_log_rows(df)
+            if rows:
+                await self.pool.run(self.merge_log_rows, rows)
+            logged += len(rows)
+            rejects.extend(batch_rejects)
+            if progress:
+                await progress(logged + len(rejects))
+        elapsed = time.perf_counter() - started
+        print(f"Ingested {logged} battle log rows ({len(rejects)} rejected) in {elapsed:.2f}s")
+        return logged, rejects, elapsed
 
 
     @commands.command()
@@ -263,6 +350,9 @@ class BattleLog(commands.Cog):
         # Notify that the upload is starting
         message = await ctx.send("Data is uploading. Please do not interrupt.")
 
+        async def progress(processed):
+            await message.edit(content=f"Data is uploading. Please do not interrupt. ({processed} rows processed)")
+
         # Get the attached file
         attachment = ctx.message.attachments[0]
         file_stream = BytesIO()
@@ -271,10 +361,14 @@ class BattleLog(commands.Cog):
 
         try:
             # Pass the file stream to the upload_to_database function
-            await self.replace_log_to_database(file_stream)
-
-            # Notify completion
-            await message.edit(content="Data successfully logged!")
+            logged, rejects, elapsed = await self.replace_log_to_database(file_stream, progress)
+
+            # Notify completion, listing any rows that were skipped
+            content = f"Data successfully logged! ({logged} battles in {elapsed:.1f}s)"
+            if rejects:
+                skipped = "\n".join(f"Row {row}: {reason}" for row, reason in rejects)
+                content += f"\n**Skipped {len(rejects)} rows:**\n{skipped}"
+            await message.edit(content=content[:2000])
         except Exception as e:
             await message.edit(content=f"Error: {e}")
 
@@ -292,113 +386,34 @@ class BattleLog(commands.Cog):
 
             rows_per_page = 20  # Limit rows per page to 20
 
-            with self.connection.cursor() as cursor:
-                # Query to fetch the opponent player stats for the specific date and clubs
-                cursor.execute(
-                    """
-                    SELECT 
-                        opponent_name,
-                        ROUND(
-                            COUNT(CASE WHEN result = 'w' THEN 1 END)::decimal * 100 / 
-                            NULLIF(
-                                COUNT(CASE WHEN result IN ('w', 'l', 'd') THEN 1 END), 0
-                            ), 2
-                        ) AS overall_win_rate,
-                        ROUND(
-                            COUNT(CASE WHEN result = 'w' AND opponent_sp_number = 1 THEN 1 END)::decimal * 100 / 
-                            NULLIF(COUNT(CASE WHEN opponent_sp_number = 1 THEN 1 END), 0), 2
-                        ) AS sp1_win_rate,
-                        ROUND(
-                            COUNT(CASE WHEN result = 'w' AND opponent_sp_number = 2 THEN 1 END)::decimal * 100 / 
-                            NULLIF(COUNT(CASE WHEN opponent_sp_number = 2 THEN 1 END), 0), 2
-                        ) AS sp2_win_rate,
-                        ROUND(
-                            COUNT(CASE WHEN result = 'w' AND opponent_sp_number = 3 THEN 1 END)::decimal * 100 / 
-                            NULLIF(COUNT(CASE WHEN opponent_sp_number = 3 THEN 1 END), 0), 2
-                        ) AS sp3_win_rate,
-                        ROUND(
-                            COUNT(CASE WHEN result = 'w' AND opponent_sp_number = 4 THEN 1 END)::decimal * 100 / 
-                            NULLIF(COUNT(CASE WHEN opponent_sp_number = 4 THEN 1 END), 0), 2
-                        ) AS sp4_win_rate,
-                        ROUND(
-                            COUNT(CASE WHEN result = 'w' AND opponent_sp_number = 5 THEN 1 END)::decimal * 100 / 
-                            NULLIF(COUNT(CASE WHEN opponent_sp_number = 5 THEN 1 END), 0), 2
-                        ) AS sp5_win_rate,
-                        ROUND(
-                            AVG(player_sp_number::decimal), 2
-                        ) AS average_home_sp
-                    FROM club_records
-                    WHERE 
-                        battle_date = %s AND
-                        LOWER(player_club) = %s AND 
-                        LOWER(opponent_club) = %s
-                    GROUP BY opponent_name
-                    ORDER BY overall_win_rate ASC;
-                    """,
-                    (battle_date, home_club, opponent_club)
-                )
-
-                # Fetch results
-                results = cursor.fetchall()
-
-                # If no records found
-                if not results:
-                    await ctx.send(
-                        f"No records found for **{home_club}** against **{opponent_club}** on **{battle_date}**."
-                    )
-                    return
-
-                # Process the data into a DataFrame
-                columns = [
-                    "Opponent Name", "Overall Win %", "SP1 Win %", "SP2 Win %", 
-                    "SP3 Win %", "SP4 Win %", "SP5 Win %", "Average Home SP"
-                ]
-                df = pd.DataFrame(results, columns=columns)
-
-                # Paginate the table
-                total_pages = (len(df) + rows_per_page - 1) // rows_per_page
-                for page in range(total_pages):
-                    start = page * rows_per_page
-                    end = start + rows_per_page
-                    df_page = df.iloc[start:end]
-
-                    # Plot the table using matplotlib
-                    fig, ax = plt.subplots(figsize=(24, len(df_page) * 0.5 + 1))  # Dynamic height based on rows
-                    ax.axis("tight")
-                    ax.axis("off")
-                    table = ax.table(
-                        cellText=df_page.values,
-                        colLabels=df_page.columns,
-                        cellLoc="center",
-                        loc="center",
-                    )
-
-                    # Adjust table style
-                    table.auto_set_font_size(False)
-                    table.set_fontsize(10)
-                    table.auto_set_column_width(col=list(range(len(df_page.columns))))
-
-                    # Bold the headers and the first column
-                    cell_dict = table.get_celld()
-                    for (row, col), cell in cell_dict.items():
-                        if row == 0 or col == 0:
-                            cell.set_text_props(weight="bold")
+            # Query to fetch the opponent player stats for the specific date and clubs
+            results = await self.pool.fetchall(
+                self.ANALYSE_DATE_QUERY,
+                (battle_date, home_club, opponent_club)
+            )
 
-                        # Adjust the row height dynamically
-                        row_height = 1 / len(df_page)
-                        cell.set_height(row_height)
-
-                    # Save the table as an image in memory
-                    buffer = BytesIO()
-                    plt.savefig(buffer, format="png", bbox_inches="tight")
-                    buffer.seek(0)
-                    plt.close(fig)
-
-                    # Send the image to Discord
-                    file = discord.File(fp=buffer, filename=f"opponent_stats_page_{page + 1}.png")
-                    await ctx.send(f"**Page {page + 1} of {total_pages}:**", file=file)
-
-                    buffer.close()
+            # If no records found
+            if not results:
+                await ctx.send(
+                    f"No records found for **{home_club}** against **{opponent_club}** on **{battle_date}**."
+                )
+                return
+
+            # Process the data into a DataFrame
+            columns = [
+                "Opponent Name", "Overall Win %", "SP1 Win %", "SP2 Win %", 
+                "SP3 Win %", "SP4 Win %", "SP5 Win %", "Average Home SP"
+            ]
+            df = pd.DataFrame(results, columns=columns)
+
+            # Paginate the table, rendering each page when it is first shown
+            paginator = TablePaginator(
+                lambda page: run_render(render_table_page, df, page, rows_per_page),
+                page_count(len(df), rows_per_page),
+                "opponent_stats",
+                author_id=ctx.author.id,
+            )
+            await paginator.start(ctx)
         except Exception as e:
             await ctx.send(f"An error occurred: {e}")
 
@@ -408,5 +423,5 @@ class BattleLog(commands.Cog):
 
 
 async def setup(bot):
-    connection = bot.connection  # Retrieve the connection from the bot instance
-    await bot.add_cog(BattleLog(bot, connection))
+    pool = bot.pool  # Retrieve the shared connection pool from the bot instance
+    await bot.add_cog(BattleLog(bot, pool))
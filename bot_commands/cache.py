@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small LRU cache whose entries also expire `ttl` seconds after they were stored.
+    Keeps hit and miss counters so the cache can be inspected from Discord.
+    """
+
+    def __init__(self, maxsize=512, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def pop_where(self, predicate):
+        """Drop every entry whose (key, value) matches `predicate`."""
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RosterCache:
+    """
+    Read-through cache of Player rows (keyed by player name) and club rosters
+    (keyed by (club name, query name)), shared by PlayerCommands and ClubCommands.
+    Every command that writes Player or Club must call invalidate() after committing.
+    """
+
+    def __init__(self, maxsize=512, ttl=600):
+        self.players = TTLCache(maxsize, ttl)
+        self.clubs = TTLCache(maxsize, ttl)
+
+    def invalidate(self, players=(), clubs=()):
+        for name in players:
+            self.players.pop(name)
+        clubs = {club for club in clubs if club}
+        if clubs:
+            self.clubs.pop_where(lambda key, value: key[0] in clubs)
+
+    def invalidate_club_members(self, club_name):
+        """Drop a club's roster and every cached player row that belongs to it."""
+        self.players.pop_where(lambda key, value: value[1] == club_name)
+        self.invalidate(clubs=[club_name])
+
+    def stats(self):
+        return {
+            name: {"hits": cache.hits, "misses": cache.misses, "size": len(cache)}
+            for name, cache in (("players", self.players), ("clubs", self.clubs))
+        }
+
+
+class ImageCache:
+    """
+    LRU cache of rendered PNG bytes capped by their total size rather than entry count.
+    A value is either one image (bytes) or a list of page images.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _sizeof(value):
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        return sum(len(page) for page in value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        nbytes = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[0]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (nbytes, value)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "bytes": self.size}
@@ -1,12 +1,12 @@
 from discord.ext import commands
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import rcParams
 from io import BytesIO
 import discord
 import shlex
+from bot_commands.executors import run_render
+from bot_commands.paginator import TablePaginator
 from bot_commands.player_commands import PlayerCommands
-import matplotlib
+from bot_commands.tables import page_count, pr_colour, render_table, render_table_page
 import re
 
 
@@ -14,9 +14,11 @@ import re
 
 
 class ClubCommands(commands.Cog):
-    def __init__(self, bot, connection):
+    def __init__(self, bot, pool, roster_cache, image_cache):
         self.bot = bot
-        self.connection = connection
+        self.pool = pool
+        self.roster_cache = roster_cache
+        self.image_cache = image_cache
 
     async def cog_check(self, ctx):
         """
@@ -37,35 +39,88 @@ class ClubCommands(commands.Cog):
 
 
 
+    # Roster query of each scout command, taking the club name as the only parameter.
+    # tests/test_query_plans.py checks they use an index.
+    ROSTER_QUERIES = {
+        "scoutclub": """
+            SELECT Name, sp1_name, sp1_skills, sp2_name, sp2_skills, sp3_name, sp3_skills, sp4_name, sp4_skills, sp5_name,
+            sp5_skills, Nerf, PR, last_updated, charbats, toolbats
+            FROM Player
+            WHERE Club_Name = %s
+        """,
+        "scoutclubez": """
+            SELECT Name, Nerf, PR, charbats, toolbats, last_updated, nerf_updated, team_name
+            FROM Player
+            WHERE Club_Name = %s
+        """,
+        "scoutclubtext": """
+            SELECT Name, Nerf, PR, team_name
+            FROM Player
+            WHERE Club_Name = %s
+            ORDER BY PR ASC;
+        """,
+        "scoutclubtrial": """
+            SELECT Name, sp1_name, sp1_skills, sp2_name, sp2_skills, sp3_name, sp3_skills, sp4_name, sp4_skills, sp5_name,
+            sp5_skills, Nerf, PR, Most_Common_Batting_Skill, last_updated
+            FROM Player
+            WHERE Club_Name = %s
+        """,
+    }
+
+    async def fetch_roster(self, club_name, query_name):
+        """Read-through cache in front of the per-club roster queries in ROSTER_QUERIES."""
+        key = (club_name, query_name)
+        players = self.roster_cache.clubs.get(key)
+        if players is None:
+            players = await self.pool.fetchall(self.ROSTER_QUERIES[query_name], (club_name,))
+            self.roster_cache.clubs.set(key, players)
+        return players
+
+    async def render_cached(self, command, club_name, players, render, *args):
+        """
+        Return the PNG bytes `render(players, *args)` would produce, rendering only on a cache miss.
+        The roster rows themselves are the version: any edit to the club changes the key.
+        The rows are part of the key as-is, so two rosters can never share an entry.
+        Renders run in the render worker processes, so `render` must be a static method.
+        """
+        key = (command, club_name, tuple(players), *args)
+        image = self.image_cache.get(key)
+        if image is None:
+            image = await run_render(render, players, *args)
+            self.image_cache.set(key, image)
+        return image
+
+
     @commands.command()
     async def addclub(self, ctx, club_name: str):
         """Add a new club to the database."""
         try:
-            cursor = self.connection.cursor()
             club_name = club_name.lower()
-
-            # Check if the club already exists
-            cursor.execute("SELECT * FROM Club WHERE Club_Name = %s", (club_name,))
-            existing_club = cursor.fetchone()
-
-            if existing_club:
-                await ctx.send(f"The club '{club_name}' already exists in the database.")
+            if await self.pool.run(self.insert_club, club_name):
+                await ctx.send(f"Added new club '{club_name}' to the database.")
             else:
-                # Insert a new club
+                await ctx.send(f"The club '{club_name}' already exists in the database.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    def insert_club(self, club_name):
+        """Insert a club. Returns False when it already exists."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO Club (Club_Name)
-                    VALUES (%s)
+                    SELECT %s
+                    WHERE NOT EXISTS (SELECT 1 FROM Club WHERE Club_Name = %s)
+                    RETURNING Club_Name
                     """,
-                    (club_name,),
+                    (club_name, club_name),
                 )
-                self.connection.commit()
-                await ctx.send(f"Added new club '{club_name}' to the database.")
-
-            cursor.close()
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+                inserted = cursor.fetchone() is not None
+            connection.commit()
+        if inserted:
+            self.roster_cache.invalidate(clubs=[club_name])
+        return inserted
 
 
     @commands.command()
@@ -74,34 +129,34 @@ class ClubCommands(commands.Cog):
         old_name = old_name.lower()
         new_name = new_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the club with the old name exists
-                cursor.execute("SELECT * FROM Club WHERE Club_Name = %s", (old_name,))
-                existing_club = cursor.fetchone()
-
-                if not existing_club:
-                    await ctx.send(f"No club found with the name '{old_name}'.")
-                    return
-
-                # Check if the new name already exists
-                cursor.execute("SELECT * FROM Club WHERE Club_Name = %s", (new_name,))
-                new_name_club = cursor.fetchone()
-
-                if new_name_club:
-                    await ctx.send(f"The name '{new_name}' is already taken by another club.")
-                    return
+            outcome = await self.pool.run(self.rename_club, old_name, new_name)
+            if outcome == "missing":
+                await ctx.send(f"No club found with the name '{old_name}'.")
+            elif outcome == "taken":
+                await ctx.send(f"The name '{new_name}' is already taken by another club.")
+            else:
+                await ctx.send(f"Renamed club '{old_name}' to '{new_name}' and updated all associated players.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
 
-                # Rename the club
+    def rename_club(self, old_name, new_name):
+        """Rename one club. Returns "renamed", "missing" (no such club) or "taken"."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM Club WHERE Club_Name = %s FOR UPDATE", (old_name,))
+                if cursor.fetchone() is None:
+                    return "missing"
+                cursor.execute("SELECT 1 FROM Club WHERE Club_Name = %s", (new_name,))
+                if cursor.fetchone():
+                    return "taken"
                 cursor.execute(
                     "UPDATE Club SET Club_Name = %s WHERE Club_Name = %s",
                     (new_name, old_name),
                 )
-
-                self.connection.commit()
-                await ctx.send(f"Renamed club '{old_name}' to '{new_name}' and updated all associated players.")
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+            connection.commit()
+        self.roster_cache.invalidate_club_members(old_name)
+        self.roster_cache.invalidate(clubs=[new_name])
+        return "renamed"
 
 
     @commands.command()
@@ -109,42 +164,59 @@ class ClubCommands(commands.Cog):
         """Delete a club from the database if it has no players."""
         club_name = club_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the club exists
-                cursor.execute("SELECT * FROM Club WHERE Club_Name = %s", (club_name,))
-                club = cursor.fetchone()
-
-                if not club:
-                    await ctx.send(f"No club found with the name '{club_name}'.")
-                    return
+            player_count = await self.pool.run(self.delete_club, club_name)
+            if player_count is None:
+                await ctx.send(f"No club found with the name '{club_name}'.")
+            elif player_count > 0:
+                await ctx.send(f"The club '{club_name}' cannot be deleted because it has {player_count} players.")
+            else:
+                await ctx.send(f"Club '{club_name}' has been successfully deleted.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
 
-                # Check if the club has players
+    def delete_club(self, club_name):
+        """
+        Delete a club that has no players. Returns its player count (the club is only
+        deleted when that is 0), or None when there is no such club.
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM Club WHERE Club_Name = %s FOR UPDATE", (club_name,))
+                if cursor.fetchone() is None:
+                    return None
                 cursor.execute("SELECT COUNT(*) FROM Player WHERE Club_Name = %s", (club_name,))
                 player_count = cursor.fetchone()[0]
-
                 if player_count > 0:
-                    await ctx.send(f"The club '{club_name}' cannot be deleted because it has {player_count} players.")
-                    return
-
-                # Delete the club
+                    return player_count
                 cursor.execute("DELETE FROM Club WHERE Club_Name = %s", (club_name,))
-                self.connection.commit()
-                await ctx.send(f"Club '{club_name}' has been successfully deleted.")
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+            connection.commit()
+        self.roster_cache.invalidate(clubs=[club_name])
+        return 0
 
 
     @commands.command()
     async def listclubs(self, ctx):
         """List the bottom 10 most recently added clubs and the total number of clubs in the database."""
         try:
-            with self.connection.cursor() as cursor:
-                # Fetch the total number of clubs
-                cursor.execute("SELECT COUNT(*) FROM Club")
-                total_clubs = cursor.fetchone()[0]
+            total_clubs, recent_clubs = await self.pool.run(self.recent_clubs)
+            if recent_clubs:
+                # Format the recent clubs list
+                club_list = "\n".join([club[0] for club in recent_clubs])
+                await ctx.send(
+                    f"**Total Clubs in the Database:** {total_clubs}\n\n"
+                    f"**10 Most Recently Added Clubs:**\n{club_list}"
+                )
+            else:
+                await ctx.send("No clubs found in the database.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
 
-                # Fetch the bottom 10 most recently added clubs
+    def recent_clubs(self):
+        """The number of clubs and the names of the last 10 added."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM Club")
+                total = cursor.fetchone()[0]
                 cursor.execute(
                     """
                     SELECT Club_Name
@@ -152,20 +224,7 @@ class ClubCommands(commands.Cog):
                     OFFSET GREATEST((SELECT COUNT(*) FROM Club) - 10, 0)
                     """
                 )
-                recent_clubs = cursor.fetchall()
-
-                if recent_clubs:
-                    # Format the recent clubs list
-                    club_list = "\n".join([club[0] for club in recent_clubs])
-                    await ctx.send(
-                        f"**Total Clubs in the Database:** {total_clubs}\n\n"
-                        f"**10 Most Recently Added Clubs:**\n{club_list}"
-                    )
-                else:
-                    await ctx.send("No clubs found in the database.")
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+                return total, cursor.fetchall()
 
 
 
@@ -177,110 +236,60 @@ class ClubCommands(commands.Cog):
         club_name = club_name.lower()
 
         try:
-            with self.connection.cursor() as cursor:
-                # Fetch player details for the club
-                cursor.execute(
-                    """
-                    SELECT Name, sp1_name, sp1_skills, sp2_name, sp2_skills, sp3_name, sp3_skills, sp4_name, sp4_skills, sp5_name,
-                    sp5_skills, Nerf, PR, last_updated, charbats, toolbats
-                    FROM Player
-                    WHERE Club_Name = %s
-                    """,
-                    (club_name,),
-                )
-                players = cursor.fetchall()
-
-                if not players:
-                    await ctx.send(f"No players found for the club '{club_name}'.")
-                    return
-                    
-
-                # Combine SP Name and Skills into single columns (SP1 Info, SP2 Info, etc.)
-                processed_players = [
-                    (
-                        player[0],  # Name
-                        f"{player[1]} ({player[2]})",  # SP1 Info
-                        f"{player[3]} ({player[4]})",  # SP2 Info
-                        f"{player[5]} ({player[6]})",  # SP3 Info
-                        f"{player[7]} ({player[8]})",  # SP4 Info
-                        f"{player[9]} ({player[10]})",  # SP5 Info
-                        player[11],  # Nerf
-                        player[12],  # PR
-                        player[14],  # Char
-                        player[15],  # Tool
-                        player[13],  # Last Updated
-                    )
-                    for player in players
-                ]
-
-                # Define new column headers
-                columns = [
-                    "Name", "SP1 Info", "SP2 Info", "SP3 Info", "SP4 Info", "SP5 Info",
-                    "Nerf", "PR", "Char", "Tool", "Last Updated"
-                ]
-
-                # Create a DataFrame from the processed data
-                df = pd.DataFrame(processed_players, columns=columns)
-                df = df.sort_values(by = "PR")
-
-                # Plot the table using matplotlib
-                fig, ax = plt.subplots(figsize=(24, len(df) * 0.5 + 1))  # Dynamic height based on rows
-                ax.axis("tight")
-                ax.axis("off")
-                table = ax.table(
-                    cellText=df.values,
-                    colLabels=df.columns,
-                    cellLoc="center",
-                    loc="center",
-                )
+            # Fetch player details for the club
+            players = await self.fetch_roster(club_name, "scoutclub")
+
+            if not players:
+                await ctx.send(f"No players found for the club '{club_name}'.")
+                return
 
-                # Adjust table style
-                table.auto_set_font_size(False)
-                table.set_fontsize(10)
-                table.auto_set_column_width(col=list(range(len(df.columns))))
-
-                # Apply conditional formatting for PR column
-                cell_dict = table.get_celld()
-                pr_index = columns.index("PR")  # Find the index of the PR column
-                for (row, col), cell in cell_dict.items():
-                    if col == pr_index and row > 0:  # Exclude header row
-                        pr_value = df.iloc[row - 1, pr_index]  # Get PR value
-                        if pr_value <= 50:
-                            cell.set_facecolor("#FF0000")  # Sharp red for top 50
-                        elif pr_value <= 200:
-                            cell.set_facecolor("#FFA500")  # Orange for 51-200
-                        elif pr_value <= 500:
-                            cell.set_facecolor("#FFFF00")  # Yellow for 200-500
-                        elif pr_value <= 1000:
-                            cell.set_facecolor("#ADD8E6")  # Light blue for 500-1000
-                        elif pr_value <= 2000:
-                            cell.set_facecolor("#D397F8")  # Purple for 1001-2000
-
-                for (row, col), cell in cell_dict.items():
-                    if row == 0 or col == 0:
-                        cell.set_text_props(weight="bold")
-
-
-                    #cell.set_height(0.1)  # Adjust the row height (experiment with values for desired size)
-                row_height = 1 / len(df)  # Divide the figure height by the number of rows
-                for (row, col), cell in cell_dict.items():
-                    cell.set_height(row_height)  # Set height dynamically
-
-                # Save the table as an image in memory
-                buffer = BytesIO()
-                plt.savefig(buffer, format="png", bbox_inches="tight")
-                buffer.seek(0)
-                plt.close(fig)
-
-                # Send the image to Discord
-                file = discord.File(fp=buffer, filename="club_table.png")
-                await ctx.send("Applebee's 🍎")
-                await ctx.send(file=file)
+
+            # Render the table, or reuse the last image if the roster has not changed
+            image = await self.render_cached("scoutclub", club_name, players, self.render_scoutclub)
+
+            # Send the image to Discord
+            file = discord.File(fp=BytesIO(image), filename="club_table.png")
+            await ctx.send("Applebee's 🍎")
+            await ctx.send(file=file)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
+
+    @staticmethod
+    def render_scoutclub(players):
+        """Render the full club table with PR colour bands as PNG bytes."""
+        # Combine SP Name and Skills into single columns (SP1 Info, SP2 Info, etc.)
+        processed_players = [
+            (
+                player[0],  # Name
+                f"{player[1]} ({player[2]})",  # SP1 Info
+                f"{player[3]} ({player[4]})",  # SP2 Info
+                f"{player[5]} ({player[6]})",  # SP3 Info
+                f"{player[7]} ({player[8]})",  # SP4 Info
+                f"{player[9]} ({player[10]})",  # SP5 Info
+                player[11],  # Nerf
+                player[12],  # PR
+                player[14],  # Char
+                player[15],  # Tool
+                player[13],  # Last Updated
+            )
+            for player in players
+        ]
+
+        # Define new column headers
+        columns = [
+            "Name", "SP1 Info", "SP2 Info", "SP3 Info", "SP4 Info", "SP5 Info",
+            "Nerf", "PR", "Char", "Tool", "Last Updated"
+        ]
+
+        # Create a DataFrame from the processed data
+        df = pd.DataFrame(processed_players, columns=columns)
+        df = df.sort_values(by = "PR")
+
+        return render_table(df, column_colours={"PR": pr_colour})
+
+
     @commands.command()
     async def scoutclubez(self, ctx, club_name: str):
         """
@@ -288,105 +297,48 @@ class ClubCommands(commands.Cog):
         """
         club_name = club_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Fetch player details for the club
-                cursor.execute(
-                    """
-                    SELECT Name, Nerf, PR, charbats, toolbats, last_updated, nerf_updated, team_name
-                    FROM Player
-                    WHERE Club_Name = %s
-                    """,
-                    (club_name,),
-                )
-                players = cursor.fetchall()
-
-                if not players:
-                    await ctx.send(f"No players found for the club '{club_name}'.")
-                    return
-
-                # Create a DataFrame from the fetched data
-                columns = ["Name", "Nerf", "PR", "Char", "Tool", "Last Updated", "Nerf Updated",
-                        "Team Deck"]
-                df = pd.DataFrame(players, columns=columns)
-                df = df.sort_values(by = "PR")
-
-                # Plot the table using matplotlib
-                fig, ax = plt.subplots(figsize=(5, len(df) * 2 + 1))  # Increase width and dynamic height
-                ax.axis("tight")
-                ax.axis("off")
-                table = ax.table(
-                    cellText=df.values,
-                    colLabels=df.columns,
-                    cellLoc="center",
-                    loc="center",
-                )
+            # Fetch player details for the club
+            players = await self.fetch_roster(club_name, "scoutclubez")
+
+            if not players:
+                await ctx.send(f"No players found for the club '{club_name}'.")
+                return
+
+            # Render the table, or reuse the last image if the roster has not changed
+            image = await self.render_cached("scoutclubez", club_name, players, self.render_scoutclubez)
 
-                # Adjust table style
-                table.auto_set_font_size(False)
-                table.set_fontsize(20)  # Increase font size for better readability
-                table.auto_set_column_width(col=list(range(len(df.columns))))  # Ensure all columns fit
-                
-                cell_dict = table.get_celld()
-                pr_index = columns.index("PR")  # Find the index of the PR column
-                for (row, col), cell in cell_dict.items():
-                    if col == pr_index and row > 0:  # Exclude header row
-                        pr_value = df.iloc[row - 1, pr_index]  # Get PR value
-                        if pr_value <= 50:
-                            cell.set_facecolor("#FF0000")  # Sharp red for top 50
-                        elif pr_value <= 200:
-                            cell.set_facecolor("#FFA500")  # Orange for 51-200
-                        elif pr_value <= 500:
-                            cell.set_facecolor("#FFFF00")  # Yellow for 200-500
-                        elif pr_value <= 1000:
-                            cell.set_facecolor("#ADD8E6")  # Light blue for 500-1000
-                        elif pr_value <= 2000:
-                            cell.set_facecolor("#D397F8")  # Purple for 1001-2000
-
-                for (row, col), cell in cell_dict.items():
-                    if row == 0 or col == 0:
-                        cell.set_text_props(weight="bold")
-                            
-                    #cell.set_height(0.1)  # Adjust the row height (experiment with values for desired size)
-                row_height = 1 / len(df)  # Divide the figure height by the number of rows
-                for (row, col), cell in cell_dict.items():
-                    cell.set_height(row_height)  # Set height dynamically
-
-                # Save the table as an image in memory with minimal borders
-                buffer = BytesIO()
-                plt.savefig(buffer, format="png", bbox_inches="tight", pad_inches=0.1, dpi=200)  # Adjust DPI for higher quality
-                buffer.seek(0)
-                plt.close(fig)
-
-                # Send the image to Discord
-                file = discord.File(fp=buffer, filename="club_table.png")
-                await ctx.send(file=file)
+            # Send the image to Discord
+            file = discord.File(fp=BytesIO(image), filename="club_table.png")
+            await ctx.send(file=file)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
+
+    @staticmethod
+    def render_scoutclubez(players):
+        """Render the compact club table with PR colour bands as PNG bytes."""
+        # Create a DataFrame from the fetched data
+        columns = ["Name", "Nerf", "PR", "Char", "Tool", "Last Updated", "Nerf Updated",
+                "Team Deck"]
+        df = pd.DataFrame(players, columns=columns)
+        df = df.sort_values(by = "PR")
+
+        return render_table(df, font_size=24, column_colours={"PR": pr_colour})
+
+
     @commands.command()
     async def scoutclubtext(self, ctx, club_name:str):
         club_name = club_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Fetch player details for the club
-                cursor.execute(
-                    """
-                    SELECT Name, Nerf, PR, team_name
-                    FROM Player
-                    WHERE Club_Name = %s
-                    ORDER BY PR ASC;
-                    """,
-                    (club_name,),
-                )
-                players = cursor.fetchall()
+            # Fetch player details for the club
+            players = await self.fetch_roster(club_name, "scoutclubtext")
+
+            if not players:
+                await ctx.send(f"No players found for the club '{club_name}'.")
+                return
 
-                if not players:
-                    await ctx.send(f"No players found for the club '{club_name}'.")
-                    return
-                
-                player_details = "\n".join(
+            player_details = "\n".join(
                 f"**Name**: {player[0]}, **Nerf**: {player[1]}, **PR**: {player[2]}, **Team**: {player[3]}"
                 for player in players
             )
@@ -397,57 +349,79 @@ class ClubCommands(commands.Cog):
             # Send the message
             await ctx.send(message)
 
-                
+
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
     @commands.command()
     async def addtoclub(self, ctx, club_name: str, *, args: str = ""):
-        player_commands_cog = self.bot.get_cog("PlayerCommands")
+        """Move the named players into a club, adding the ones not in the database yet."""
         club_name = club_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-
-                # Process player names from `args`
-                if args:
-                    parsed_args = shlex.split(args)  # Split the player names
-
-                    for player_name in parsed_args:
-                        player_name = player_name.lower()
-                        # Check if the player exists
-                        cursor.execute(
-                            """
-                            SELECT Name
-                            FROM Player
-                            WHERE Name = %s
-                            """,
-                            (player_name,),
-                        )
-                        player = cursor.fetchone()
-
-                        if player:
-                            if player_commands_cog:
-                                await player_commands_cog.updateclub(ctx, player_name, club_name)
-                                await ctx.send(f"Updated **{player_name}** to club **{club_name}**.")
-                            else:
-                                await ctx.send("Error: `PlayerCommands` cog is not loaded.")
-                                return
-                        else:
-                            if player_commands_cog:
-                                await player_commands_cog.addplayer(ctx, player_name, args=f"club={club_name}")
-                                await ctx.send(f"Added player **{player_name}** to club **{club_name}**.")
-                            else:
-                                await ctx.send("Error: `PlayerCommands` cog is not loaded.")
-                                return
-
-                    self.connection.commit()
-                else:
-                    await ctx.send("No player names were provided.")
+            names = list(dict.fromkeys(name.lower() for name in shlex.split(args)))
+            if not names:
+                await ctx.send("No player names were provided.")
+                return
+            skipped = [name for name in names if "$" in name]
+            names = [name for name in names if "$" not in name]
+
+            moved, added = [], []
+            if names:
+                moved, added = await self.pool.run(self.move_roster, club_name, names)
+
+            lines = []
+            if moved:
+                lines.append(f"**Moved {len(moved)} players to {club_name}:** " + ", ".join(moved))
+            if added:
+                lines.append(f"**Added {len(added)} new players to {club_name}:** " + ", ".join(added))
+            if skipped:
+                lines.append("**Skipped** (replace $ with S): " + ", ".join(skipped))
+            await ctx.send("\n".join(lines)[:2000])
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
+    def move_roster(self, club_name, names):
+        """
+        Create the club if needed and upsert every player into it, all in one statement.
+        New players get addplayer's defaults. Returns the names moved and the names added.
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    WITH new_club AS (
+                        INSERT INTO Club (Club_Name)
+                        SELECT %(club)s
+                        WHERE NOT EXISTS (SELECT 1 FROM Club WHERE Club_Name = %(club)s)
+                    ), previous AS (
+                        SELECT Name, Club_Name FROM Player WHERE Name = ANY(%(names)s)
+                    ), upserted AS (
+                        INSERT INTO Player (
+                            Name, Club_Name, SP1_Name, SP1_Skills,
+                            SP2_Name, SP2_Skills, SP3_Name, SP3_Skills,
+                            SP4_Name, SP4_Skills, SP5_Name, SP5_Skills,
+                            Nerf, PR, last_updated, nerf_updated, team_name, charbats, toolbats
+                        )
+                        SELECT name, %(club)s, '', '', '', '', '', '', '', '', '', '',
+                               '', 9999, CURRENT_DATE, CURRENT_DATE, '', 0, 0
+                        FROM unnest(%(names)s::text[]) AS name
+                        ON CONFLICT (Name) DO UPDATE SET Club_Name = EXCLUDED.Club_Name
+                        RETURNING Name
+                    )
+                    SELECT u.Name, p.Club_Name
+                    FROM upserted u
+                    LEFT JOIN previous p ON p.Name = u.Name
+                    """,
+                    {"club": club_name, "names": names},
+                )
+                rows = cursor.fetchall()
+            connection.commit()
+        old_clubs = [old_club for _, old_club in rows if old_club is not None]
+        self.roster_cache.invalidate(players=names, clubs=old_clubs + [club_name])
+        moved = [name for name, old_club in rows if old_club is not None]
+        added = [name for name, old_club in rows if old_club is None]
+        return moved, added
+
 
     @commands.command()
     async def scoutclubtrial(self, ctx, club_name: str):
@@ -455,118 +429,65 @@ class ClubCommands(commands.Cog):
         Fetch player details for a specific club and return them as a paginated table image
         """
         club_name = club_name.lower()
-        rows_per_page = 30  # Number of rows per page
         try:
-            with self.connection.cursor() as cursor:
-                # Fetch player details for the club
-                cursor.execute(
-                    """
-                    SELECT Name, sp1_name, sp1_skills, sp2_name, sp2_skills, sp3_name, sp3_skills, sp4_name, sp4_skills, sp5_name,
-                    sp5_skills, Nerf, PR, Most_Common_Batting_Skill, last_updated
-                    FROM Player
-                    WHERE Club_Name = %s
-                    """,
-                    (club_name,),
-                )
-                players = cursor.fetchall()
-
-                if not players:
-                    await ctx.send(f"No players found for the club '{club_name}'.")
-                    return
-
-                # Combine SP Name and Skills into single columns (SP1 Info, SP2 Info, etc.)
-                processed_players = [
-                    (
-                        player[0],  # Name
-                        f"{player[1]} ({player[2]})",  # SP1 Info
-                        f"{player[3]} ({player[4]})",  # SP2 Info
-                        f"{player[5]} ({player[6]})",  # SP3 Info
-                        f"{player[7]} ({player[8]})",  # SP4 Info
-                        f"{player[9]} ({player[10]})",  # SP5 Info
-                        player[11],  # Nerf
-                        player[12],  # PR
-                        player[13],  # Batting Skill
-                        player[14],  # Last Updated
-                    )
-                    for player in players
-                ]
-
-                # Define new column headers
-                columns = [
-                    "Name", "SP1 Info", "SP2 Info", "SP3 Info", "SP4 Info", "SP5 Info",
-                    "Nerf", "PR", "Batting Skill", "Last Updated"
-                ]
-
-                # Create a DataFrame from the processed data
-                df = pd.DataFrame(processed_players, columns=columns)
-                df = df.sort_values(by="PR")
-
-                # Paginate the table
-                total_pages = (len(df) + rows_per_page - 1) // rows_per_page
-                for page in range(total_pages):
-                    start = page * rows_per_page
-                    end = start + rows_per_page
-                    df_page = df.iloc[start:end]
-
-                    # Plot the table using matplotlib
-                    fig, ax = plt.subplots(figsize=(24, len(df_page) * 0.5 + 1))  # Dynamic height based on rows
-                    ax.axis("tight")
-                    ax.axis("off")
-                    table = ax.table(
-                        cellText=df_page.values,
-                        colLabels=df_page.columns,
-                        cellLoc="center",
-                        loc="center",
-                    )
-
-                    # Adjust table style
-                    table.auto_set_font_size(False)
-                    table.set_fontsize(10)
-                    table.auto_set_column_width(col=list(range(len(df_page.columns))))
-
-                    # Apply conditional formatting for PR column
-                    cell_dict = table.get_celld()
-                    pr_index = columns.index("PR")  # Find the index of the PR column
-                    for (row, col), cell in cell_dict.items():
-                        if col == pr_index and row > 0:  # Exclude header row
-                            pr_value = df_page.iloc[row - 1, pr_index]  # Get PR value
-                            if pr_value <= 50:
-                                cell.set_facecolor("#FF0000")  # Sharp red for top 50
-                            elif pr_value <= 200:
-                                cell.set_facecolor("#FFA500")  # Orange for 51-200
-                            elif pr_value <= 500:
-                                cell.set_facecolor("#FFFF00")  # Yellow for 200-500
-                            elif pr_value <= 1000:
-                                cell.set_facecolor("#ADD8E6")  # Light blue for 500-1000
-                            elif pr_value <= 2000:
-                                cell.set_facecolor("#D397F8")  # Purple for 1001-2000
-
-                    for (row, col), cell in cell_dict.items():
-                        if row == 0 or col == 0:
-                            cell.set_text_props(weight="bold")
-
-                        # Adjust the row height dynamically
-                        row_height = 1 / len(df_page)
-                        cell.set_height(row_height)
-
-                    # Save the table as an image in memory
-                    buffer = BytesIO()
-                    plt.savefig(buffer, format="png", bbox_inches="tight")
-                    buffer.seek(0)
-                    plt.close(fig)
-
-                    # Send the image to Discord
-                    file = discord.File(fp=buffer, filename=f"club_table_page_{page + 1}.png")
-                    await ctx.send(f"**Page {page + 1} of {total_pages}:**", file=file)
-
-                    buffer.close()
+            # Fetch player details for the club
+            players = await self.fetch_roster(club_name, "scoutclubtrial")
+
+            if not players:
+                await ctx.send(f"No players found for the club '{club_name}'.")
+                return
+
+            # Render each page when it is first shown, or reuse it if the roster has not changed
+            paginator = TablePaginator(
+                lambda page: self.render_cached("scoutclubtrial", club_name, players, self.render_scoutclubtrial, page),
+                page_count(len(players), self.SCOUTCLUBTRIAL_ROWS_PER_PAGE),
+                "club_table",
+                author_id=ctx.author.id,
+            )
+            await paginator.start(ctx)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
 
+    SCOUTCLUBTRIAL_ROWS_PER_PAGE = 30
+
+    @staticmethod
+    def render_scoutclubtrial(players, page, rows_per_page=SCOUTCLUBTRIAL_ROWS_PER_PAGE):
+        """Render page `page` (0-based) of the club table, at most `rows_per_page` rows, as PNG bytes."""
+        # Combine SP Name and Skills into single columns (SP1 Info, SP2 Info, etc.)
+        processed_players = [
+            (
+                player[0],  # Name
+                f"{player[1]} ({player[2]})",  # SP1 Info
+                f"{player[3]} ({player[4]})",  # SP2 Info
+                f"{player[5]} ({player[6]})",  # SP3 Info
+                f"{player[7]} ({player[8]})",  # SP4 Info
+                f"{player[9]} ({player[10]})",  # SP5 Info
+                player[11],  # Nerf
+                player[12],  # PR
+                player[13],  # Batting Skill
+                player[14],  # Last Updated
+            )
+            for player in players
+        ]
+
+        # Define new column headers
+        columns = [
+            "Name", "SP1 Info", "SP2 Info", "SP3 Info", "SP4 Info", "SP5 Info",
+            "Nerf", "PR", "Batting Skill", "Last Updated"
+        ]
+
+        # Create a DataFrame from the processed data
+        df = pd.DataFrame(processed_players, columns=columns)
+        df = df.sort_values(by="PR")
+
+        # Only the requested page is drawn
+        return render_table_page(df, page, rows_per_page, column_colours={"PR": pr_colour})
+
+
+
 
 async def setup(bot):
-    connection = bot.connection  # Retrieve the connection from the bot instance
-    await bot.add_cog(ClubCommands(bot, connection))
\ No newline at end of file
+    pool = bot.pool  # Retrieve the shared connection pool from the bot instance
+    await bot.add_cog(ClubCommands(bot, pool, bot.roster_cache, bot.image_cache))
\ No newline at end of file
@@ -0,0 +1,185 @@
+import asyncio
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+
+import psycopg2
+from psycopg2 import extensions
+
+from bot_commands.executors import run_blocking
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections shared by both bots.
+
+    Connections are opened lazily up to `size`. Every checkout is health checked
+    (closed connections are replaced, long-idle ones are pinged) and every
+    checkin rolls back whatever transaction the borrower left open, so one
+    failed statement can no longer poison the connection for other commands.
+
+    Async callers wait for a free connection on the event loop (`_slots`), so a
+    burst of commands queues there instead of parking executor threads in getconn.
+    Only run() and acquire() take a slot: connection() is for the synchronous helpers
+    run() executes, so every database call from a coroutine goes through run().
+    """
+
+    def __init__(self, connect_kwargs, size=10, timeout=10, max_idle=300):
+        self.connect_kwargs = connect_kwargs
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._last_used = {}
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._slots = asyncio.Semaphore(size)
+
+    @classmethod
+    def from_url(cls, database_url, **kwargs):
+        result = urlparse(database_url)
+        connect_kwargs = {
+            "database": result.path[1:],
+            "user": result.username,
+            "password": result.password,
+            "host": result.hostname,
+            "port": result.port,
+        }
+        return cls(connect_kwargs, **kwargs)
+
+    def _open(self):
+        return psycopg2.connect(**self.connect_kwargs)
+
+    def _discard(self, connection):
+        self._last_used.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._opened -= 1
+
+    def _is_healthy(self, connection):
+        if connection.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(connection), 0)
+        if idle_for < self.max_idle:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, blocking for at most `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._opened < self.size
+                    if can_open:
+                        self._opened += 1
+                if can_open:
+                    try:
+                        return self._open()
+                    except Exception:
+                        with self._lock:
+                            self._opened -= 1
+                        raise
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available after {timeout}s.")
+                try:
+                    connection = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    raise PoolTimeout(f"No database connection available after {timeout}s.")
+
+            if self._is_healthy(connection):
+                return connection
+            self._discard(connection)
+
+    def putconn(self, connection):
+        """Return a connection, rolling back any transaction the borrower left open."""
+        if connection.closed:
+            self._discard(connection)
+            return
+        try:
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        self._last_used[id(connection)] = time.monotonic()
+        self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection from a synchronous helper running inside run(). It takes no
+        slot of its own, so it refuses to run on the event loop thread, where it would
+        block the loop and skip the queue in `_slots`.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("ConnectionPool.connection() called on the event loop; use pool.run()")
+        connection = self.getconn()
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a connection from a command handler without blocking the event loop."""
+        async with self._slots:
+            connection = await run_blocking(self.getconn)
+            try:
+                yield connection
+            finally:
+                await run_blocking(self.putconn, connection)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a synchronous database helper, which borrows through connection(), on the
+        blocking executor once a connection is free. Helpers must not check out a second
+        connection while holding one.
+        """
+        async with self._slots:
+            return await run_blocking(func, *args, **kwargs)
+
+    def _fetch(self, query, params, one):
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchone() if one else cursor.fetchall()
+
+    async def fetchall(self, query, params=()):
+        """Run a read-only query on the blocking executor and return all rows."""
+        return await self.run(self._fetch, query, params, False)
+
+    async def fetchone(self, query, params=()):
+        """Run a read-only query on the blocking executor and return the first row."""
+        return await self.run(self._fetch, query, params, True)
+
+    def closeall(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
@@ -0,0 +1,103 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Threads for psycopg2 calls and other blocking I/O (OCR requests, reading sheets).
+# More threads than database connections: database work waits for a free connection
+# on the event loop (ConnectionPool.run), and the spare threads keep OCR and sheet
+# reads moving while every connection is busy.
+blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BLOCKING_WORKERS", str(int(os.getenv("DB_POOL_SIZE", "10")) + 8))),
+    thread_name_prefix="blocking",
+)
+
+# Processes for matplotlib / Pillow rendering, started by start_render_workers()
+_render_executor = None
+
+
+def _warm_render_worker():
+    """Pay the import and font loading cost once per worker instead of once per render."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+    from bot_commands.tables import load_font
+    for size in (18, 24):
+        load_font(size)
+        load_font(size, bold=True)
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def start_render_workers(workers=None):
+    """
+    Start the render process pool and wait until every worker is warm.
+
+    Call this first thing at startup: workers are forked, so the parent should not be
+    running any other threads yet. Render functions must be picklable, i.e. defined at
+    module level or as static methods.
+    """
+    global _render_executor
+    workers = workers or int(os.getenv("RENDER_WORKERS", "2"))
+    context = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    _render_executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_warm_render_worker
+    )
+    for future in [_render_executor.submit(_worker_pid) for _ in range(workers)]:
+        future.result()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call (database, HTTP, file parsing) on the shared thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_render(func, *args, **kwargs):
+    """
+    Run a rendering function in a worker process and return its result.
+    Falls back to the thread pool when no render workers were started (e.g. in scripts).
+    """
+    if _render_executor is None:
+        return await run_blocking(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    try:
+        return await loop.run_in_executor(_render_executor, call)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); replace the pool and try once more
+        start_render_workers(_render_executor._max_workers)
+        return await loop.run_in_executor(_render_executor, call)
+
+
+async def monitor_loop_lag(threshold=0.25, interval=1.0):
+    """
+    Report every time the event loop wakes up more than `threshold` seconds late.
+
+    A late wake-up means something ran on the loop thread for that long, which also
+    stalls both bots' gateway heartbeats. Set LOOP_DEBUG=1 to have asyncio name the
+    slow callback as well.
+    """
+    loop = asyncio.get_running_loop()
+    if os.getenv("LOOP_DEBUG"):
+        loop.set_debug(True)
+        loop.slow_callback_duration = threshold
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = loop.time() - expected
+        if lag > threshold:
+            print(f"Event loop blocked for {lag:.3f}s (threshold {threshold}s)")
+
+
+def shutdown():
+    blocking_executor.shutdown(wait=False, cancel_futures=True)
+    if _render_executor is not None:
+        _render_executor.shutdown(wait=False, cancel_futures=True)
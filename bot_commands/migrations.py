@@ -0,0 +1,164 @@
+# Arbitrary key for the advisory lock that keeps two processes from migrating at once
+MIGRATION_LOCK_KEY = 7265001
+
+# Versioned schema changes, applied in order. Never edit a released migration, add a new one.
+MIGRATIONS = [
+    (
+        1,
+        "indexes for analyse, analyse_date and the scout commands",
+        [
+            # analyse: WHERE opponent_club = %s GROUP BY battle_date, player_club
+            """
+            CREATE INDEX IF NOT EXISTS club_records_opponent_club_idx
+            ON club_records (opponent_club, battle_date, player_club)
+            """,
+            # analyse_date: WHERE battle_date = %s AND LOWER(player_club) = %s AND LOWER(opponent_club) = %s
+            """
+            CREATE INDEX IF NOT EXISTS club_records_date_lower_clubs_idx
+            ON club_records (battle_date, LOWER(player_club), LOWER(opponent_club))
+            """,
+            # scoutclub, scoutclubez, scoutclubtext, scoutclubtrial, deleteclub: WHERE Club_Name = %s
+            """
+            CREATE INDEX IF NOT EXISTS player_club_name_idx
+            ON Player (Club_Name)
+            """,
+        ],
+    ),
+    (
+        2,
+        "club_matchup_rollup table of W/L/D counts for analyse and analyse_date",
+        [
+            # Backfilled from the existing history, then kept up to date by BattleLog.merge_log_rows
+            """
+            CREATE TABLE IF NOT EXISTS club_matchup_rollup AS
+            SELECT
+                battle_date,
+                LOWER(player_club) AS player_club,
+                LOWER(opponent_club) AS opponent_club,
+                opponent_name,
+                opponent_sp_number,
+                COUNT(*) FILTER (WHERE result = 'w') AS wins,
+                COUNT(*) FILTER (WHERE result = 'l') AS losses,
+                COUNT(*) FILTER (WHERE result = 'd') AS draws,
+                COUNT(*) AS battles,
+                COALESCE(SUM(player_sp_number), 0) AS player_sp_total
+            FROM club_records
+            GROUP BY battle_date, LOWER(player_club), LOWER(opponent_club), opponent_name, opponent_sp_number
+            """,
+            # analyse_date: WHERE battle_date = %s AND player_club = %s AND opponent_club = %s
+            """
+            ALTER TABLE club_matchup_rollup
+            ADD PRIMARY KEY (battle_date, player_club, opponent_club, opponent_name, opponent_sp_number)
+            """,
+            # analyse: WHERE opponent_club = %s GROUP BY battle_date, player_club
+            """
+            CREATE INDEX IF NOT EXISTS club_matchup_rollup_opponent_club_idx
+            ON club_matchup_rollup (opponent_club, battle_date, player_club)
+            """,
+        ],
+    ),
+    (
+        3,
+        "ocr_cache table of Read API lines keyed by screenshot hash",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                image_hash TEXT PRIMARY KEY,
+                lines TEXT[] NOT NULL,
+                byte_size INTEGER NOT NULL,
+                last_used TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+            """,
+            # OCRCache eviction walks the cache from most to least recently used
+            """
+            CREATE INDEX IF NOT EXISTS ocr_cache_last_used_idx
+            ON ocr_cache (last_used)
+            """,
+        ],
+    ),
+    (
+        4,
+        "submission history for rankedpitchstats, like rankedbatstats",
+        [
+            # Rows already stored are the user's single existing submission
+            """
+            ALTER TABLE rankedpitchstats
+            ADD COLUMN IF NOT EXISTS submission_time TIMESTAMP NOT NULL DEFAULT NOW()
+            """,
+            # Drop the old one-pair-per-user uniqueness on (DISCORDID, PLAYERNAME, TIMING),
+            # whether it was declared as a constraint or created as a bare unique index
+            """
+            DO $$
+            DECLARE
+                old_key RECORD;
+            BEGIN
+                FOR old_key IN
+                    SELECT i.indexrelid::regclass AS index_name, c.conname
+                    FROM pg_index i
+                    LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid
+                    WHERE i.indrelid = 'rankedpitchstats'::regclass
+                      AND i.indisunique
+                      AND (
+                          SELECT array_agg(LOWER(a.attname::text) ORDER BY a.attname)
+                          FROM pg_attribute a
+                          WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                      ) = ARRAY['discordid', 'playername', 'timing']
+                LOOP
+                    IF old_key.conname IS NOT NULL THEN
+                        EXECUTE format('ALTER TABLE rankedpitchstats DROP CONSTRAINT %I', old_key.conname);
+                    ELSE
+                        EXECUTE format('DROP INDEX %s', old_key.index_name);
+                    END IF;
+                END LOOP;
+            END
+            $$
+            """,
+            # pitchers: ON CONFLICT (DISCORDID, PLAYERNAME, TIMING, submission_time). Leading
+            # with (DISCORDID, submission_time) also serves the trim, rankedpitch and trends.
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS rankedpitchstats_submission_key
+            ON rankedpitchstats (DISCORDID, submission_time, PLAYERNAME, TIMING)
+            """,
+            # batters: trim_old_submissions and the latest/recent submission lookups
+            """
+            CREATE INDEX IF NOT EXISTS rankedbatstats_discordid_submission_time_idx
+            ON rankedbatstats (DISCORDID, submission_time)
+            """,
+        ],
+    ),
+]
+
+
+def run_migrations(pool):
+    """Apply every migration that has not been recorded in schema_migrations yet."""
+    with pool.connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+                );
+                """
+            )
+        connection.commit()
+
+        applied = []
+        for version, description, statements in MIGRATIONS:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_KEY,))
+                cursor.execute("SELECT 1 FROM schema_migrations WHERE version = %s;", (version,))
+                if cursor.fetchone():
+                    connection.rollback()
+                    continue
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+                    (version, description),
+                )
+            connection.commit()
+            applied.append(version)
+            print(f"Applied migration {version}: {description}")
+        return applied
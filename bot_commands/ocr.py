@@ -0,0 +1,381 @@
+import abc
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import random
+import threading
+from io import BytesIO
+
+import aiohttp
+
+from bot_commands.executors import run_blocking
+from bot_commands.preprocess import DEFAULT_MAX_SIDE, preprocess_image, stitch_vertically
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OCRError(Exception):
+    """Raised when a screenshot could not be read before the deadline."""
+
+
+def _centre_y(bounding_box):
+    """Vertical centre of a Read API boundingBox (x1, y1, ..., x4, y4), or None without one."""
+    if not bounding_box:
+        return None
+    ys = bounding_box[1::2]
+    return (min(ys) + max(ys)) / 2
+
+
+def _retry_after(headers, default):
+    """Seconds from a Retry-After header, or `default` if it is missing or not a number."""
+    try:
+        return max(float(headers.get("Retry-After")), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+class OCRBackend(abc.ABC):
+    """
+    Turns screenshot bytes into text lines in reading order. The bat and pitch cogs only
+    talk to this interface; backend_from_env() picks the implementation.
+    """
+
+    @abc.abstractmethod
+    async def read_layout(self, image_data):
+        """Return (text, y) for every line, y being the line's vertical centre in pixels."""
+
+    async def read_lines(self, image_data):
+        return [text for text, _ in await self.read_layout(image_data)]
+
+    async def close(self):
+        pass
+
+
+class ReadClient(OCRBackend):
+    """
+    Async client for the Azure Read API shared by the bat and pitch cogs.
+
+    One aiohttp session is reused for every request. 429 and 5xx responses (and dropped
+    connections) are retried up to `max_retries` times, waiting for Retry-After when the
+    service sends one and backing off exponentially otherwise. Polling follows Retry-After
+    too, starting at `min_poll` and growing to `max_poll` seconds. Every read gives up with OCRError after `deadline` seconds in total.
+    """
+
+    def __init__(self, endpoint, api_key, deadline=60, max_retries=3, min_poll=0.25, max_poll=2):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self._session = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            endpoint=os.getenv("AZURE_ENDPOINT", "") + "/vision/v3.2/read/analyze",
+            api_key=os.getenv("AZURE_API_KEY"),
+            deadline=float(os.getenv("OCR_DEADLINE", "60")),
+        )
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"Ocp-Apim-Subscription-Key": self.api_key or ""},
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+        return self._session
+
+    async def _request(self, method, url, **kwargs):
+        """Send one request, retrying 429/5xx and connection errors. Returns (status, headers, json)."""
+        for attempt in range(self.max_retries + 1):
+            backoff = min(2 ** attempt * 0.5, 8) + random.uniform(0, 0.25)
+            try:
+                async with self._get_session().request(method, url, **kwargs) as response:
+                    if response.status not in RETRYABLE_STATUSES:
+                        body = await response.json(content_type=None) if response.status == 200 else None
+                        return response.status, response.headers, body
+                    delay = _retry_after(response.headers, backoff)
+                    error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = backoff
+                error = repr(e)
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+        raise OCRError(f"{method} {url} failed after {self.max_retries + 1} attempts: {error}")
+
+    async def _read(self, image_data):
+        status, headers, _ = await self._request(
+            "POST", self.endpoint, data=image_data, headers={"Content-Type": "application/octet-stream"}
+        )
+        if status != 202:
+            raise OCRError(f"Read request was rejected with HTTP {status}")
+        operation_location = headers["Operation-Location"]
+
+        interval = _retry_after(headers, self.min_poll)
+        while True:
+            await asyncio.sleep(interval)
+            status, headers, result = await self._request("GET", operation_location)
+            if status != 200:
+                raise OCRError(f"Read result request failed with HTTP {status}")
+            if result.get("status") == "succeeded":
+                return [
+                    (line["text"], _centre_y(line.get("boundingBox")))
+                    for read_result in result["analyzeResult"]["readResults"]
+                    for line in read_result["lines"]
+                ]
+            if result.get("status") == "failed":
+                raise OCRError("The Read operation failed")
+            interval = _retry_after(headers, min(interval * 1.5, self.max_poll))
+
+    async def read_layout(self, image_data):
+        try:
+            return await asyncio.wait_for(self._read(image_data), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise OCRError(f"OCR did not finish within {self.deadline}s")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class ReplayBackend(OCRBackend):
+    """
+    Serves recorded [text, y] lines from `<fixture_dir>/<sha256 of image>.json` without any
+    network calls, so the submission pipeline can be run and timed offline. Record the fixtures
+    once with RecordingBackend. Older fixtures that hold plain text lines replay with y = None.
+    """
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+
+    def fixture_path(self, image_data):
+        return os.path.join(self.fixture_dir, hashlib.sha256(image_data).hexdigest() + ".json")
+
+    async def read_layout(self, image_data):
+        path = self.fixture_path(image_data)
+        if not os.path.exists(path):
+            raise OCRError(f"No recorded OCR output for this image ({os.path.basename(path)})")
+        with open(path, encoding="utf-8") as f:
+            lines = json.load(f)
+        return [(line, None) if isinstance(line, str) else (line[0], line[1]) for line in lines]
+
+
+class RecordingBackend(ReplayBackend):
+    """Reads through another backend and saves every result as a replay fixture."""
+
+    def __init__(self, backend, fixture_dir):
+        super().__init__(fixture_dir)
+        self.backend = backend
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    async def read_layout(self, image_data):
+        layout = await self.backend.read_layout(image_data)
+        with open(self.fixture_path(image_data), "w", encoding="utf-8") as f:
+            json.dump(layout, f, ensure_ascii=False, indent=1)
+        return layout
+
+    async def close(self):
+        await self.backend.close()
+
+
+class TesseractBackend(OCRBackend):
+    """Local OCR with Tesseract. Needs the optional pytesseract package and the tesseract binary."""
+
+    def __init__(self, lang="eng"):
+        try:
+            import pytesseract
+        except ImportError:
+            raise OCRError("OCR_BACKEND=local needs pytesseract: pip install pytesseract")
+        self.pytesseract = pytesseract
+        self.lang = lang
+
+    def _read(self, image_data):
+        from PIL import Image
+
+        data = self.pytesseract.image_to_data(
+            Image.open(BytesIO(image_data)), lang=self.lang, output_type=self.pytesseract.Output.DICT
+        )
+        # Tesseract reports words; join them back into lines
+        lines = {}
+        for i, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            words, top, bottom = lines.get(key, ([], data["top"][i], 0))
+            words.append(word)
+            lines[key] = (words, min(top, data["top"][i]), max(bottom, data["top"][i] + data["height"][i]))
+        return [(" ".join(words), (top + bottom) / 2) for words, top, bottom in lines.values()]
+
+    async def read_layout(self, image_data):
+        return await run_blocking(self._read, image_data)
+
+
+def backend_from_env():
+    """
+    OCR_BACKEND selects http (the Azure Read API, default), replay (fixtures in
+    OCR_FIXTURES) or local (Tesseract). With OCR_RECORD set to a directory, every result
+    of the selected backend is also saved there as a replay fixture.
+    """
+    kind = os.getenv("OCR_BACKEND", "http")
+    if kind == "http":
+        backend = ReadClient.from_env()
+    elif kind == "replay":
+        backend = ReplayBackend(os.getenv("OCR_FIXTURES", "ocr_fixtures"))
+    elif kind == "local":
+        backend = TesseractBackend(os.getenv("OCR_LANG", "eng"))
+    else:
+        raise ValueError(f"Unknown OCR_BACKEND {kind!r}, expected http, replay or local")
+
+    record_dir = os.getenv("OCR_RECORD")
+    if record_dir:
+        backend = RecordingBackend(backend, record_dir)
+    return backend
+
+
+class OCRCache:
+    """
+    Read API output stored in Postgres by the SHA-256 of the screenshot bytes and the
+    settings it was read with, so a re-submitted screenshot is never sent to OCR twice but
+    a change of backend or preprocessing reads it afresh. Entries are dropped least
+    recently used first once the stored lines exceed `max_bytes`.
+
+    Writes only add to a running total of the stored bytes; the table is walked to evict
+    when that total passes `max_bytes`, and then trimmed to `low_water` of the cap so the
+    next few writes do not evict again. The total is re-read from the table on every
+    eviction, which also corrects for writes from other processes.
+    """
+
+    def __init__(self, pool, max_bytes=50 * 1024 * 1024, low_water=0.9):
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        # Bytes stored as of the last eviction plus every write since; None until the first write
+        self._stored_bytes = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def image_hash(image_data, settings=()):
+        digest = hashlib.sha256(image_data)
+        digest.update(repr(tuple(settings)).encode())
+        return digest.hexdigest()
+
+    def _get(self, image_hash):
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE ocr_cache SET last_used = NOW() WHERE image_hash = %s RETURNING lines;",
+                    (image_hash,),
+                )
+                row = cursor.fetchone()
+            connection.commit()
+        return row[0] if row else None
+
+    def _set(self, image_hash, lines):
+        byte_size = sum(len(line.encode()) for line in lines)
+        with self._lock:
+            if self._stored_bytes is not None:
+                self._stored_bytes += byte_size
+            evict = self._stored_bytes is None or self._stored_bytes > self.max_bytes
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO ocr_cache (image_hash, lines, byte_size)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (image_hash) DO UPDATE
+                    SET lines = EXCLUDED.lines, byte_size = EXCLUDED.byte_size, last_used = NOW();
+                    """,
+                    (image_hash, lines, byte_size),
+                )
+                if evict:
+                    # Evict everything past the low-water mark, least recently used first,
+                    # and return what is left
+                    cursor.execute(
+                        """
+                        WITH ranked AS (
+                            SELECT image_hash, byte_size,
+                                   SUM(byte_size) OVER (ORDER BY last_used DESC, image_hash) AS kept_bytes
+                            FROM ocr_cache
+                        ), evicted AS (
+                            DELETE FROM ocr_cache
+                            USING ranked
+                            WHERE ocr_cache.image_hash = ranked.image_hash AND ranked.kept_bytes > %s
+                            RETURNING ocr_cache.byte_size
+                        )
+                        SELECT (SELECT COALESCE(SUM(byte_size), 0) FROM ranked)
+                             - (SELECT COALESCE(SUM(byte_size), 0) FROM evicted);
+                        """,
+                        (int(self.max_bytes * self.low_water),),
+                    )
+                    stored_bytes = cursor.fetchone()[0]
+            connection.commit()
+        if evict:
+            with self._lock:
+                self._stored_bytes = stored_bytes
+
+    async def get(self, image_data, settings=()):
+        return await self.pool.run(self._get, self.image_hash(image_data, settings))
+
+    async def set(self, image_data, lines, settings=()):
+        # An empty read is more likely a bad screenshot than a real result; retry it next time
+        if lines:
+            await self.pool.run(self._set, self.image_hash(image_data, settings), lines)
+
+
+class ScreenshotReader:
+    """
+    Everything between the attachment bytes and their OCR lines, shared by the bat and pitch
+    cogs: the OCRCache lookup by original bytes and read settings, preprocessing, and the
+    backend call.
+
+    With `stitch` on, read_group() stacks the uncached screenshots of a group into one
+    canvas, OCRs it once, and hands every line back to the screenshot it came from by its
+    vertical position.
+    """
+
+    def __init__(self, backend, cache, crop=None, max_side=DEFAULT_MAX_SIDE, stitch=False):
+        self.backend = backend
+        self.cache = cache
+        self.crop = crop
+        self.max_side = max_side
+        self.stitch = stitch
+        # Part of every cache key: lines read with another backend, crop or size are not reused
+        self.cache_settings = (type(backend).__name__, crop, max_side)
+
+    async def _prepare(self, image_data):
+        return await run_blocking(preprocess_image, image_data, self.crop, self.max_side)
+
+    async def read(self, image_data):
+        """OCR one screenshot, reusing the stored result for a repeat upload."""
+        lines = await self.cache.get(image_data, self.cache_settings)
+        if lines is None:
+            lines = await self.backend.read_lines(await self._prepare(image_data))
+            await self.cache.set(image_data, lines, self.cache_settings)
+        return lines
+
+    async def read_group(self, images):
+        """OCR a list of screenshots and return one list of lines per screenshot."""
+        if not self.stitch or len(images) < 2:
+            return list(await asyncio.gather(*(self.read(image) for image in images)))
+
+        results = list(await asyncio.gather(*(self.cache.get(image, self.cache_settings) for image in images)))
+        missing = [i for i, lines in enumerate(results) if lines is None]
+        if len(missing) < 2:
+            for i in missing:
+                results[i] = await self.read(images[i])
+            return results
+
+        prepared = await asyncio.gather(*(self._prepare(images[i]) for i in missing))
+        canvas, offsets = await run_blocking(stitch_vertically, prepared)
+        sections = [[] for _ in missing]
+        for text, y in await self.backend.read_layout(canvas):
+            if y is None:
+                raise OCRError("The OCR backend returned no line positions, so a stitched read cannot be split")
+            sections[max(bisect.bisect_right(offsets, y) - 1, 0)].append(text)
+        for i, lines in zip(missing, sections):
+            results[i] = lines
+            await self.cache.set(images[i], lines, self.cache_settings)
+        return results
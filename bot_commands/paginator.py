@@ -0,0 +1,83 @@
+import asyncio
+from io import BytesIO
+
+import discord
+
+from bot_commands.cache import ImageCache
+
+
+class TablePaginator(discord.ui.View):
+    """
+    Prev/Next buttons over a paged table image that renders a page only when someone
+    turns to it. `render_page(page)` is a coroutine returning the PNG bytes of page
+    `page` (0-based). Rendered pages stay in a small cache while the view is alive,
+    so paging back and forth does not render twice.
+    """
+
+    def __init__(self, render_page, page_count, name, author_id=None, timeout=300, cache_bytes=8 * 1024 * 1024):
+        super().__init__(timeout=timeout)
+        self.render_page = render_page
+        self.page_count = page_count
+        self.name = name
+        self.author_id = author_id
+        self.page = 0
+        self.pages = ImageCache(max_bytes=cache_bytes)
+        self.message = None
+        # One page turn at a time, so fast clicks cannot edit the message out of order
+        self._turning = asyncio.Lock()
+
+    async def _page_file(self):
+        image = self.pages.get(self.page)
+        if image is None:
+            image = await self.render_page(self.page)
+            self.pages.set(self.page, image)
+        return discord.File(fp=BytesIO(image), filename=f"{self.name}_page_{self.page + 1}.png")
+
+    def _content(self):
+        return f"**Page {self.page + 1} of {self.page_count}:**"
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def start(self, ctx):
+        """Render and send the first page, with buttons when there is more than one."""
+        file = await self._page_file()
+        if self.page_count <= 1:
+            self.message = await ctx.send(file=file)
+            self.stop()
+            return
+        self._update_buttons()
+        self.message = await ctx.send(self._content(), file=file, view=self)
+
+    async def interaction_check(self, interaction):
+        if self.author_id is None or interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message("Only the person who ran the command can turn pages.", ephemeral=True)
+        return False
+
+    async def _turn(self, interaction, step):
+        # Answer within Discord's 3 second interaction deadline, even while another
+        # click is still rendering
+        await interaction.response.defer()
+        async with self._turning:
+            self.page = min(max(self.page + step, 0), self.page_count - 1)
+            file = await self._page_file()
+            self._update_buttons()
+            await interaction.edit_original_response(content=self._content(), attachments=[file], view=self)
+
+    @discord.ui.button(label="Prev", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self._turn(interaction, 1)
+
+    async def on_timeout(self):
+        # Drop the buttons so nobody clicks a view that no longer answers
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
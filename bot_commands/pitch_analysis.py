@@ -1,18 +1,33 @@
 import discord
 from discord.ext import commands
 import asyncio
-import requests
 from io import BytesIO
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
+from datetime import datetime
+from bot_commands.cache import TTLCache
+from bot_commands.executors import run_render
+from bot_commands.ocr import ScreenshotReader
+from bot_commands.preprocess import DEFAULT_MAX_SIDE, parse_crop
+from bot_commands.stat_engine import pitching_stats
+from bot_commands.stat_parser import PITCH_LAYOUT, parse_lines
+from bot_commands.tables import render_table
 
 class RankedPitchStats(commands.Cog):
-    def __init__(self, bot, connection):
+    def __init__(self, bot, pool, ocr_backend, ocr_cache):
         self.bot = bot
-        self.connection = connection
-        self.api_key = os.getenv('AZURE_API_KEY')
-        self.endpoint = os.getenv('AZURE_ENDPOINT') + '/vision/v3.2/read/analyze'
+        self.pool = pool
+        # fetch_trend results per Discord user, shared by the pitching trend commands
+        self.trend_cache = TTLCache(maxsize=256, ttl=600)
+        # Stats table region of the screenshots, the size they are shrunk to before OCR,
+        # and whether each pair of screenshots is stitched into a single OCR request
+        self.reader = ScreenshotReader(
+            ocr_backend,
+            ocr_cache,
+            crop=parse_crop(os.getenv("OCR_PITCH_CROP")),
+            max_side=int(os.getenv("OCR_MAX_SIDE", str(DEFAULT_MAX_SIDE))),
+            stitch=os.getenv("OCR_STITCH") == "1",
+        )
 
     async def cog_check(self, ctx):
         allowed_user_ids = [
@@ -26,80 +41,54 @@ class RankedPitchStats(commands.Cog):
         ]
         return ctx.author.id in allowed_user_ids
 
-    def parse_image(self, image_data):
-        try:
-            headers = {
-                'Ocp-Apim-Subscription-Key': self.api_key,
-                'Content-Type': 'application/octet-stream'
-            }
-            response = requests.post(self.endpoint, headers=headers, data=image_data)
-            if response.status_code == 202:
-                operation_location = response.headers["Operation-Location"]
-                import time
-                while True:
-                    result_response = requests.get(operation_location, headers=headers)
-                    if result_response.status_code != 200:
-                        return ""
-                    result = result_response.json()
-                    if result.get("status") == "succeeded":
-                        return [line["text"] for read_result in result["analyzeResult"]["readResults"] for line in read_result["lines"]]
-                    elif result.get("status") == "failed":
-                        return ""
-                    time.sleep(1)
-            else:
-                return ""
-        except Exception as e:
-            print(f"OCR Error: {e}")
-            return ""
-
-    def delete_user_data(self, discord_id):
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("DELETE FROM rankedpitchstats WHERE DISCORDID = %s;", (discord_id,))
-            self.connection.commit()
-        except Exception as e:
-            self.connection.rollback()
-            print(f"Delete Error: {e}")
-
-    def process_insert(self, raw_data, discord_id, timing):
-        try:
-            data = []
-            newrow = []
-
-            for i in range(len(raw_data)):
-                if raw_data[i] == "...":
-                    continue
-                if raw_data[i][0].isupper() or (raw_data[i][0:2] == "0." and raw_data[i][2].isalpha()):
-                    newrow = [raw_data[i]]
-                    continue
-                elif len(newrow) == 1:
-                    if "." in raw_data[i]:
-                        integer_part, decimal_part = raw_data[i].split(".")
-                        integer_part = int(integer_part)
-                        if decimal_part == "1":
-                            newrow.append(integer_part * 3 + 1)
-                        elif decimal_part == "2":
-                            newrow.append(integer_part * 3 + 2)
-                        else:
-                            newrow.append(integer_part * 3)
-                else:
-                    newrow.append(raw_data[i])
-                    data.append(newrow)
-                    print(newrow)
-
-            with self.connection.cursor() as cursor:
-                for row in data:
-                    cursor.execute("""
-                        INSERT INTO rankedpitchstats (
-                            DISCORDID, PLAYERNAME, OUTS, R, H, BB, SLG, HR, SO, TIMING, G
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (DISCORDID, PLAYERNAME, TIMING) DO NOTHING;
-                    """, (discord_id, row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], timing, row[8]))
-                self.connection.commit()
-            print(f"Inserted {len(data)} rows into the database.")
-        except Exception as e:
-            self.connection.rollback()
-            print(f"Insert Error: {e}")
+    async def parse_image(self, image_data):
+        """OCR one screenshot and return its lines, reusing the stored result for a repeat upload."""
+        return await self.reader.read(image_data)
+
+    def insert_submission(self, screenshots, discord_id, submission_time):
+        """
+        Parse the OCR lines of every (timing, lines) screenshot, insert all rows and trim
+        the user's history down to the last 4 submissions, all in one transaction.
+        Returns the number of rows and the list of OCR lines the parser dropped.
+        """
+        rows, dropped = [], []
+        for timing, raw_data in screenshots:
+            records, skipped = parse_lines(raw_data, PITCH_LAYOUT)
+            rows.extend(
+                (discord_id, r.name, r.outs, r.r, r.h, r.bb, r.slg, r.hr, r.so, timing, r.g, submission_time)
+                for r in records
+            )
+            dropped.extend(skipped)
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.executemany("""
+                INSERT INTO rankedpitchstats (
+                    DISCORDID, PLAYERNAME, OUTS, R, H, BB, SLG, HR, SO, TIMING, G, submission_time
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (DISCORDID, PLAYERNAME, TIMING, submission_time) DO NOTHING;
+            """, rows)
+                self.trim_old_submissions(cursor, discord_id)
+            connection.commit()
+        return len(rows), dropped
+
+    # Keeps the user's 4 most recent submissions: deletes everything older than the 4th
+    # newest submission_time. With fewer than 4 the cutoff is NULL and nothing goes.
+    TRIM_QUERY = """
+        DELETE FROM rankedpitchstats
+        WHERE DISCORDID = %(discord_id)s AND submission_time < (
+            SELECT submission_time FROM (
+                SELECT DISTINCT submission_time
+                FROM rankedpitchstats
+                WHERE DISCORDID = %(discord_id)s
+            ) AS times
+            ORDER BY submission_time DESC
+            OFFSET 3 LIMIT 1
+        );
+    """
+
+    def trim_old_submissions(self, cursor, discord_id):
+        """Keep only the user's 4 most recent submissions."""
+        cursor.execute(self.TRIM_QUERY, {"discord_id": discord_id})
 
     @commands.command()
     async def pitchers(self, ctx):
@@ -113,18 +102,16 @@ class RankedPitchStats(commands.Cog):
         await ctx.send("Please wait...")
 
         try:
-            await asyncio.to_thread(self.delete_user_data, discord_id)
-
-            for i, attachment in enumerate(attachments):
-                image_data = await attachment.read()
-                data = await asyncio.to_thread(self.parse_image, image_data)
-
-                timing = "before" if i <= 1 else "after"
-                await asyncio.to_thread(self.process_insert, data, discord_id, timing)
-
-            discord_id = ctx.author.id
-
-            await ctx.send(f"Data has been updated for {discord_id}!")
+            submission_time = datetime.now()
+            # Download and OCR all four screenshots at once, then store them together
+            images = await asyncio.gather(*(attachment.read() for attachment in attachments))
+            before, after = await asyncio.gather(self.reader.read_group(images[:2]), self.reader.read_group(images[2:]))
+            screenshots = [("before", lines) for lines in before] + [("after", lines) for lines in after]
+            _, dropped = await self.pool.run(self.insert_submission, screenshots, discord_id, submission_time)
+            self.trend_cache.pop(discord_id)
+
+            note = f" ({len(dropped)} unreadable OCR lines skipped)" if dropped else ""
+            await ctx.send(f"Data has been updated for {discord_id}!{note}")
         except Exception as e:
             await ctx.send(f"Error occurred: {e}")
 
@@ -132,93 +119,15 @@ class RankedPitchStats(commands.Cog):
     async def rankedpitch(self, ctx):
         discord_id = ctx.author.id
         try:
-            results = await asyncio.to_thread(self.fetch_comparison_data, discord_id)
+            results = await self.pool.run(self.fetch_comparison_data, discord_id)
 
             if not results:
                 await ctx.send("No matching records found for comparison.")
                 return
 
-            data = []
-            for row in results:
-                player_name = row[0]
-                diff_OUTS = row[1]
-                diff_R = row[2]
-                diff_H = row[3]
-                diff_BB = row[4]
-                diff_SLG = round(row[5], 3)
-                diff_HR = row[6]
-                diff_SO = row[7]
-                diff_G = row[8]
-
-                diff_AB = diff_H + diff_OUTS
-
-                ip = diff_OUTS // 3 + (diff_OUTS % 3) / 10
-                era = round(diff_R / diff_OUTS * 27, 2) if diff_R > 0 else 0
-                avg = round(diff_H / diff_AB, 3) if diff_H > 0 else 0
-
-                walkrate = round(diff_BB / (diff_AB + diff_BB), 3) if (diff_AB + diff_BB) > 0 else 0
-                walkrate *= 100
-                walkrate = round(walkrate, 1)
-
-                obp = round((diff_H + diff_BB) / (diff_AB + diff_BB), 3) if (diff_AB + diff_BB) > 0 else 0
-                hrrate = round(diff_HR / diff_AB, 3) if diff_AB > 0 else 0
-                hrrate *= 100
-                hrrate = round(hrrate, 1)
-
-                slg = diff_SLG if diff_AB > 0 else 0
-                ops = round(obp + slg, 3)
-
-                krate = diff_SO / diff_AB if diff_AB > 0 else 0
-                krate *= 100
-                krate = round(krate, 1)
-
-                whip = (diff_BB + diff_H) / diff_OUTS * 3 if diff_OUTS > 0 else 0
-                whip = round(whip, 3)
-
-                ipg = round(float(ip / diff_G), 3) if diff_G > 0 else 0
-
-                data.append([
-                    player_name, diff_G, ip, ipg, era, avg, obp, slg, ops,
-                    diff_BB, walkrate, diff_HR, hrrate, diff_SO, krate, whip
-                ])
-
-            columns = [
-                "Player Name", "G", "IP", "AVG IP/G", "ERA", "AVG", "OBP", "SLG", "OPS",
-                "BB", "BB%", "HR", "HR%", "K", "K%", "WHIP"
-            ]
-
-            df = pd.DataFrame(data, columns=columns)
-            df = df.sort_values(by="ERA")
-
-            fig, ax = plt.subplots(figsize=(24, len(df) * 0.5 + 1))
-            ax.axis("tight")
-            ax.axis("off")
-            table = ax.table(
-                cellText=df.values,
-                colLabels=df.columns,
-                cellLoc="center",
-                loc="center",
-            )
-
-            table.auto_set_font_size(False)
-            table.set_fontsize(10)
-            table.auto_set_column_width(col=list(range(len(df.columns))))
-
-            cell_dict = table.get_celld()
-            for (row, col), cell in cell_dict.items():
-                if row == 0 or col == 0:
-                    cell.set_text_props(weight="bold")
-
-            row_height = 1 / len(df)
-            for (row, col), cell in cell_dict.items():
-                cell.set_height(row_height)
+            image = await run_render(self.create_comparison_plot, results)
 
-            buffer = BytesIO()
-            plt.savefig(buffer, format="png", bbox_inches="tight")
-            buffer.seek(0)
-            plt.close(fig)
-
-            file = discord.File(fp=buffer, filename="stats_comparison.png")
+            file = discord.File(fp=BytesIO(image), filename="stats_comparison.png")
             await ctx.send(file=file)
 
         except Exception as e:
@@ -226,8 +135,9 @@ class RankedPitchStats(commands.Cog):
 
     def fetch_comparison_data(self, discord_id):
         try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
+            with self.pool.connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("""
                     SELECT 
                         a.PLAYERNAME,
                         b.outs - a.outs,
@@ -245,16 +155,159 @@ class RankedPitchStats(commands.Cog):
                     FROM rankedpitchstats a
                     JOIN rankedpitchstats b
                     ON a.PLAYERNAME = b.PLAYERNAME
+                    AND a.submission_time = b.submission_time
                     WHERE a.DISCORDID = %s
                     AND b.DISCORDID = %s
                     AND a.TIMING = 'before'
-                    AND b.TIMING = 'after';
-                """, (discord_id, discord_id))
-                return cursor.fetchall()
+                    AND b.TIMING = 'after'
+                    AND a.submission_time = (
+                        SELECT MAX(submission_time) FROM rankedpitchstats WHERE DISCORDID = %s
+                    );
+                """, (discord_id, discord_id, discord_id))
+                    return cursor.fetchall()
         except Exception as e:
             print(f"Fetch Error: {e}")
             return []
 
+    # Metrics of the pitching trend commands, in the column order fetch_trend selects them
+    TREND_METRICS = ["era", "whip", "avg", "ops"]
+
+    @staticmethod
+    def create_comparison_plot(results):
+        return render_table(pitching_stats(results))
+
+    def fetch_trend(self, discord_id):
+        """
+        Every trend metric for the user's last 4 submissions in one query.
+        Returns (timestamps, {metric: {player: [value or None per timestamp]}}).
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                WITH recent AS (
+                    SELECT DISTINCT submission_time
+                    FROM rankedpitchstats
+                    WHERE DISCORDID = %s
+                    ORDER BY submission_time DESC
+                    LIMIT 4
+                ), deltas AS (
+                    SELECT a.submission_time, a.PLAYERNAME AS name,
+                           b.OUTS - a.OUTS AS outs, b.R - a.R AS r, b.H - a.H AS h, b.BB - a.BB AS bb,
+                           b.SLG * (b.H + b.OUTS) - a.SLG * (a.H + a.OUTS) AS bases,
+                           (b.H + b.OUTS) - (a.H + a.OUTS) AS ab
+                    FROM rankedpitchstats a
+                    JOIN rankedpitchstats b
+                    ON a.PLAYERNAME = b.PLAYERNAME AND a.submission_time = b.submission_time
+                    WHERE a.DISCORDID = %s AND b.DISCORDID = %s
+                      AND a.TIMING = 'before' AND b.TIMING = 'after'
+                      AND a.submission_time IN (SELECT submission_time FROM recent)
+                ), metrics AS (
+                    SELECT submission_time, name,
+                           CASE WHEN outs > 0 THEN ROUND(r::numeric * 27 / outs, 2) ELSE 0 END AS era,
+                           CASE WHEN outs > 0 THEN ROUND((bb + h)::numeric * 3 / outs, 3) ELSE 0 END AS whip,
+                           CASE WHEN ab > 0 THEN ROUND(h::numeric / ab, 3) ELSE 0 END AS avg,
+                           CASE WHEN ab + bb > 0 THEN ROUND((h + bb)::numeric / (ab + bb), 3) ELSE 0 END AS obp,
+                           CASE WHEN ab > 0 THEN ROUND(bases::numeric / ab, 3) ELSE 0 END AS slg
+                    FROM deltas
+                )
+                SELECT r.submission_time, m.name, m.era, m.whip, m.avg, m.obp + m.slg AS ops
+                FROM recent r
+                LEFT JOIN metrics m ON m.submission_time = r.submission_time
+                ORDER BY r.submission_time, m.name;
+            """, (discord_id, discord_id, discord_id))
+                rows = cursor.fetchall()
+
+        timestamps = sorted({row[0] for row in rows})
+        position = {timestamp: i for i, timestamp in enumerate(timestamps)}
+        trend = {metric: {} for metric in self.TREND_METRICS}
+        for timestamp, name, *values in rows:
+            if name is None:
+                continue  # a submission with no matching before/after pairs
+            for metric, value in zip(self.TREND_METRICS, values):
+                series = trend[metric].setdefault(name, [None] * len(timestamps))
+                series[position[timestamp]] = float(value)
+        return timestamps, trend
+
+    async def metric_trend(self, discord_id, metric):
+        """(timestamps, {player: values}) for one metric, from the per-user cached trend."""
+        cached = self.trend_cache.get(discord_id)
+        if cached is None:
+            try:
+                cached = await self.pool.run(self.fetch_trend, discord_id)
+            except Exception as e:
+                print(f"Fetch metric trend error: {e}")
+                return [], {}
+            self.trend_cache.set(discord_id, cached)
+        timestamps, trend = cached
+        return timestamps, trend[metric]
+
+    @staticmethod
+    def plot_metric_trend(timestamps, player_data, metric):
+        plt.figure(figsize=(12, 6))
+        x_labels = [f"#{i+1}" for i in range(len(timestamps))]
+        for name, values in player_data.items():
+            plt.plot(x_labels, values, marker='o', label=name)
+
+        label = metric.upper() if metric in ("era", "whip") else f"Opponent {metric.upper()}"
+        plt.title(f"{label} over last 4 uploads")
+        plt.xlabel("Submission Order")
+        plt.ylabel(label)
+
+        # Custom min & max y-axis limits for each metric
+        ylim_dict = {
+            'era': (0, 8),
+            'whip': (0.5, 2.0),
+            'avg': (0.1, 0.35),
+            'ops': (0.25, 1.0)
+        }
+
+        ymin, ymax = ylim_dict.get(metric.lower(), (0, 1))
+        plt.ylim(ymin, ymax)
+
+        plt.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+        plt.grid(True)
+
+        buffer = BytesIO()
+        plt.savefig(buffer, format='png', bbox_inches='tight', dpi=300)
+        plt.close()
+        return buffer.getvalue()
+
+    @commands.command()
+    async def rankedera(self, ctx):
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "era")
+        if not player_data:
+            await ctx.send("No data to plot ERA.")
+            return
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "era")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedera.png"))
+
+    @commands.command()
+    async def rankedwhip(self, ctx):
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "whip")
+        if not player_data:
+            await ctx.send("No data to plot WHIP.")
+            return
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "whip")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedwhip.png"))
+
+    @commands.command()
+    async def rankedpitchavg(self, ctx):
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "avg")
+        if not player_data:
+            await ctx.send("No data to plot opponent AVG.")
+            return
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "avg")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedpitchavg.png"))
+
+    @commands.command()
+    async def rankedpitchops(self, ctx):
+        timestamps, player_data = await self.metric_trend(ctx.author.id, "ops")
+        if not player_data:
+            await ctx.send("No data to plot opponent OPS.")
+            return
+        image = await run_render(self.plot_metric_trend, timestamps, player_data, "ops")
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="rankedpitchops.png"))
+
 async def setup(bot):
-    connection = bot.connection
-    await bot.add_cog(RankedPitchStats(bot, connection))
+    pool = bot.pool
+    await bot.add_cog(RankedPitchStats(bot, pool, bot.ocr_backend, bot.ocr_cache))
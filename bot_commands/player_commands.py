@@ -1,20 +1,25 @@
 from discord.ext import commands
 import pandas as pd
 import matplotlib.pyplot as plt
-from io import BytesIO
+from io import BytesIO, StringIO
 import shlex
+import csv
 import discord
 import pandas as pd
 import psycopg2
+from psycopg2.extras import execute_values
 from urllib.parse import urlparse
 import os
 import asyncio
+from bot_commands.executors import run_blocking
+from bot_commands.sheets import iter_sheet_batches
 
 
 class PlayerCommands(commands.Cog):
-    def __init__(self, bot, connection):
+    def __init__(self, bot, pool, roster_cache):
         self.bot = bot
-        self.connection = connection
+        self.pool = pool
+        self.roster_cache = roster_cache
 
 
     async def cog_check(self, ctx):
@@ -52,19 +57,20 @@ class PlayerCommands(commands.Cog):
         """Fetch all details of a specific player."""
         player_name = player_name.lower()
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(
-                """
-                SELECT Name, Club_Name, SP1_Name, SP1_Skills, SP2_Name, SP2_Skills, 
-                       SP3_Name, SP3_Skills, SP4_Name, SP4_Skills, SP5_Name, SP5_Skills,
-                       Nerf, PR, last_updated, nerf_updated, team_name, charbats, toolbats
-                FROM Player
-                WHERE Name = %s
-                """,
-                (player_name,),
-            )
-            player = cursor.fetchone()
-            cursor.close()
+            player = self.roster_cache.players.get(player_name)
+            if player is None:
+                player = await self.pool.fetchone(
+                    """
+                    SELECT Name, Club_Name, SP1_Name, SP1_Skills, SP2_Name, SP2_Skills, 
+                           SP3_Name, SP3_Skills, SP4_Name, SP4_Skills, SP5_Name, SP5_Skills,
+                           Nerf, PR, last_updated, nerf_updated, team_name, charbats, toolbats
+                    FROM Player
+                    WHERE Name = %s
+                    """,
+                    (player_name,),
+                )
+                if player:
+                    self.roster_cache.players.set(player_name, player)
 
             if player:
                 (
@@ -92,7 +98,6 @@ class PlayerCommands(commands.Cog):
             else:
                 await ctx.send(f"No player found with the name '{player_name}'.")
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
@@ -145,16 +150,20 @@ class PlayerCommands(commands.Cog):
             defaults["pr"] = int(defaults["pr"])
             defaults["charbats"] = int(defaults["charbats"])
             defaults["toolbats"] = int(defaults["toolbats"])
-            cursor = self.connection.cursor()
-
-            # Check if the player already exists
-            cursor.execute("SELECT * FROM Player WHERE Name = %s", (name,))
-            existing_player = cursor.fetchone()
 
-            if existing_player:
-                await ctx.send(f"The player '{name}' already exists in the database. No changes made.")
+            if await self.pool.run(self.insert_player, name, defaults):
+                await ctx.send(f"Added new player '{name}' to the database.")
             else:
-                # Insert the player with all arguments
+                await ctx.send(f"The player '{name}' already exists in the database. No changes made.")
+
+            await self.scoutplayer(ctx, name)
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    def insert_player(self, name, fields):
+        """Insert a player with addplayer's fields. Returns False when the name is already taken."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO Player (
@@ -164,35 +173,61 @@ class PlayerCommands(commands.Cog):
                         Nerf, PR, last_updated, nerf_updated, team_name, charbats, toolbats
                     )
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_DATE, CURRENT_DATE, %s, %s, %s)
+                    ON CONFLICT (Name) DO NOTHING
+                    RETURNING Name
                     """,
                     (
                         name,
-                        defaults["club"],
-                        defaults["sp1name"],
-                        defaults["sp1skills"],
-                        defaults["sp2name"],
-                        defaults["sp2skills"],
-                        defaults["sp3name"],
-                        defaults["sp3skills"],
-                        defaults["sp4name"],
-                        defaults["sp4skills"],
-                        defaults["sp5name"],
-                        defaults["sp5skills"],
-                        defaults["nerf"],
-                        defaults["pr"],
-                        defaults["teamdeck"],
-                        defaults["charbats"],
-                        defaults["toolbats"],
+                        fields["club"],
+                        fields["sp1name"],
+                        fields["sp1skills"],
+                        fields["sp2name"],
+                        fields["sp2skills"],
+                        fields["sp3name"],
+                        fields["sp3skills"],
+                        fields["sp4name"],
+                        fields["sp4skills"],
+                        fields["sp5name"],
+                        fields["sp5skills"],
+                        fields["nerf"],
+                        fields["pr"],
+                        fields["teamdeck"],
+                        fields["charbats"],
+                        fields["toolbats"],
                     ),
                 )
-                self.connection.commit()
-                await ctx.send(f"Added new player '{name}' to the database.")
+                inserted = cursor.fetchone() is not None
+            connection.commit()
+        if inserted:
+            self.roster_cache.invalidate(players=[name], clubs=[fields["club"]])
+        return inserted
 
-            cursor.close()
-            await self.scoutplayer(ctx, name)
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+    def update_player(self, name, changes, stamp="last_updated"):
+        """
+        Set the {column: value} `changes` on one player and `stamp` (a date column, or None)
+        to today, in one statement. Returns False when there is no such player.
+        """
+        assignments = [f"{column} = %s" for column in changes]
+        if stamp:
+            assignments.append(f"{stamp} = CURRENT_DATE")
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE Player AS p
+                    SET {", ".join(assignments)}
+                    FROM (SELECT Club_Name FROM Player WHERE Name = %s FOR UPDATE) AS old
+                    WHERE p.Name = %s
+                    RETURNING old.Club_Name
+                    """,
+                    [*changes.values(), name, name],
+                )
+                row = cursor.fetchone()
+            connection.commit()
+        if row is None:
+            return False
+        self.roster_cache.invalidate(players=[name], clubs=[row[0], changes.get("club_name")])
+        return True
 
 
     @commands.command()
@@ -200,27 +235,11 @@ class PlayerCommands(commands.Cog):
         """Update the nerf value for a player and set the nerf last updated date."""
         player_name = player_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if player:
-                    # Update the nerf value and nerf_updated date
-                    cursor.execute(
-                        """
-                        UPDATE Player
-                        SET Nerf = %s, nerf_updated = CURRENT_DATE
-                        WHERE Name = %s
-                        """,
-                        (new_nerf, player_name),
-                    )
-                    self.connection.commit()
-                    await self.scoutplayer(ctx, player_name)
-                else:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
+            if not await self.pool.run(self.update_player, player_name, {"nerf": new_nerf}, "nerf_updated"):
+                await ctx.send(f"No player found with the name '{player_name}'.")
+                return
+            await self.scoutplayer(ctx, player_name)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
     @commands.command()
@@ -229,22 +248,25 @@ class PlayerCommands(commands.Cog):
         """Delete a player from the database."""
         player_name = player_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if player:
-                    # Delete the player
-                    cursor.execute("DELETE FROM Player WHERE Name = %s", (player_name,))
-                    self.connection.commit()
-                    await ctx.send(f"Player '{player_name}' has been deleted from the database.")
-                else:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
+            if await self.pool.run(self.delete_player, player_name):
+                await ctx.send(f"Player '{player_name}' has been deleted from the database.")
+            else:
+                await ctx.send(f"No player found with the name '{player_name}'.")
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
+    def delete_player(self, name):
+        """Delete one player. Returns False when there is no such player."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM Player WHERE Name = %s RETURNING Club_Name", (name,))
+                row = cursor.fetchone()
+            connection.commit()
+        if row is None:
+            return False
+        self.roster_cache.invalidate(players=[name], clubs=[row[0]])
+        return True
+
 
     @commands.command()
     async def updatesp(self, ctx, player_name: str, sp_number: int, sp_name: str, sp_skills: str):
@@ -263,32 +285,13 @@ class PlayerCommands(commands.Cog):
                 await ctx.send("Invalid SP number. Please specify a number from 1 to 5.")
                 return
 
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
-                    return
-
-                # Determine the column names for the specified SP
-                sp_name_column = f"SP{sp_number}_Name"
-                sp_skills_column = f"SP{sp_number}_Skills"
-
-                # Update the SP details for the player
-                cursor.execute(
-                    f"""
-                    UPDATE Player
-                    SET {sp_name_column} = %s, {sp_skills_column} = %s
-                    WHERE Name = %s
-                    """,
-                    (sp_name, sp_skills, player_name),
-                )
-                self.connection.commit()
-                await self.scoutplayer(ctx, player_name)
+            # Determine the column names for the specified SP
+            changes = {f"SP{sp_number}_Name": sp_name, f"SP{sp_number}_Skills": sp_skills}
+            if not await self.pool.run(self.update_player, player_name, changes, None):
+                await ctx.send(f"No player found with the name '{player_name}'.")
+                return
+            await self.scoutplayer(ctx, player_name)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
@@ -302,28 +305,11 @@ class PlayerCommands(commands.Cog):
         """
         player_name = player_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
-                    return
-
-                # Update the PR value for the player
-                cursor.execute(
-                    """
-                    UPDATE Player
-                    SET PR = %s, last_updated = CURRENT_DATE
-                    WHERE Name = %s
-                    """,
-                    (new_pr, player_name),
-                )
-                self.connection.commit()
-                await self.scoutplayer(ctx, player_name)
+            if not await self.pool.run(self.update_player, player_name, {"pr": new_pr}):
+                await ctx.send(f"No player found with the name '{player_name}'.")
+                return
+            await self.scoutplayer(ctx, player_name)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
     @commands.command()
@@ -351,39 +337,81 @@ class PlayerCommands(commands.Cog):
 
                 updates.append((player_name, pr_value))
 
-            # Begin database transaction
-            with self.connection.cursor() as cursor:
-                for player_name, pr_value in updates:
-                    # Check if the player exists
-                    cursor.execute(
+            # A player named twice keeps the last PR given
+            updates = dict(updates)
+            skipped = [name for name in updates if "$" in name]
+            for name in skipped:
+                del updates[name]
+
+            updated, created = [], []
+            if updates:
+                updated, created = await self.pool.run(self.bulk_update_prs, list(updates.items()))
+
+            lines = []
+            if updated:
+                lines.append(f"**Updated {len(updated)} PRs:** " + ", ".join(f"{name} ({updates[name]})" for name in updated))
+            if created:
+                lines.append(f"**Added {len(created)} new players:** " + ", ".join(f"{name} ({updates[name]})" for name in created))
+            if skipped:
+                lines.append("**Skipped** (replace $ with S): " + ", ".join(skipped))
+            await ctx.send("\n".join(lines)[:2000] or "No PRs to update.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    def bulk_update_prs(self, updates):
+        """
+        Set the PR of every (name, pr) pair with one UPDATE and add the names that are not
+        in Player yet with one INSERT, in a single transaction.
+        Returns the names updated and the names created.
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                changed = execute_values(
+                    cursor,
+                    """
+                    UPDATE Player AS p
+                    SET PR = v.pr
+                    FROM (VALUES %s) AS v (name, pr)
+                    WHERE p.Name = v.name
+                    RETURNING p.Name, p.Club_Name
+                    """,
+                    updates,
+                    template="(%s, %s::integer)",
+                    page_size=len(updates),
+                    fetch=True,
+                )
+                known = {name for name, _ in changed}
+                # New players get the same defaults as addplayer
+                missing = [
+                    (name, "no club", "", "", "", "", "", "", "", "", "", "", "", pr, "", 0, 0)
+                    for name, pr in updates if name not in known
+                ]
+                added = []
+                if missing:
+                    added = execute_values(
+                        cursor,
                         """
-                        SELECT Name
-                        FROM Player
-                        WHERE Name = %s
+                        INSERT INTO Player (
+                            Name, Club_Name, SP1_Name, SP1_Skills,
+                            SP2_Name, SP2_Skills, SP3_Name, SP3_Skills,
+                            SP4_Name, SP4_Skills, SP5_Name, SP5_Skills,
+                            Nerf, PR, last_updated, nerf_updated, team_name, charbats, toolbats
+                        )
+                        VALUES %s
+                        ON CONFLICT (Name) DO NOTHING
+                        RETURNING Name
                         """,
-                        (player_name,),
+                        missing,
+                        template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_DATE, CURRENT_DATE, %s, %s, %s)",
+                        page_size=len(missing),
+                        fetch=True,
                     )
-                    player = cursor.fetchone()
-
-                    if player:
-                        # Update the PR value
-                        cursor.execute(
-                            """
-                            UPDATE Player
-                            SET PR = %s
-                            WHERE Name = %s
-                            """,
-                            (pr_value, player_name),
-                        )
-                        await ctx.send(f"Updated PR for **{player_name}** to **{pr_value}**.")
-                    else:
-                        await self.addplayer(ctx, player_name, args=f"pr={pr_value}")
-                        await ctx.send(f"Player **{player_name}** does not exist in the database.")
-
-                self.connection.commit()
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+            connection.commit()
+        self.roster_cache.invalidate(
+            players=[name for name, _ in updates],
+            clubs=[club for _, club in changed] + ["no club"],
+        )
+        return [name for name, _ in changed], [row[0] for row in added]
 
 
     @commands.command()
@@ -396,28 +424,11 @@ class PlayerCommands(commands.Cog):
         """
         player_name = player_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
-                    return
-
-                # Update the PR value for the player
-                cursor.execute(
-                    """
-                    UPDATE Player
-                    SET charbats = %s, last_updated = CURRENT_DATE
-                    WHERE Name = %s
-                    """,
-                    (new_char, player_name),
-                )
-                self.connection.commit()
-                await self.scoutplayer(ctx, player_name)
+            if not await self.pool.run(self.update_player, player_name, {"charbats": new_char}):
+                await ctx.send(f"No player found with the name '{player_name}'.")
+                return
+            await self.scoutplayer(ctx, player_name)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
@@ -431,28 +442,11 @@ class PlayerCommands(commands.Cog):
         """
         player_name = player_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
-                    return
-
-                # Update the PR value for the player
-                cursor.execute(
-                    """
-                    UPDATE Player
-                    SET toolbats = %s, last_updated = CURRENT_DATE
-                    WHERE Name = %s
-                    """,
-                    (new_tool, player_name),
-                )
-                self.connection.commit()
-                await self.scoutplayer(ctx, player_name)
+            if not await self.pool.run(self.update_player, player_name, {"toolbats": new_tool}):
+                await ctx.send(f"No player found with the name '{player_name}'.")
+                return
+            await self.scoutplayer(ctx, player_name)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
     
     
@@ -463,35 +457,44 @@ class PlayerCommands(commands.Cog):
         player_name = player_name.lower()
         new_club = new_club.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
-                    return
-
-                # Get the current club of the player
-                current_club = player[1]  # Assuming Club_Name is the second column in the Player table
-
-                # Check if the new club exists, create it if not
-                cursor.execute("SELECT * FROM Club WHERE Club_Name = %s", (new_club,))
-                new_club_entry = cursor.fetchone()
-
-                if not new_club_entry:
-                    cursor.execute("INSERT INTO Club (Club_Name) VALUES (%s)", (new_club,))
+            if not await self.pool.run(self.move_player, player_name, new_club):
+                await ctx.send(f"No player found with the name '{player_name}'.")
+                return
+            await self.scoutplayer(ctx, player_name)
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
 
-                # Update the player's club
+    def move_player(self, name, new_club):
+        """
+        Move one player to `new_club`, creating the club if it does not exist yet.
+        Returns False when there is no such player.
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE Player AS p
+                    SET Club_Name = %s
+                    FROM (SELECT Club_Name FROM Player WHERE Name = %s FOR UPDATE) AS old
+                    WHERE p.Name = %s
+                    RETURNING old.Club_Name
+                    """,
+                    (new_club, name, name),
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return False
                 cursor.execute(
-                    "UPDATE Player SET Club_Name = %s WHERE Name = %s",
-                    (new_club, player_name),
+                    """
+                    INSERT INTO Club (Club_Name)
+                    SELECT %s
+                    WHERE NOT EXISTS (SELECT 1 FROM Club WHERE Club_Name = %s)
+                    """,
+                    (new_club, new_club),
                 )
-                self.connection.commit()
-                await self.scoutplayer(ctx, player_name)
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+            connection.commit()
+        self.roster_cache.invalidate(players=[name], clubs=[row[0], new_club])
+        return True
 
 
     @commands.command()
@@ -504,28 +507,11 @@ class PlayerCommands(commands.Cog):
         """
         player_name = player_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (player_name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{player_name}'.")
-                    return
-
-                # Update the team name for the player
-                cursor.execute(
-                    """
-                    UPDATE Player
-                    SET team_name = %s, last_updated = CURRENT_DATE
-                    WHERE Name = %s
-                    """,
-                    (new_team_name, player_name),
-                )
-                self.connection.commit()
-                await self.scoutplayer(ctx, player_name)
+            if not await self.pool.run(self.update_player, player_name, {"team_name": new_team_name}):
+                await ctx.send(f"No player found with the name '{player_name}'.")
+                return
+            await self.scoutplayer(ctx, player_name)
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
@@ -540,24 +526,28 @@ class PlayerCommands(commands.Cog):
         old_name = old_name.lower()
         new_name = new_name.lower()
         try:
-            with self.connection.cursor() as cursor:
-                # Check if the player with the old name exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (old_name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{old_name}'.")
-                    return
-
-                # Check if the new name already exists
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (new_name,))
-                new_name_player = cursor.fetchone()
-
-                if new_name_player:
-                    await ctx.send(f"The name '{new_name}' is already taken by another player.")
-                    return
+            outcome = await self.pool.run(self.rename_player, old_name, new_name)
+            if outcome == "missing":
+                await ctx.send(f"No player found with the name '{old_name}'.")
+                return
+            if outcome == "taken":
+                await ctx.send(f"The name '{new_name}' is already taken by another player.")
+                return
+            await self.scoutplayer(ctx, new_name)
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
 
-                # Update the player's name
+    def rename_player(self, old_name, new_name):
+        """Rename one player. Returns "renamed", "missing" (no such player) or "taken"."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT Club_Name FROM Player WHERE Name = %s FOR UPDATE", (old_name,))
+                player = cursor.fetchone()
+                if player is None:
+                    return "missing"
+                cursor.execute("SELECT 1 FROM Player WHERE Name = %s", (new_name,))
+                if cursor.fetchone():
+                    return "taken"
                 cursor.execute(
                     """
                     UPDATE Player
@@ -566,23 +556,34 @@ class PlayerCommands(commands.Cog):
                     """,
                     (new_name, old_name),
                 )
-                self.connection.commit()
-                await self.scoutplayer(ctx, new_name)
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+            connection.commit()
+        self.roster_cache.invalidate(players=[old_name, new_name], clubs=[player[0]])
+        return "renamed"
 
 
     @commands.command()
     async def listplayers(self, ctx):
         """List the bottom 10 most recently added players and the total number of players in the database."""
         try:
-            with self.connection.cursor() as cursor:
-                # Fetch the total number of clubs
-                cursor.execute("SELECT COUNT(*) FROM Player")
-                total_clubs = cursor.fetchone()[0]
+            total_players, players = await self.pool.run(self.recent_players)
+            if players:
+                # Format the recent clubs list
+                playerlist = "\n".join([club[0] for club in players])
+                await ctx.send(
+                    f"**Total Players in the Database:** {total_players}\n\n"
+                    f"**10 Most Recently Added Players:**\n{playerlist}"
+                )
+            else:
+                await ctx.send("No players found in the database.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
 
-                # Fetch the bottom 10 most recently added clubs
+    def recent_players(self):
+        """The number of players and the names of the last 10 added."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM Player")
+                total = cursor.fetchone()[0]
                 cursor.execute(
                     """
                     SELECT Name
@@ -590,20 +591,7 @@ class PlayerCommands(commands.Cog):
                     OFFSET GREATEST((SELECT COUNT(*) FROM Player) - 10, 0)
                     """
                 )
-                players = cursor.fetchall()
-
-                if players:
-                    # Format the recent clubs list
-                    playerlist = "\n".join([club[0] for club in players])
-                    await ctx.send(
-                        f"**Total Players in the Database:** {total_clubs}\n\n"
-                        f"**10 Most Recently Added Players:**\n{playerlist}"
-                    )
-                else:
-                    await ctx.send("No players found in the database.")
-        except Exception as e:
-            self.connection.rollback()
-            await ctx.send(f"An error occurred: {e}")
+                return total, cursor.fetchall()
 
 
     @commands.command()
@@ -645,62 +633,59 @@ class PlayerCommands(commands.Cog):
                     if key in column_mapping:
                         updates[column_mapping[key]] = value.lower()
 
-            # Validate and construct the SQL query
-            update_query_parts = []
-            update_values = []
-            for column, value in updates.items():
-                if column == "pr":  # Convert PR to integer
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        await ctx.send(f"Invalid value for PR: {value}. It must be an integer.")
-                        return
-                update_query_parts.append(f"{column} = %s")
-                update_values.append(value)
-
-            if not update_query_parts:
+            # Validate the values
+            if "pr" in updates:  # Convert PR to integer
+                try:
+                    updates["pr"] = int(updates["pr"])
+                except ValueError:
+                    await ctx.send(f"Invalid value for PR: {updates['pr']}. It must be an integer.")
+                    return
+
+            if not updates:
                 await ctx.send("No valid updates provided.")
                 return
 
-            # Add the player's name to the query
-            update_query = ", ".join(update_query_parts)
-            update_values.append(name)
-
-            # Execute the update query
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM Player WHERE Name = %s", (name,))
-                player = cursor.fetchone()
-
-                if not player:
-                    await ctx.send(f"No player found with the name '{name}'.")
-                    return
-
-                cursor.execute(
-                    f"UPDATE Player SET {update_query}, last_updated = CURRENT_DATE WHERE Name = %s",
-                    update_values,
-                )
-                self.connection.commit()
-                await ctx.send(f"Updated player '{name}' with the following changes: {updates}")
+            if not await self.pool.run(self.update_player, name, updates):
+                await ctx.send(f"No player found with the name '{name}'.")
+                return
+            await ctx.send(f"Updated player '{name}' with the following changes: {updates}")
         except Exception as e:
-            self.connection.rollback()
             await ctx.send(f"An error occurred: {e}")
 
 
 
-    async def upload_to_database(self, file_stream):
-        # Read the Excel file
-        df = pd.read_excel(file_stream, engine="openpyxl")
-
-        # Format the names properly
-        df["Name"] = df["Name"].astype(str)
-        df["Name"] = df["Name"].str.lower().str.replace(" ", "")
-        df["Club_Name"] = df["Club_Name"].fillna("no club")
-        df["Club_Name"] = df["Club_Name"].str.lower()
-        # Remove spaces in Club_Name only for rows where Club_Name is not "no club"
-        df.loc[df["Club_Name"] != "no club", "Club_Name"] = df["Club_Name"].str.replace(" ", "", regex=False)
-
+    @commands.command()
+    @commands.has_role("M16Speed Spy Daddies")
+    async def cachestats(self, ctx):
+        """Show hit/miss counters of the roster and rendered-image caches."""
+        lines = [
+            f"**{name.capitalize()}**: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} cached"
+            for name, stats in self.roster_cache.stats().items()
+        ]
+        images = self.bot.image_cache.stats()
+        lines.append(
+            f"**Images**: {images['hits']} hits, {images['misses']} misses, "
+            f"{images['size']} cached ({images['bytes'] / 1024 / 1024:.1f} MB)"
+        )
+        await ctx.send("\n".join(lines))
+
+
+    # Columns of an uploaded scouting sheet, in the order they are copied into Player
+    UPLOAD_COLUMNS = [
+        "Name", "Club_Name",
+        "SP1_name", "SP1_skills", "SP2_name", "SP2_skills",
+        "SP3_name", "SP3_skills", "SP4_name", "SP4_skills",
+        "SP5_name", "SP5_skills", "Nerf", "PR", "Team_Name",
+        "charbats", "toolbats",
+    ]
+
+    def prepare_upload_rows(self, df):
+        """
+        Normalise an uploaded scouting sheet in one pass over the whole frame.
+        Returns the rows ready for the bulk upsert and a list of (sheet_row, reason) rejects.
+        """
         # Optional columns filled with defaults
-        df.fillna({
+        defaults = {
             "SP1_name": "",
             "SP1_skills": "",
             "SP2_name": "",
@@ -712,88 +697,165 @@ class PlayerCommands(commands.Cog):
             "SP5_name": "",
             "SP5_skills": "",
             "Team_Name": "",
-            "Nerf":"",
+            "Nerf": "",
             "PR": 9999,
             "charbats": 10,
             "toolbats": 10,
-        }, inplace=True)
+        }
+        for column, default in defaults.items():
+            if column not in df.columns:
+                df[column] = default
+        # Blank cells arrive as "" from iter_sheet_batches; treat them as missing so the
+        # defaults below apply
+        df = df.mask(df.isin(["", None]))
 
-        df["charbats"] = df["charbats"].astype(int)
-        df["toolbats"] = df["toolbats"].astype(int)
+        # Format the names properly
+        df["Name"] = df["Name"].fillna("").astype(str).str.lower().str.replace(" ", "")
+        df["Club_Name"] = df["Club_Name"].fillna("no club").astype(str).str.lower()
+        # Remove spaces in Club_Name only for rows where Club_Name is not "no club"
+        df.loc[df["Club_Name"] != "no club", "Club_Name"] = df["Club_Name"].str.replace(" ", "", regex=False)
+        df.fillna(defaults, inplace=True)
+        for column in ("PR", "charbats", "toolbats"):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+
+        # Spreadsheet row numbers (row 1 is the header)
+        sheet_rows = df.index + 2
+        missing_name = df["Name"].isin(["", "nan", "none"])
+        bad_number = df[["PR", "charbats", "toolbats"]].isna().any(axis=1)
+        valid = ~missing_name & ~bad_number
+        # When a player appears more than once, the last row wins like it did with row-by-row upserts
+        superseded = valid & df["Name"].where(valid).duplicated(keep="last")
+
+        rejects = []
+        for mask, reason in (
+            (missing_name, "missing player name"),
+            (bad_number & ~missing_name, "PR, charbats and toolbats must be numbers"),
+            (superseded, "player appears again further down the sheet"),
+        ):
+            rejects.extend((int(row), reason) for row in sheet_rows[mask.to_numpy()])
+        rejects.sort()
+
+        accepted = df.loc[valid & ~superseded, self.UPLOAD_COLUMNS].copy()
+        for column in ("PR", "charbats", "toolbats"):
+            accepted[column] = accepted[column].astype(int)
+        return list(accepted.itertuples(index=False, name=None)), rejects
+
+    def bulk_upsert_players(self, rows):
+        """
+        Load all rows with COPY into a staging table, create every missing club with one
+        statement and merge the players into Player with one set-based upsert.
+        """
+        buffer = StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
 
-        try:
-            cursor = self.connection.cursor()
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    CREATE TEMP TABLE player_staging ON COMMIT DROP AS
+                    SELECT Name, Club_Name,
+                        SP1_name, SP1_skills, SP2_name, SP2_skills,
+                        SP3_name, SP3_skills, SP4_name, SP4_skills,
+                        SP5_name, SP5_skills, Nerf, PR, team_name,
+                        charbats, toolbats
+                    FROM Player
+                    WITH NO DATA
+                    """
+                )
+                cursor.copy_expert(
+                    """
+                    COPY player_staging (
+                        Name, Club_Name,
+                        SP1_name, SP1_skills, SP2_name, SP2_skills,
+                        SP3_name, SP3_skills, SP4_name, SP4_skills,
+                        SP5_name, SP5_skills, Nerf, PR, team_name,
+                        charbats, toolbats
+                    ) FROM STDIN WITH (FORMAT csv)
+                    """,
+                    buffer,
+                )
 
-            for _, row in df.iterrows():
-                try:
-                    # Ensure the club exists or insert it
-                    club_name = row["Club_Name"].lower()
-                    cursor.execute("SELECT * FROM Club WHERE Club_Name = %s", (club_name,))
-                    club_exists = cursor.fetchone()
-
-                    if not club_exists:
-                        cursor.execute(
-                            """
-                            INSERT INTO Club (Club_Name)
-                            VALUES (%s)
-                            """,
-                            (club_name,)
-                        )
+                # Clubs the uploaded players belong to now, so their cached rosters can be dropped
+                cursor.execute(
+                    """
+                    SELECT DISTINCT p.Club_Name
+                    FROM Player p
+                    JOIN player_staging s ON s.Name = p.Name
+                    """
+                )
+                old_clubs = [row[0] for row in cursor.fetchall()]
 
-                    # Insert or update the player data
-                    cursor.execute(
-                        """
-                        INSERT INTO Player (
-                            Name, Club_Name,
-                            SP1_name, SP1_skills, SP2_name, SP2_skills,
-                            SP3_name, SP3_skills, SP4_name, SP4_skills,
-                            SP5_name, SP5_skills, Nerf, PR, team_name,
-                            charbats, toolbats, last_updated
-                        )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_DATE)
-                        ON CONFLICT (Name) DO UPDATE SET
-                            Club_Name = EXCLUDED.Club_Name,
-                            SP1_name = CASE WHEN EXCLUDED.SP1_name IS NOT NULL THEN EXCLUDED.SP1_name ELSE Player.SP1_name END,
-                            SP1_skills = CASE WHEN EXCLUDED.SP1_skills IS NOT NULL THEN EXCLUDED.SP1_skills ELSE Player.SP1_skills END,
-                            SP2_name = CASE WHEN EXCLUDED.SP2_name IS NOT NULL THEN EXCLUDED.SP2_name ELSE Player.SP2_name END,
-                            SP2_skills = CASE WHEN EXCLUDED.SP2_skills IS NOT NULL THEN EXCLUDED.SP2_skills ELSE Player.SP2_skills END,
-                            SP3_name = CASE WHEN EXCLUDED.SP3_name IS NOT NULL THEN EXCLUDED.SP3_name ELSE Player.SP3_name END,
-                            SP3_skills = CASE WHEN EXCLUDED.SP3_skills IS NOT NULL THEN EXCLUDED.SP3_skills ELSE Player.SP3_skills END,
-                            SP4_name = CASE WHEN EXCLUDED.SP4_name IS NOT NULL THEN EXCLUDED.SP4_name ELSE Player.SP4_name END,
-                            SP4_skills = CASE WHEN EXCLUDED.SP4_skills IS NOT NULL THEN EXCLUDED.SP4_skills ELSE Player.SP4_skills END,
-                            SP5_name = CASE WHEN EXCLUDED.SP5_name IS NOT NULL THEN EXCLUDED.SP5_name ELSE Player.SP5_name END,
-                            SP5_skills = CASE WHEN EXCLUDED.SP5_skills IS NOT NULL THEN EXCLUDED.SP5_skills ELSE Player.SP5_skills END,
-                            Nerf = CASE WHEN EXCLUDED.Nerf IS NOT NULL THEN EXCLUDED.Nerf ELSE Player.Nerf END,
-                            PR = CASE WHEN EXCLUDED.PR <> 9999 THEN EXCLUDED.PR ELSE Player.PR END,
-                            team_name = CASE WHEN EXCLUDED.team_name IS NOT NULL THEN EXCLUDED.team_name ELSE Player.team_name END,
-                            charbats = CASE WHEN EXCLUDED.charbats <> 10 THEN EXCLUDED.charbats ELSE Player.charbats END,
-                            toolbats = CASE WHEN EXCLUDED.toolbats <> 10 THEN EXCLUDED.toolbats ELSE Player.toolbats END,
-                            last_updated = CURRENT_DATE
-                        """,
-                        (
-                            row["Name"],
-                            club_name,
-                            row.get("SP1_name", ""), row.get("SP1_skills", ""),
-                            row.get("SP2_name", ""), row.get("SP2_skills", ""),
-                            row.get("SP3_name", ""), row.get("SP3_skills", ""),
-                            row.get("SP4_name", ""), row.get("SP4_skills", ""),
-                            row.get("SP5_name", ""), row.get("SP5_skills", ""),
-                            row["Nerf"],
-                            row["PR"],
-                            row.get("Team_Name", ""),
-                            row["charbats"],
-                            row["toolbats"],
-                        )
+                # Ensure every club referenced by the sheet exists
+                cursor.execute(
+                    """
+                    INSERT INTO Club (Club_Name)
+                    SELECT DISTINCT s.Club_Name
+                    FROM player_staging s
+                    WHERE NOT EXISTS (SELECT 1 FROM Club c WHERE c.Club_Name = s.Club_Name)
+                    """
+                )
+
+                # Insert or update the player data
+                cursor.execute(
+                    """
+                    INSERT INTO Player (
+                        Name, Club_Name,
+                        SP1_name, SP1_skills, SP2_name, SP2_skills,
+                        SP3_name, SP3_skills, SP4_name, SP4_skills,
+                        SP5_name, SP5_skills, Nerf, PR, team_name,
+                        charbats, toolbats, last_updated
                     )
-                except Exception as row_error:
-                    print(f"Error processing row: {row.to_dict()} - {row_error}")
+                    SELECT Name, Club_Name,
+                        SP1_name, SP1_skills, SP2_name, SP2_skills,
+                        SP3_name, SP3_skills, SP4_name, SP4_skills,
+                        SP5_name, SP5_skills, Nerf, PR, team_name,
+                        charbats, toolbats, CURRENT_DATE
+                    FROM player_staging
+                    ON CONFLICT (Name) DO UPDATE SET
+                        Club_Name = EXCLUDED.Club_Name,
+                        SP1_name = CASE WHEN EXCLUDED.SP1_name IS NOT NULL THEN EXCLUDED.SP1_name ELSE Player.SP1_name END,
+                        SP1_skills = CASE WHEN EXCLUDED.SP1_skills IS NOT NULL THEN EXCLUDED.SP1_skills ELSE Player.SP1_skills END,
+                        SP2_name = CASE WHEN EXCLUDED.SP2_name IS NOT NULL THEN EXCLUDED.SP2_name ELSE Player.SP2_name END,
+                        SP2_skills = CASE WHEN EXCLUDED.SP2_skills IS NOT NULL THEN EXCLUDED.SP2_skills ELSE Player.SP2_skills END,
+                        SP3_name = CASE WHEN EXCLUDED.SP3_name IS NOT NULL THEN EXCLUDED.SP3_name ELSE Player.SP3_name END,
+                        SP3_skills = CASE WHEN EXCLUDED.SP3_skills IS NOT NULL THEN EXCLUDED.SP3_skills ELSE Player.SP3_skills END,
+                        SP4_name = CASE WHEN EXCLUDED.SP4_name IS NOT NULL THEN EXCLUDED.SP4_name ELSE Player.SP4_name END,
+                        SP4_skills = CASE WHEN EXCLUDED.SP4_skills IS NOT NULL THEN EXCLUDED.SP4_skills ELSE Player.SP4_skills END,
+                        SP5_name = CASE WHEN EXCLUDED.SP5_name IS NOT NULL THEN EXCLUDED.SP5_name ELSE Player.SP5_name END,
+                        SP5_skills = CASE WHEN EXCLUDED.SP5_skills IS NOT NULL THEN EXCLUDED.SP5_skills ELSE Player.SP5_skills END,
+                        Nerf = CASE WHEN EXCLUDED.Nerf IS NOT NULL THEN EXCLUDED.Nerf ELSE Player.Nerf END,
+                        PR = CASE WHEN EXCLUDED.PR <> 9999 THEN EXCLUDED.PR ELSE Player.PR END,
+                        team_name = CASE WHEN EXCLUDED.team_name IS NOT NULL THEN EXCLUDED.team_name ELSE Player.team_name END,
+                        charbats = CASE WHEN EXCLUDED.charbats <> 10 THEN EXCLUDED.charbats ELSE Player.charbats END,
+                        toolbats = CASE WHEN EXCLUDED.toolbats <> 10 THEN EXCLUDED.toolbats ELSE Player.toolbats END,
+                        last_updated = CURRENT_DATE
+                    """
+                )
+            connection.commit()
+            self.roster_cache.invalidate(players=[row[0] for row in rows], clubs=old_clubs + [row[1] for row in rows])
+
 
-            self.connection.commit()  # Commit after processing all rows
-        except Exception as db_error:
-            self.connection.rollback()  # Rollback on any database error
-            raise db_error  # Rethrow for higher-level handling
-        finally:
-            cursor.close()
+    async def upload_to_database(self, file_stream, progress=None):
+        """
+        Upload a scouting sheet batch by batch, committing each batch on its own.
+        Returns the number of players written and the rejected rows.
+        """
+        uploaded, rejects = 0, []
+        batches = iter_sheet_batches(file_stream)
+        while True:
+            # Read the next batch of the sheet without blocking the event loop
+            df = await run_blocking(next, batches, None)
+            if df is None:
+                break
+            rows, batch_rejects = self.prepare_upload_rows(df)
+            if rows:
+                await self.pool.run(self.bulk_upsert_players, rows)
+            uploaded += len(rows)
+            rejects.extend(batch_rejects)
+            if progress:
+                await progress(uploaded + len(rejects))
+        return uploaded, rejects
 
 
 
@@ -807,6 +869,9 @@ class PlayerCommands(commands.Cog):
         # Notify that the upload is starting
         message = await ctx.send("Data is uploading. Please do not interrupt.")
 
+        async def progress(processed):
+            await message.edit(content=f"Data is uploading. Please do not interrupt. ({processed} rows processed)")
+
         # Get the attached file
         attachment = ctx.message.attachments[0]
         file_stream = BytesIO()
@@ -815,15 +880,19 @@ class PlayerCommands(commands.Cog):
 
         try:
             # Pass the file stream to the upload_to_database function
-            await self.upload_to_database(file_stream)
-
-            # Notify completion
-            await message.edit(content="Data successfully uploaded to the database! You can scout now.")
+            uploaded, rejects = await self.upload_to_database(file_stream, progress)
+
+            # Notify completion, listing any rows that were skipped
+            content = f"Data successfully uploaded to the database! You can scout now. ({uploaded} players)"
+            if rejects:
+                skipped = "\n".join(f"Row {row}: {reason}" for row, reason in rejects)
+                content += f"\n**Skipped {len(rejects)} rows:**\n{skipped}"
+            await message.edit(content=content[:2000])
         except Exception as e:
             await message.edit(content=f"Error: {e}")
 
 
 
 async def setup(bot):
-    connection = bot.connection  # Retrieve the connection from the bot instance
-    await bot.add_cog(PlayerCommands(bot, connection))
\ No newline at end of file
+    pool = bot.pool  # Retrieve the shared connection pool from the bot instance
+    await bot.add_cog(PlayerCommands(bot, pool, bot.roster_cache))
\ No newline at end of file
@@ -0,0 +1,68 @@
+from io import BytesIO
+
+from PIL import Image
+
+# Longest side, in pixels, a screenshot is shrunk to before OCR. The Read API wants text
+# at least 12px tall; on 2400-2778px phone screenshots (bench/test_ocr_image_size.py) a
+# stats digit is 17px at 1600, 12px at 1200 and 10px at 1000. At 1600 the upload is
+# 299 KiB for a 1390 KiB PNG original and 320 KiB for a 445 KiB JPEG one, in 160-200 ms.
+DEFAULT_MAX_SIDE = 1600
+
+
+def parse_crop(value):
+    """
+    Parse a crop box given as "left,top,right,bottom" fractions of the image, e.g.
+    "0,0.15,1,0.95". Returns None (no cropping) for an empty value.
+    """
+    if not value:
+        return None
+    box = tuple(float(part) for part in value.split(","))
+    if len(box) != 4 or not all(0 <= edge <= 1 for edge in box) or box[0] >= box[2] or box[1] >= box[3]:
+        raise ValueError(f"Invalid crop box {value!r}, expected left,top,right,bottom fractions")
+    return box
+
+
+def preprocess_image(image_data, crop=None, max_side=DEFAULT_MAX_SIDE):
+    """
+    Prepare a screenshot for OCR: crop it to the stats table, convert it to grayscale and
+    shrink it so its longest side is at most `max_side` pixels. Returns PNG bytes, or the
+    original bytes when there is no crop and they are the smaller upload (a JPEG that
+    needs little or no shrinking can be smaller than the same pixels as a PNG).
+    """
+    with Image.open(BytesIO(image_data)) as image:
+        image = image.convert("L")
+        if crop:
+            width, height = image.size
+            left, top, right, bottom = crop
+            image = image.crop((round(left * width), round(top * height), round(right * width), round(bottom * height)))
+        if max_side and max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+    if not crop and len(image_data) <= buffer.tell():
+        return image_data
+    return buffer.getvalue()
+
+
+def stitch_vertically(images, gap=40):
+    """
+    Stack preprocessed screenshots (PNG bytes) top to bottom on one white canvas with `gap`
+    pixels between them, so one OCR request reads them all. Returns the canvas as PNG bytes
+    and the y offset at which each screenshot starts.
+    """
+    opened = [Image.open(BytesIO(image_data)).convert("L") for image_data in images]
+    try:
+        width = max(image.width for image in opened)
+        height = sum(image.height for image in opened) + gap * (len(opened) - 1)
+        canvas = Image.new("L", (width, height), 255)
+        offsets, top = [], 0
+        for image in opened:
+            canvas.paste(image, (0, top))
+            offsets.append(top)
+            top += image.height + gap
+        buffer = BytesIO()
+        canvas.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), offsets
+    finally:
+        for image in opened:
+            image.close()
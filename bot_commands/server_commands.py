@@ -3,9 +3,9 @@ import os
 from discord.ext import commands
 
 class ServerCommands(commands.Cog):
-    def __init__(self, bot, connection):
+    def __init__(self, bot, pool):
         self.bot = bot
-        self.connection = connection
+        self.pool = pool
         self.ROLE_REACTIONS = {
             "🟨": "GoldyIsNFS",           
             "🏎️": "TokyoDrift",          
@@ -24,19 +24,30 @@ class ServerCommands(commands.Cog):
 
         # Load previously saved message IDs from the database
         self.role_message_ids = self.load_message_ids()
+        # Per guild: (strat pass role, {emoji: club role}), dropped whenever its roles change
+        self.guild_roles = {}
 
     def load_message_ids(self):
-        """Load message IDs from the database."""
-        with self.connection.cursor() as cursor:
-            cursor.execute("CREATE TABLE IF NOT EXISTS role_messages (id BIGINT PRIMARY KEY);")
-            cursor.execute("SELECT id FROM role_messages;")
-            return [row[0] for row in cursor.fetchall()]
+        """Load message IDs from the database, as a set for the reaction listeners."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE TABLE IF NOT EXISTS role_messages (id BIGINT PRIMARY KEY);")
+                cursor.execute("SELECT id FROM role_messages;")
+                return {row[0] for row in cursor.fetchall()}
 
     def save_message_ids(self, message_id):
         """Save message ID to the database."""
-        with self.connection.cursor() as cursor:
-            cursor.execute("INSERT INTO role_messages (id) VALUES (%s) ON CONFLICT DO NOTHING;", (message_id,))
-            self.connection.commit()
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO role_messages (id) VALUES (%s) ON CONFLICT DO NOTHING;", (message_id,))
+                connection.commit()
+
+    def clear_message_ids(self, message_ids):
+        """Forget the given saved message IDs."""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM role_messages WHERE id = ANY(%s);", (list(message_ids),))
+                connection.commit()
 
     @commands.command()
     async def send_roles(self, ctx):
@@ -54,58 +65,76 @@ class ServerCommands(commands.Cog):
             await message.add_reaction(emoji)
 
         # Save the message ID for tracking
-        self.save_message_ids(message.id)
-        self.role_message_ids.append(message.id)  # Update in-memory list
+        await self.pool.run(self.save_message_ids, message.id)
+        self.role_message_ids.add(message.id)  # Update in-memory set
+
+    def roles_for(self, guild):
+        """The strat pass role and the {emoji: role} map of a guild, resolved once per guild."""
+        roles = self.guild_roles.get(guild.id)
+        if roles is None:
+            by_name = {role.name: role for role in guild.roles}
+            roles = (
+                by_name.get(self.STRAT_PASS_ROLE),
+                {emoji: by_name[name] for emoji, name in self.ROLE_REACTIONS.items() if name in by_name},
+            )
+            self.guild_roles[guild.id] = roles
+        return roles
 
     @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload):
-        """Assign a role when a user reacts."""
-        if payload.user_id == self.bot.user.id:
-            return
+    async def on_guild_role_create(self, role):
+        self.guild_roles.pop(role.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.guild_roles.pop(role.guild.id, None)
 
-        if payload.message_id not in self.role_message_ids:
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.guild_roles.pop(after.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        """Assign the strat pass role and the club role of the emoji when a user reacts."""
+        if payload.message_id not in self.role_message_ids or payload.user_id == self.bot.user.id:
             return
 
         guild = self.bot.get_guild(payload.guild_id)
-        member = guild.get_member(payload.user_id)
-        emoji = str(payload.emoji)
-
-        # Assign "NFS Strat Pass" role
-        strat_pass_role = discord.utils.get(guild.roles, name=self.STRAT_PASS_ROLE)
-        if strat_pass_role and member:
-            await member.add_roles(strat_pass_role)
+        member = payload.member or (guild and guild.get_member(payload.user_id))
+        if not guild or not member:
+            return
 
-        # Assign specific role based on emoji
-        role_name = self.ROLE_REACTIONS.get(emoji)
-        if role_name:
-            role = discord.utils.get(guild.roles, name=role_name)
-            if role:
-                await member.add_roles(role)
+        strat_pass_role, emoji_roles = self.roles_for(guild)
+        # Both roles in one call, skipping any the member already has
+        roles = [
+            role for role in (strat_pass_role, emoji_roles.get(str(payload.emoji)))
+            if role and role not in member.roles
+        ]
+        if roles:
+            await member.add_roles(*roles)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload):
         """Remove a role when a user removes their reaction."""
-        if payload.user_id == self.bot.user.id:
-            return
-
-        if payload.message_id not in self.role_message_ids:
+        if payload.message_id not in self.role_message_ids or payload.user_id == self.bot.user.id:
             return
 
         guild = self.bot.get_guild(payload.guild_id)
-        member = guild.get_member(payload.user_id)
-        emoji = str(payload.emoji)
+        member = guild and guild.get_member(payload.user_id)
+        if not member:
+            return
 
         # Remove specific role based on emoji
-        role_name = self.ROLE_REACTIONS.get(emoji)
-        if role_name:
-            role = discord.utils.get(guild.roles, name=role_name)
-            if role and member:
-                await member.remove_roles(role)
+        _, emoji_roles = self.roles_for(guild)
+        role = emoji_roles.get(str(payload.emoji))
+        if role:
+            await member.remove_roles(role)
 
     @commands.command()
     async def clean_roles(self, ctx):
         """Remove old role messages from tracking and delete the messages."""
-        for message_id in self.role_message_ids:
+        # A snapshot: send_roles may add IDs while this awaits the deletes
+        message_ids = list(self.role_message_ids)
+        for message_id in message_ids:
             try:
                 message = await ctx.channel.fetch_message(message_id)
                 await message.delete()
@@ -117,13 +146,11 @@ class ServerCommands(commands.Cog):
                 await ctx.send(f"Failed to delete message with ID {message_id}: {e}")
 
         # Clear the tracked IDs in memory and the database
-        with self.connection.cursor() as cursor:
-            cursor.execute("DELETE FROM role_messages;")
-            self.connection.commit()
+        await self.pool.run(self.clear_message_ids, message_ids)
 
-        self.role_message_ids = []
+        self.role_message_ids.difference_update(message_ids)
         await ctx.send("All tracked role messages cleared and deleted.")
 
 async def setup(bot):
-    connection = bot.connection  # Retrieve the connection from the bot instance
-    await bot.add_cog(ServerCommands(bot, connection))
+    pool = bot.pool  # Retrieve the shared connection pool from the bot instance
+    await bot.add_cog(ServerCommands(bot, pool))
@@ -0,0 +1,44 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+
+def _frame(batch, columns, index):
+    df = pd.DataFrame(batch, columns=columns, index=index)
+    return df.where(df.notna(), "")
+
+
+def iter_sheet_batches(file_stream, batch_size=500):
+    """
+    Stream the first worksheet of an Excel file as DataFrames of at most `batch_size` rows.
+
+    The workbook is opened in openpyxl's read-only mode, so only one batch is held in
+    memory at a time no matter how big the sheet is. The first row is used as the header.
+    Each batch is indexed so that `index + 2` is the spreadsheet row number, the same as a
+    frame returned by pd.read_excel. Completely empty rows are skipped, and empty cells
+    (None from openpyxl) come through as "" so that astype(str) never turns them into "None".
+    """
+    workbook = load_workbook(file_stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [
+            str(name).strip() if name is not None else f"Unnamed: {i}"
+            for i, name in enumerate(header)
+        ]
+
+        batch, index = [], []
+        for position, values in enumerate(rows):
+            if all(value is None for value in values):
+                continue
+            values = tuple(values[:len(columns)])
+            batch.append(values + (None,) * (len(columns) - len(values)))
+            index.append(position)
+            if len(batch) == batch_size:
+                yield _frame(batch, columns, index)
+                batch, index = [], []
+        if batch:
+            yield _frame(batch, columns, index)
+    finally:
+        workbook.close()
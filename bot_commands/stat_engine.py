@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Columns of the before/after delta rows returned by the fetch_comparison_data queries
+BAT_DELTA_COLUMNS = ["Player Name", "AB", "H", "HR", "BB", "BASES", "SB", "SBA", "K"]
+PITCH_DELTA_COLUMNS = ["Player Name", "OUTS", "R", "H", "BB", "SLG", "HR", "SO", "G"]
+
+BAT_COLUMNS = [
+    "Player Name", "AB", "Avg", "BB", "BB%", "K", "K%", "OBP",
+    "HR", "HR%", "SLG", "OPS", "SB", "SB%"
+]
+PITCH_COLUMNS = [
+    "Player Name", "G", "IP", "AVG IP/G", "ERA", "AVG", "OBP", "SLG", "OPS",
+    "BB", "BB%", "HR", "HR%", "K", "K%", "WHIP"
+]
+
+
+def ratio(numerator, denominator, digits, scale=1):
+    """
+    numerator / denominator * scale, rounded to `digits`, for whole columns at once.
+    Wherever the denominator is zero or negative (no plate appearances, no outs, or an
+    OCR misread) the result is 0, the same value the per-player loops used to fall back to.
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return np.round(result * scale, digits)
+
+
+def _deltas(rows, columns):
+    df = pd.DataFrame(rows, columns=columns)
+    numeric = columns[1:]
+    df[numeric] = df[numeric].apply(pd.to_numeric)
+    return df
+
+
+def batting_stats(rows):
+    """Derived batting metrics for every (name, AB, H, HR, BB, BASES, SB, SBA, K) delta row, best OPS first."""
+    d = _deltas(rows, BAT_DELTA_COLUMNS)
+    ab, h, bb = d["AB"], d["H"], d["BB"]
+    obp = ratio(h + bb, ab + bb, 3)
+    slg = ratio(d["BASES"], ab, 3)
+    df = pd.DataFrame({
+        "Player Name": d["Player Name"],
+        "AB": ab,
+        "Avg": ratio(h, ab, 3),
+        "BB": bb,
+        "BB%": ratio(bb, ab + bb, 1, scale=100),
+        "K": d["K"],
+        "K%": ratio(d["K"], ab, 1, scale=100),
+        "OBP": obp,
+        "HR": d["HR"],
+        "HR%": ratio(d["HR"], ab, 1, scale=100),
+        "SLG": slg,
+        "OPS": np.round(obp + slg, 3),
+        "SB": d["SB"],
+        "SB%": ratio(d["SB"], d["SBA"], 1, scale=100),
+    }, columns=BAT_COLUMNS)
+    return df.sort_values(by="OPS", ascending=False)
+
+
+def pitching_stats(rows):
+    """Derived pitching metrics for every (name, OUTS, R, H, BB, SLG, HR, SO, G) delta row, best ERA first."""
+    d = _deltas(rows, PITCH_DELTA_COLUMNS)
+    outs, h, bb = d["OUTS"], d["H"], d["BB"]
+    ab = h + outs
+    # Innings in baseball notation: 14 outs is 4.2 innings
+    ip = outs // 3 + (outs % 3) / 10
+    obp = ratio(h + bb, ab + bb, 3)
+    slg = np.where(ab > 0, np.round(d["SLG"].astype(float), 3), 0)
+    df = pd.DataFrame({
+        "Player Name": d["Player Name"],
+        "G": d["G"],
+        "IP": ip,
+        "AVG IP/G": ratio(ip, d["G"], 3),
+        "ERA": ratio(d["R"], outs, 2, scale=27),
+        "AVG": ratio(h, ab, 3),
+        "OBP": obp,
+        "SLG": slg,
+        "OPS": np.round(obp + slg, 3),
+        "BB": bb,
+        # Rounded to a fraction first, then to a percentage, as the old per-player code did
+        "BB%": np.round(ratio(bb, ab + bb, 3) * 100, 1),
+        "HR": d["HR"],
+        "HR%": np.round(ratio(d["HR"], ab, 3) * 100, 1),
+        "K": d["SO"],
+        "K%": ratio(d["SO"], ab, 1, scale=100),
+        "WHIP": ratio(bb + h, outs, 3, scale=3),
+    }, columns=PITCH_COLUMNS)
+    return df.sort_values(by="ERA")
@@ -0,0 +1,136 @@
+from collections import namedtuple
+
+# One column of a stats table: how to convert its OCR text, and optionally an override that
+# supplies the value without reading a line, plus the placeholder texts the game may print
+# in that line's place (skipped if present)
+Field = namedtuple("Field", ["name", "convert", "override", "placeholders"], defaults=[None, ()])
+
+# A line the parser could not use, with its position in the OCR output and why
+DroppedLine = namedtuple("DroppedLine", ["index", "text", "reason"])
+
+
+def to_int(text):
+    return int(text.replace(",", ""))
+
+
+def to_float(text):
+    return float(text.replace(",", "").rstrip("%"))
+
+
+def innings_to_outs(text):
+    """Baseball innings notation to outs: "12.1" is 12 innings and 1 out, i.e. 37 outs."""
+    whole, _, thirds = text.partition(".")
+    if thirds not in ("", "0", "1", "2"):
+        raise ValueError(f"invalid innings {text!r}")
+    return int(whole) * 3 + int(thirds or 0)
+
+
+def is_player_name(text):
+    """Player rows start with the name; OCR sometimes reads a leading O as 0 (e.g. "0.Smith")."""
+    return text[0].isupper() or (text[:2] == "0." and len(text) > 2 and text[2].isalpha())
+
+
+class Layout:
+    """
+    A stats table as it comes out of OCR: a player name line followed by one line per field.
+    `skip` lines are ignored wherever they appear.
+    """
+
+    def __init__(self, record_name, fields, skip=()):
+        self.fields = fields
+        self.skip = set(skip)
+        self.record = namedtuple(record_name, ["name"] + [field.name for field in fields])
+
+
+BAT_LAYOUT = Layout(
+    "BatRow",
+    [
+        Field("ab", to_int),
+        Field("h", to_int),
+        Field("bb", to_int),
+        Field("slg", to_float),
+        Field("k", to_int),
+        Field("hr", to_int),
+        Field("sb", to_int),
+        # The game shows a placeholder instead of a percentage when nothing was stolen
+        Field(
+            "sbpct",
+            to_float,
+            override=lambda values: 0.0 if values["sb"] == 0 else None,
+            placeholders=("-", "0", "0%"),
+        ),
+    ],
+)
+
+PITCH_LAYOUT = Layout(
+    "PitchRow",
+    [
+        Field("outs", innings_to_outs),
+        Field("r", to_int),
+        Field("h", to_int),
+        Field("bb", to_int),
+        Field("slg", to_float),
+        Field("hr", to_int),
+        Field("so", to_int),
+        Field("g", to_int),
+    ],
+    skip=["..."],
+)
+
+
+def parse_lines(lines, layout):
+    """
+    Turn OCR lines into layout.record rows in a single pass.
+
+    The parser is a two-state machine: outside a row it waits for a player name; inside a
+    row each line fills the next field. A line that does not convert is dropped and the
+    field is tried again with the following line; a new name before the row is complete
+    drops the partial row. A field whose override applies is filled without reading a
+    line, and a placeholder the game printed for it is skipped. Returns (records, dropped lines).
+    """
+    records, dropped = [], []
+    fields = layout.fields
+    name, values, row_lines = None, {}, []
+    # Placeholder texts that may stand in for the fields overrides just filled
+    placeholders = set()
+
+    for index, text in enumerate(lines):
+        text = text.strip()
+        if not text or text in layout.skip:
+            continue
+        if text in placeholders:
+            placeholders = set()
+            continue
+        placeholders = set()
+
+        if is_player_name(text):
+            if name is not None:
+                dropped.extend(DroppedLine(i, t, "incomplete row") for i, t in row_lines)
+            name, values, row_lines = text, {}, [(index, text)]
+        elif name is None:
+            dropped.append(DroppedLine(index, text, "outside a player row"))
+            continue
+        else:
+            field = fields[len(values)]
+            try:
+                values[field.name] = field.convert(text)
+            except ValueError:
+                dropped.append(DroppedLine(index, text, f"not a valid {field.name}"))
+                continue
+            row_lines.append((index, text))
+
+        while len(values) < len(fields):
+            field = fields[len(values)]
+            value = field.override(values) if field.override else None
+            if value is None:
+                break
+            values[field.name] = value
+            placeholders.update(field.placeholders)
+
+        if len(values) == len(fields):
+            records.append(layout.record(name, **values))
+            name, values, row_lines = None, {}, []
+
+    if name is not None:
+        dropped.extend(DroppedLine(i, t, "incomplete row") for i, t in row_lines)
+    return records, dropped
@@ -0,0 +1,123 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts", "Noto_Sans_TC")
+
+BORDER = (0, 0, 0)
+BACKGROUND = (255, 255, 255)
+TEXT = (0, 0, 0)
+
+
+@lru_cache(maxsize=None)
+def load_font(size, bold=False):
+    """
+    Noto Sans TC at `size` pixels, so Chinese and Japanese player names render.
+    Uses the static weights if they are installed, else the variable font, else Pillow's default.
+    """
+    weight = "Bold" if bold else "Regular"
+    static = os.path.join(FONT_DIR, "static", f"NotoSansTC-{weight}.ttf")
+    if os.path.exists(static):
+        return ImageFont.truetype(static, size)
+
+    variable = os.path.join(FONT_DIR, "NotoSansTC-VariableFont_wght.ttf")
+    if os.path.exists(variable):
+        font = ImageFont.truetype(variable, size)
+        try:
+            font.set_variation_by_name(weight)
+        except (OSError, ValueError):
+            pass
+        return font
+
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def pr_colour(pr_value):
+    """Background of a PR cell: the colour bands used by every club scout table."""
+    if pr_value is None:
+        return None
+    if pr_value <= 50:
+        return "#FF0000"  # Sharp red for top 50
+    if pr_value <= 200:
+        return "#FFA500"  # Orange for 51-200
+    if pr_value <= 500:
+        return "#FFFF00"  # Yellow for 200-500
+    if pr_value <= 1000:
+        return "#ADD8E6"  # Light blue for 500-1000
+    if pr_value <= 2000:
+        return "#D397F8"  # Purple for 1001-2000
+    return None
+
+
+def render_table(df, font_size=18, padding=8, column_colours=None, bold_first_column=True):
+    """
+    Draw a DataFrame as a bordered grid and return the PNG bytes.
+
+    `column_colours` maps a column name to a function of the cell value that returns a
+    background colour (or None to leave the cell white). The header row is always bold,
+    and so is the first column unless `bold_first_column` is False.
+    """
+    column_colours = column_colours or {}
+    regular = load_font(font_size)
+    bold = load_font(font_size, bold=True)
+
+    header = [str(column) for column in df.columns]
+    rows = [[str(value) for value in values] for values in df.itertuples(index=False, name=None)]
+
+    def text_width(text, font):
+        return font.getlength(text) if hasattr(font, "getlength") else font.getsize(text)[0]
+
+    # Every column is as wide as its longest cell, every row as tall as the font
+    widths = []
+    for col, name in enumerate(header):
+        first_bold = bold_first_column and col == 0
+        widest = max(
+            [text_width(name, bold)]
+            + [text_width(row[col], bold if first_bold else regular) for row in rows]
+        )
+        widths.append(int(widest) + 2 * padding)
+    ascent, descent = bold.getmetrics() if hasattr(bold, "getmetrics") else (font_size, 0)
+    row_height = ascent + descent + 2 * padding
+
+    image = Image.new("RGB", (sum(widths) + 1, row_height * (len(rows) + 1) + 1), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    # Background of every coloured cell, one list per coloured column
+    fills = {
+        col: [None] + [column_colours[name](value) for value in df.iloc[:, col]]
+        for col, name in enumerate(df.columns) if name in column_colours
+    }
+    for r, cells in enumerate([header] + rows):
+        top = r * row_height
+        left = 0
+        for col, text in enumerate(cells):
+            right = left + widths[col]
+            draw.rectangle(
+                [left, top, right, top + row_height],
+                fill=(fills[col][r] if col in fills else None) or BACKGROUND,
+                outline=BORDER,
+            )
+            font = bold if r == 0 or (bold_first_column and col == 0) else regular
+            draw.text(((left + right) / 2, top + row_height / 2), text, fill=TEXT, font=font, anchor="mm")
+            left = right
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
+
+
+def page_count(rows, rows_per_page):
+    """Number of `rows_per_page` pages needed for `rows` rows (at least one)."""
+    return max(1, -(-rows // rows_per_page))
+
+
+def render_table_page(df, page, rows_per_page, **kwargs):
+    """render_table for page `page` (0-based) of `df`, `rows_per_page` rows per page."""
+    start = page * rows_per_page
+    return render_table(df.iloc[start:start + rows_per_page], **kwargs)
@@ -0,0 +1,37 @@
+import os
+import uuid
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def database_pool():
+    """
+    A ConnectionPool on a throwaway schema of the database at TEST_DATABASE_URL.
+    Tests that need Postgres are skipped when the variable is not set.
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    pytest.importorskip("psycopg2")
+    from bot_commands.db import ConnectionPool
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    pool = ConnectionPool.from_url(url, size=2)
+    with pool.connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA {schema}")
+        connection.commit()
+    pool.closeall()
+
+    # Every connection of this pool resolves unqualified table names in the test schema
+    pool = ConnectionPool.from_url(url, size=2)
+    pool.connect_kwargs["options"] = f"-c search_path={schema}"
+    try:
+        yield pool
+    finally:
+        with pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+            connection.commit()
+        pool.closeall()
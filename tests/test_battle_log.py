@@ -0,0 +1,50 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("discord")
+
+from bot_commands.battle_log import BattleLog
+
+
+def prepare(dates):
+    """prepare_log_rows on one otherwise valid battle per Battle Date cell."""
+    df = pd.DataFrame({
+        "Battle Date": pd.Series(dates, dtype=object),
+        "Player Name": [f"player{n}" for n in range(len(dates))],
+        "Opponent Name": "opponent",
+        "Result": "w",
+        "Opponent Club": "them",
+        "Home Club": "us",
+        "Player SP Number": 1,
+        "Opponent SP Number": 2,
+        "Player Nerf": "",
+    })
+    return BattleLog.prepare_log_rows(SimpleNamespace(LOG_COLUMNS=BattleLog.LOG_COLUMNS), df)
+
+
+def test_every_date_cell_shape_is_stored_as_that_date():
+    rows, rejects = prepare([
+        datetime.datetime(2025, 1, 7),
+        "2025-01-07",
+        "2025-01-07 00:00:00",
+        20250107,
+        20250107.0,
+        "20250107",
+    ])
+    assert rejects == []
+    assert [row[0] for row in rows] == ["2025-01-07"] * 6
+
+
+def test_unparseable_dates_are_rejected_not_stored():
+    rows, rejects = prepare(["not a date", 45664, 7, "2025-13-45", "2025-01-07"])
+    assert [row[0] for row in rows] == ["2025-01-07"]
+    assert rejects == [(row, "bad date") for row in (2, 3, 4, 5)]
+
+
+def test_blank_date_is_a_missing_field():
+    rows, rejects = prepare(["", "2025-01-07"])
+    assert len(rows) == 1
+    assert rejects == [(2, "missing date, player, opponent or club")]
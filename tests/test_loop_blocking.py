@@ -0,0 +1,177 @@
+"""
+Command handlers must keep their database work off the event loop thread.
+
+The pool hands out fake connections whose every statement takes DELAY seconds, and
+a heartbeat task measures how late the loop wakes up while a burst of commands runs.
+A handler that executes SQL on the loop thread, or checks out a second connection
+while holding one, fails here.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("psycopg2")
+
+from psycopg2 import extensions
+
+from bot_commands.cache import RosterCache
+from bot_commands.club_commands import ClubCommands
+from bot_commands.db import ConnectionPool
+from bot_commands.player_commands import PlayerCommands
+
+# How long every fake statement takes, and the most the loop may wake up late
+DELAY = 0.15
+THRESHOLD = DELAY / 2
+
+
+class FakeCursor:
+    # Wide enough for scoutplayer's Player row; a 0 first column is also an empty count
+    ROW = (0,) * 19
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        time.sleep(DELAY)
+
+    def fetchone(self):
+        return self.ROW
+
+    def fetchall(self):
+        return [("name",)]
+
+
+class FakeConnection:
+    closed = 0
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        time.sleep(DELAY)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakePool(ConnectionPool):
+    def _open(self):
+        return FakeConnection()
+
+
+class FakeContext:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+async def heartbeat(lags, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+
+def bind(cog):
+    """Point the cog's commands at the instance, like bot.add_cog does."""
+    for command in cog.get_commands():
+        command.cog = cog
+    return cog
+
+
+async def run_commands(commands):
+    """Run the commands concurrently and return the worst loop lag and every reply."""
+    lags = []
+    monitor = asyncio.create_task(heartbeat(lags))
+    contexts = [FakeContext() for _ in commands]
+    await asyncio.gather(*(command(ctx) for ctx, command in zip(contexts, commands)))
+    monitor.cancel()
+    return max(lags), [message for ctx in contexts for message in ctx.messages]
+
+
+def test_handlers_do_not_block_the_event_loop():
+    # A nested checkout with every connection taken times out instead of hanging the test
+    pool = FakePool({}, size=2, timeout=2)
+    roster_cache = RosterCache()
+    players = bind(PlayerCommands(None, pool, roster_cache))
+    clubs = bind(ClubCommands(None, pool, roster_cache, None))
+    commands = [
+        lambda ctx: players.addplayer(ctx, "newplayer"),
+        lambda ctx: players.updatenerf(ctx, "player1", "nerfed"),
+        lambda ctx: players.updatenerf(ctx, "player2", "nerfed"),
+        lambda ctx: players.updatepr(ctx, "player3", 1200),
+        lambda ctx: players.updateclub(ctx, "player4", "otherclub"),
+        lambda ctx: players.renameplayer(ctx, "player5", "player6"),
+        lambda ctx: players.deleteplayer(ctx, "player7"),
+        lambda ctx: players.listplayers(ctx),
+        lambda ctx: players.updateplayer(ctx, "player8", args="pr=900 nerf=none"),
+        lambda ctx: clubs.addclub(ctx, "newclub"),
+        lambda ctx: clubs.renameclub(ctx, "club1", "club2"),
+        lambda ctx: clubs.deleteclub(ctx, "club3"),
+        lambda ctx: clubs.listclubs(ctx),
+    ]
+    worst_lag, messages = asyncio.run(run_commands(commands))
+
+    assert not [message for message in messages if "error occurred" in str(message)], messages
+    assert worst_lag < THRESHOLD, f"event loop blocked for {worst_lag:.3f}s"
+
+
+def test_connection_refuses_to_block_the_event_loop():
+    pool = FakePool({}, size=1)
+
+    async def borrow_on_the_loop():
+        with pool.connection():
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(borrow_on_the_loop())
+
+    # The helper pattern: connection() inside run(), on the blocking executor
+    def helper():
+        with pool.connection() as connection:
+            return connection.get_transaction_status()
+
+    assert asyncio.run(pool.run(helper)) == extensions.TRANSACTION_STATUS_IDLE
+
+
+def test_rankedpitch_builds_its_table_off_the_loop(monkeypatch):
+    pytest.importorskip("matplotlib")
+    pytest.importorskip("pandas")
+    from bot_commands import pitch_analysis
+
+    threads = []
+
+    def pitching_stats(results):
+        threads.append(threading.get_ident())
+        return real_pitching_stats(results)
+
+    real_pitching_stats = pitch_analysis.pitching_stats
+    monkeypatch.setattr(pitch_analysis, "pitching_stats", pitching_stats)
+
+    class Pool:
+        async def run(self, func, *args):
+            return [("Starter", 14, 2, 5, 1, 0.3, 1, 4, 2)]
+
+    cog = bind(pitch_analysis.RankedPitchStats(None, Pool(), None, None))
+    ctx = FakeContext()
+    ctx.author = type("Author", (), {"id": 1})()
+    asyncio.run(cog.rankedpitch(ctx))
+
+    # The table went out as a file rather than an error message
+    assert ctx.messages == [None]
+    assert threads and threading.get_ident() not in threads
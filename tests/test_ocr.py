@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp import web
+
+from bot_commands.ocr import OCRBackend, OCRCache, OCRError, ReadClient, ReplayBackend, ScreenshotReader
+
+
+def record(fixture_dir, image_data, lines):
+    path = fixture_dir / (hashlib.sha256(image_data).hexdigest() + ".json")
+    path.write_text(json.dumps(lines), encoding="utf-8")
+
+
+def test_backends_must_implement_read_layout():
+    class Incomplete(OCRBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_replay_reads_text_and_position_pairs(tmp_path):
+    record(tmp_path, b"new", [["AB 120", 14.5], ["H 31", 40]])
+    backend = ReplayBackend(str(tmp_path))
+    assert asyncio.run(backend.read_layout(b"new")) == [("AB 120", 14.5), ("H 31", 40)]
+    assert asyncio.run(backend.read_lines(b"new")) == ["AB 120", "H 31"]
+
+
+def test_replay_reads_legacy_text_only_fixtures(tmp_path):
+    record(tmp_path, b"old", ["AB 120", "H 31"])
+    backend = ReplayBackend(str(tmp_path))
+    assert asyncio.run(backend.read_layout(b"old")) == [("AB 120", None), ("H 31", None)]
+
+
+def test_replay_without_a_fixture_raises(tmp_path):
+    with pytest.raises(OCRError):
+        asyncio.run(ReplayBackend(str(tmp_path)).read_layout(b"unknown"))
+
+
+class CountingBackend(OCRBackend):
+    def __init__(self):
+        self.reads = 0
+
+    async def read_layout(self, image_data):
+        self.reads += 1
+        return [("AB 120", None)]
+
+
+class MemoryCache:
+    """OCRCache keyed the same way, without the database."""
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get(self, image_data, settings=()):
+        return self.entries.get(OCRCache.image_hash(image_data, settings))
+
+    async def set(self, image_data, lines, settings=()):
+        self.entries[OCRCache.image_hash(image_data, settings)] = lines
+
+
+def test_cache_key_covers_the_read_settings():
+    Image = pytest.importorskip("PIL.Image")
+    buffer = BytesIO()
+    Image.new("RGB", (400, 300), (200, 30, 30)).save(buffer, format="PNG")
+    screenshot = buffer.getvalue()
+
+    cache = MemoryCache()
+    backend = CountingBackend()
+
+    async def read(**settings):
+        return await ScreenshotReader(backend, cache, **settings).read(screenshot)
+
+    asyncio.run(read(max_side=1600))
+    asyncio.run(read(max_side=1600))
+    assert backend.reads == 1
+    # Another size or crop is a different preprocessed upload, so it is read again
+    asyncio.run(read(max_side=800))
+    asyncio.run(read(max_side=1600, crop=(0, 0.5, 1, 1)))
+    assert backend.reads == 3
+
+    # So is the same upload sent to another backend
+    class OtherBackend(CountingBackend):
+        pass
+
+    other = OtherBackend()
+    asyncio.run(ScreenshotReader(other, cache, max_side=1600).read(screenshot))
+    assert other.reads == 1
+    assert len(cache.entries) == 4
+
+
+class StubReadAPI:
+    """A local stand-in for the Read API that throttles, fails and polls like the real one."""
+
+    def __init__(self):
+        self.calls = {"post": 0, "get": 0}
+        self.runner = None
+        self.port = None
+
+    async def analyze(self, request):
+        self.calls["post"] += 1
+        await request.read()
+        if self.calls["post"] == 1:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        location = f"http://127.0.0.1:{self.port}/operations/1"
+        return web.Response(status=202, headers={"Operation-Location": location, "Retry-After": "0"})
+
+    async def operation(self, request):
+        self.calls["get"] += 1
+        if self.calls["get"] == 1:
+            return web.Response(status=503)
+        if self.calls["get"] < 4:
+            return web.json_response({"status": "running"}, headers={"Retry-After": "0.1"})
+        lines = [{"text": "Player One", "boundingBox": [0, 10, 90, 10, 90, 30, 0, 30]}, {"text": "12"}]
+        return web.json_response({"status": "succeeded", "analyzeResult": {"readResults": [{"lines": lines}]}})
+
+    async def stuck_analyze(self, request):
+        location = f"http://127.0.0.1:{self.port}/operations/stuck"
+        return web.Response(status=202, headers={"Operation-Location": location})
+
+    async def stuck(self, request):
+        return web.json_response({"status": "running"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/analyze", self.analyze)
+        app.router.add_get("/operations/1", self.operation)
+        app.router.add_post("/stuck", self.stuck_analyze)
+        app.router.add_get("/operations/stuck", self.stuck)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}"
+
+
+def test_read_client_retries_and_follows_retry_after():
+    async def read():
+        stub = StubReadAPI()
+        base = await stub.start()
+        client = ReadClient(f"{base}/analyze", "key", deadline=5)
+        try:
+            return stub.calls, await client.read_layout(b"image")
+        finally:
+            await client.close()
+            await stub.runner.cleanup()
+
+    calls, layout = asyncio.run(read())
+    assert layout == [("Player One", 20), ("12", None)]
+    # One throttled POST retried, one 503 poll retried, two polls while running
+    assert calls == {"post": 2, "get": 4}
+
+
+def test_read_client_gives_up_at_the_deadline():
+    async def read():
+        stub = StubReadAPI()
+        base = await stub.start()
+        client = ReadClient(f"{base}/stuck", "key", deadline=0.5)
+        try:
+            await client.read_lines(b"image")
+        finally:
+            await client.close()
+            await stub.runner.cleanup()
+
+    with pytest.raises(OCRError):
+        asyncio.run(read())
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("psycopg2")
+
+from psycopg2 import extensions
+
+from bot_commands.migrations import MIGRATIONS
+from bot_commands.ocr import OCRCache
+
+# Every entry stores one line of this many bytes
+ENTRY_BYTES = 100
+
+
+@pytest.fixture
+def cache(database_pool):
+    with database_pool.connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS ocr_cache")
+            for statement in next(statements for version, _, statements in MIGRATIONS if version == 3):
+                cursor.execute(statement)
+        connection.commit()
+    return OCRCache(database_pool, max_bytes=10 * ENTRY_BYTES, low_water=0.5)
+
+
+def stored(cache):
+    with cache.pool.connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT image_hash, byte_size FROM ocr_cache")
+            return dict(cursor.fetchall())
+
+
+def test_evicts_least_recently_used_past_the_cap(cache):
+    for n in range(10):
+        cache._set(f"image{n}", ["x" * ENTRY_BYTES])
+    # Reading image0 makes image1 the least recently used
+    assert cache._get("image0") == ["x" * ENTRY_BYTES]
+    assert len(stored(cache)) == 10
+
+    cache._set("image10", ["x" * ENTRY_BYTES])
+
+    kept = stored(cache)
+    assert sum(kept.values()) <= cache.max_bytes * cache.low_water
+    assert "image0" in kept and "image10" in kept
+    assert "image1" not in kept
+    assert cache._stored_bytes == sum(kept.values())
+
+
+class RecordingPool:
+    """Hands out the real pool's connections and records every statement run on them."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.statements = []
+
+    @contextmanager
+    def connection(self):
+        with self.pool.connection() as connection:
+            yield RecordingConnection(connection, self.statements)
+
+
+class RecordingConnection:
+    def __init__(self, connection, statements):
+        self.connection = connection
+        self.statements = statements
+
+    def cursor(self):
+        statements = self.statements
+
+        class RecordingCursor(extensions.cursor):
+            def execute(self, query, params=None):
+                statements.append(query)
+                return super().execute(query, params)
+
+        return self.connection.cursor(cursor_factory=RecordingCursor)
+
+    def commit(self):
+        self.connection.commit()
+
+
+def test_only_walks_the_table_when_over_the_cap(cache):
+    cache._set("image0", ["x" * ENTRY_BYTES])
+    cache.pool = RecordingPool(cache.pool)
+    for n in range(1, 5):
+        cache._set(f"image{n}", ["x" * ENTRY_BYTES])
+
+    assert len(cache.pool.statements) == 4
+    assert not any("DELETE" in query for query in cache.pool.statements)
+    assert cache._stored_bytes == 5 * ENTRY_BYTES
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("discord")
+
+from bot_commands.paginator import TablePaginator
+
+
+class FakeResponse:
+    def __init__(self, events):
+        self.events = events
+
+    async def defer(self):
+        self.events.append("defer")
+        # The real defer is an API call, so other clicks get to run meanwhile
+        await asyncio.sleep(0)
+
+
+class FakeInteraction:
+    def __init__(self, events):
+        self.events = events
+        self.response = FakeResponse(events)
+
+    async def edit_original_response(self, **kwargs):
+        self.events.append("edit")
+
+
+def test_every_click_is_answered_before_waiting_for_a_render():
+    events = []
+
+    async def render_page(page):
+        events.append(f"render {page}")
+        await asyncio.sleep(0.05)
+        return b"png"
+
+    async def click_twice():
+        paginator = TablePaginator(render_page, page_count=3, name="roster")
+        await asyncio.gather(
+            paginator._turn(FakeInteraction(events), 1),
+            paginator._turn(FakeInteraction(events), 1),
+        )
+        return paginator.page
+
+    assert asyncio.run(click_twice()) == 2
+    # The second click is deferred while the first page is still rendering
+    assert events[:3] == ["defer", "defer", "render 1"]
+    assert events[3:] == ["edit", "render 2", "edit"]
@@ -0,0 +1,52 @@
+from io import BytesIO
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from bot_commands.preprocess import parse_crop, preprocess_image, stitch_vertically
+
+
+def png(width, height, colour=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), colour).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_parse_crop():
+    assert parse_crop("") is None
+    assert parse_crop("0,0.15,1,0.95") == (0, 0.15, 1, 0.95)
+    for bad in ("0,0,1", "0.5,0,0.4,1", "0,0,1,1.5"):
+        with pytest.raises(ValueError):
+            parse_crop(bad)
+
+
+def test_preprocess_crops_shrinks_and_greys():
+    result = Image.open(BytesIO(preprocess_image(png(3000, 2000), crop=(0, 0.5, 1, 1), max_side=1600)))
+    assert result.mode == "L"
+    assert result.size == (1600, 533)
+
+
+def test_preprocess_leaves_small_screenshots_at_full_size():
+    assert Image.open(BytesIO(preprocess_image(png(800, 600)))).size == (800, 600)
+
+
+def test_preprocess_never_returns_a_bigger_upload():
+    noisy = Image.effect_noise((2400, 1080), 60).convert("RGB")
+    buffer = BytesIO()
+    noisy.save(buffer, format="JPEG", quality=85)
+    jpeg = buffer.getvalue()
+    # Barely shrunk, the grayscale PNG of JPEG noise is bigger than the JPEG itself
+    assert preprocess_image(jpeg, max_side=2300) == jpeg
+    assert len(preprocess_image(jpeg, max_side=800)) < len(jpeg)
+
+
+def test_preprocess_always_applies_the_crop():
+    result = Image.open(BytesIO(preprocess_image(png(400, 300), crop=(0, 0, 0.5, 0.5))))
+    assert result.size == (200, 150)
+
+
+def test_stitch_stacks_screenshots_with_a_gap():
+    canvas, offsets = stitch_vertically([png(400, 100), png(300, 50)], gap=40)
+    assert offsets == [0, 140]
+    assert Image.open(BytesIO(canvas)).size == (400, 190)
@@ -0,0 +1,142 @@
+"""
+The hot cog queries must be served by the indexes the migrations create.
+
+The queries are imported from the cogs themselves, so this cannot drift from the SQL
+that runs. They are EXPLAINed with the planner's default settings against tables
+seeded at a realistic size, so an index only passes if Postgres actually picks it.
+"""
+import pytest
+
+pytest.importorskip("discord")
+
+from bot_commands.bat_analysis import RankedBatStats
+from bot_commands.battle_log import BattleLog
+from bot_commands.club_commands import ClubCommands
+from bot_commands.migrations import run_migrations
+from bot_commands.pitch_analysis import RankedPitchStats
+
+# The tables the bot expects to exist before the first migration
+BASE_SCHEMA = [
+    """
+    CREATE TABLE Club (Club_Name TEXT PRIMARY KEY)
+    """,
+    """
+    CREATE TABLE Player (
+        Name TEXT PRIMARY KEY, Club_Name TEXT,
+        SP1_Name TEXT, SP1_Skills TEXT, SP2_Name TEXT, SP2_Skills TEXT,
+        SP3_Name TEXT, SP3_Skills TEXT, SP4_Name TEXT, SP4_Skills TEXT,
+        SP5_Name TEXT, SP5_Skills TEXT, Nerf TEXT, PR INTEGER,
+        last_updated DATE, nerf_updated DATE, team_name TEXT,
+        charbats INTEGER, toolbats INTEGER, Most_Common_Batting_Skill TEXT
+    )
+    """,
+    """
+    CREATE TABLE club_records (
+        battle_date DATE, player_name TEXT, opponent_name TEXT, result TEXT,
+        opponent_club TEXT, player_club TEXT, player_sp_number INTEGER,
+        opponent_sp_number INTEGER, nerf TEXT,
+        UNIQUE (battle_date, player_name, opponent_name, player_sp_number, opponent_sp_number)
+    )
+    """,
+    """
+    CREATE TABLE rankedbatstats (
+        DISCORDID BIGINT, PLAYERNAME TEXT, AB INTEGER, H INTEGER, BB INTEGER, SLG FLOAT,
+        K INTEGER, HR INTEGER, SB INTEGER, SBPCT FLOAT, TIMING TEXT, submission_time TIMESTAMP,
+        UNIQUE (DISCORDID, PLAYERNAME, TIMING, submission_time)
+    )
+    """,
+    """
+    CREATE TABLE rankedpitchstats (
+        DISCORDID BIGINT, PLAYERNAME TEXT, OUTS INTEGER, R INTEGER, H INTEGER, BB INTEGER,
+        SLG FLOAT, HR INTEGER, SO INTEGER, TIMING TEXT, G INTEGER,
+        UNIQUE (DISCORDID, PLAYERNAME, TIMING)
+    )
+    """,
+]
+
+# club_records has to be filled before migration 2 backfills the rollup from it
+SEED_BEFORE_MIGRATIONS = [
+    """
+    INSERT INTO club_records
+    SELECT DATE '2024-01-01' + (i % 365), 'player_' || (i % 5000), 'opponent_' || i,
+           (ARRAY['w', 'l', 'd'])[1 + i % 3], 'club_' || (i % 500), 'club_' || ((i / 500) % 500),
+           1 + i % 5, 1 + (i / 5) % 5, ''
+    FROM generate_series(1, 200000) AS i
+    """,
+]
+
+SEED_AFTER_MIGRATIONS = [
+    """
+    INSERT INTO Player (Name, Club_Name, PR)
+    SELECT 'player_' || i, 'club_' || (i % 2000), i % 3000
+    FROM generate_series(1, 100000) AS i
+    """,
+    # 2000 users with 4 submissions of 10 players, before and after
+    """
+    INSERT INTO rankedbatstats
+    SELECT u, 'player_' || p, 100, 30, 10, 0.4, 20, 3, 2, 50, t, TIMESTAMP '2024-01-01' + s * INTERVAL '1 day'
+    FROM generate_series(1, 2000) AS u, generate_series(1, 4) AS s,
+         generate_series(1, 10) AS p, unnest(ARRAY['before', 'after']) AS t
+    """,
+    """
+    INSERT INTO rankedpitchstats
+    SELECT u, 'player_' || p, 90, 10, 25, 8, 0.35, 2, 30, t, 5, TIMESTAMP '2024-01-01' + s * INTERVAL '1 day'
+    FROM generate_series(1, 2000) AS u, generate_series(1, 4) AS s,
+         generate_series(1, 10) AS p, unnest(ARRAY['before', 'after']) AS t
+    """,
+]
+
+SEEDED_TABLES = {"player", "club_records", "club_matchup_rollup", "rankedbatstats", "rankedpitchstats"}
+
+# Every cog query that filters a seeded table, with sample parameters
+QUERIES = {
+    "analyse": (BattleLog.ANALYSE_QUERY, ("club_7",)),
+    "analyse_date": (BattleLog.ANALYSE_DATE_QUERY, ("2024-02-01", "club_3", "club_7")),
+    **{
+        name: (query, ("club_7",))
+        for name, query in ClubCommands.ROSTER_QUERIES.items()
+    },
+    "batters trim": (RankedBatStats.TRIM_QUERY, {"discord_id": 42}),
+    "pitchers trim": (RankedPitchStats.TRIM_QUERY, {"discord_id": 42}),
+}
+
+
+def seq_scans(plan):
+    """The relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan."""
+    tables = [plan["Relation Name"].lower()] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        tables.extend(seq_scans(child))
+    return tables
+
+
+@pytest.fixture(scope="module")
+def seeded_pool(database_pool):
+    with database_pool.connection() as connection:
+        with connection.cursor() as cursor:
+            for statement in BASE_SCHEMA + SEED_BEFORE_MIGRATIONS:
+                cursor.execute(statement)
+        connection.commit()
+    run_migrations(database_pool)
+    with database_pool.connection() as connection:
+        with connection.cursor() as cursor:
+            for statement in SEED_AFTER_MIGRATIONS:
+                cursor.execute(statement)
+        connection.commit()
+        # ANALYZE cannot run inside a transaction block
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        connection.autocommit = False
+    return database_pool
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_query_uses_an_index(seeded_pool, name):
+    query, params = QUERIES[name]
+    with seeded_pool.connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cursor.fetchone()[0]
+        connection.rollback()
+    scanned = SEEDED_TABLES.intersection(seq_scans(plan[0]["Plan"]))
+    assert not scanned, f"{name} scans {sorted(scanned)} sequentially"
@@ -0,0 +1,77 @@
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("discord")
+
+from bot_commands.server_commands import ServerCommands
+
+
+class FakeCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if query.startswith("DELETE"):
+            self.pool.deleted.extend(params[0])
+
+    def fetchall(self):
+        return [(1,), (2,)]
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return FakeCursor(self.pool)
+
+    def commit(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.deleted = []
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+    async def run(self, func, *args):
+        return func(*args)
+
+
+class FakeMessage:
+    async def delete(self):
+        pass
+
+
+def test_clean_roles_keeps_messages_sent_while_it_runs():
+    cog = ServerCommands(None, FakePool())
+
+    class Channel:
+        async def fetch_message(self, message_id):
+            # send_roles finishing in the middle of the clean-up
+            cog.role_message_ids.add(3)
+            await asyncio.sleep(0)
+            return FakeMessage()
+
+    class Context:
+        channel = Channel()
+
+        async def send(self, content):
+            pass
+
+    ctx = Context()
+    asyncio.run(ServerCommands.clean_roles.callback(cog, ctx))
+
+    assert cog.role_message_ids == {3}
+    assert sorted(cog.pool.deleted) == [1, 2]
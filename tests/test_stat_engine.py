@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("pandas")
+
+from bot_commands.stat_engine import BAT_COLUMNS, PITCH_COLUMNS, batting_stats, pitching_stats, ratio
+
+
+def test_ratio_is_zero_where_the_denominator_is_not_positive():
+    assert list(ratio([1, 1, 1], [4, 0, -2], 3)) == [0.25, 0, 0]
+
+
+def test_batting_stats():
+    df = batting_stats([
+        ("Nobody", 0, 0, 0, 0, 0, 0, 0, 0),
+        ("Slugger", 100, 30, 5, 10, 50, 4, 5, 20),
+    ])
+    assert list(df.columns) == BAT_COLUMNS
+    # Best OPS first
+    assert list(df["Player Name"]) == ["Slugger", "Nobody"]
+    slugger = df.iloc[0].to_dict()
+    assert slugger == {
+        "Player Name": "Slugger", "AB": 100, "Avg": 0.3, "BB": 10, "BB%": 9.1, "K": 20, "K%": 20.0,
+        "OBP": 0.364, "HR": 5, "HR%": 5.0, "SLG": 0.5, "OPS": 0.864, "SB": 4, "SB%": 80.0,
+    }
+    assert (df.iloc[1].drop("Player Name") == 0).all()
+
+
+def test_pitching_stats():
+    df = pitching_stats([
+        ("Starter", 14, 2, 5, 1, 0.3, 1, 4, 2),
+        ("Opener", 3, 0, 0, 0, 0.0, 0, 1, 1),
+    ])
+    assert list(df.columns) == PITCH_COLUMNS
+    # Best ERA first
+    assert list(df["Player Name"]) == ["Opener", "Starter"]
+    starter = df.iloc[1].to_dict()
+    assert starter == {
+        "Player Name": "Starter", "G": 2, "IP": 4.2, "AVG IP/G": 2.1, "ERA": 3.86, "AVG": 0.263,
+        "OBP": 0.3, "SLG": 0.3, "OPS": 0.6, "BB": 1, "BB%": 5.0, "HR": 1, "HR%": 5.3, "K": 4,
+        "K%": 21.1, "WHIP": 1.286,
+    }
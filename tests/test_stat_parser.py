@@ -0,0 +1,54 @@
+"""
+parse_lines against a corpus of recorded OCR output.
+
+Every tests/fixtures/stat_parser/<layout>/<case>.json holds the lines of one screenshot, in
+the ReplayBackend fixture format, and <case>.expected.json the records it must parse into.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from bot_commands.stat_parser import BAT_LAYOUT, PITCH_LAYOUT, parse_lines
+
+CORPUS = Path(__file__).parent / "fixtures" / "stat_parser"
+LAYOUTS = {"bat": BAT_LAYOUT, "pitch": PITCH_LAYOUT}
+
+CASES = sorted(
+    path.relative_to(CORPUS).with_suffix("").as_posix()
+    for path in CORPUS.glob("*/*.json")
+    if not path.name.endswith(".expected.json")
+)
+
+
+def load_case(case):
+    layout = LAYOUTS[case.split("/")[0]]
+    lines = json.loads((CORPUS / f"{case}.json").read_text(encoding="utf-8"))
+    expected = json.loads((CORPUS / f"{case}.expected.json").read_text(encoding="utf-8"))
+    lines = [line if isinstance(line, str) else line[0] for line in lines]
+    return layout, lines, [layout.record(**row) for row in expected]
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_corpus_parses_to_the_expected_records(case):
+    layout, lines, expected = load_case(case)
+    records, _ = parse_lines(lines, layout)
+    assert records == expected
+
+
+def test_corpus_covers_both_layouts():
+    assert {case.split("/")[0] for case in CASES} == set(LAYOUTS)
+
+
+def test_override_does_not_consume_the_next_row():
+    lines = ["Smith", "120", "31", "12", "0.512", "25", "6", "0", "Jones", "98", "22", "9", "0.401", "30", "2", "1", "50%"]
+    records, dropped = parse_lines(lines, BAT_LAYOUT)
+    assert [(record.name, record.sbpct) for record in records] == [("Smith", 0.0), ("Jones", 50.0)]
+    assert dropped == []
+
+
+def test_placeholder_is_only_skipped_after_an_override():
+    lines = ["Smith", "120", "31", "12", "0.512", "25", "6", "4", "-", "80%"]
+    records, dropped = parse_lines(lines, BAT_LAYOUT)
+    assert records[0].sbpct == 80.0
+    assert [line.text for line in dropped] == ["-"]